@@ -0,0 +1,111 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.database import get_db, get_read_db
+from app.schemas import (
+    CategoryCreateRequest, CategoryMoveRequest, CategoryNodeResponse,
+    CategoryProductCountResponse, CategoryResponse, ErrorResponse
+)
+from app.services import CategoryService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/categories", tags=["categories"])
+
+_NOT_FOUND = {404: {"model": ErrorResponse, "description": "Категория не найдена"}}
+
+
+def _http_error_from_value_error(error: ValueError) -> HTTPException:
+    error_message = str(error)
+    if "не найден" in error_message:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=error_message)
+    logger.warning("Ошибка валидации: %s", error_message)
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_message)
+
+
+@router.post(
+    "",
+    response_model=CategoryResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses=_NOT_FOUND,
+    summary="Создать категорию",
+)
+def create_category(request: CategoryCreateRequest, db: Session = Depends(get_db)):
+    try:
+        return CategoryService.create_category(db, request)
+    except ValueError as e:
+        raise _http_error_from_value_error(e)
+
+
+@router.post(
+    "/{category_id}/move",
+    response_model=CategoryResponse,
+    responses={**_NOT_FOUND, 400: {"model": ErrorResponse, "description": "Перенос в собственное поддерево"}},
+    summary="Перенести категорию с поддеревом",
+)
+def move_category(category_id: int, request: CategoryMoveRequest, db: Session = Depends(get_db)):
+    try:
+        return CategoryService.move_category(db, category_id, request)
+    except ValueError as e:
+        raise _http_error_from_value_error(e)
+
+
+@router.delete(
+    "/{category_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={**_NOT_FOUND, 400: {"model": ErrorResponse, "description": "Категория не пуста"}},
+    summary="Удалить пустую категорию",
+)
+def delete_category(category_id: int, db: Session = Depends(get_db)):
+    try:
+        CategoryService.delete_category(db, category_id)
+    except ValueError as e:
+        raise _http_error_from_value_error(e)
+
+
+@router.get(
+    "/{category_id}/descendants",
+    response_model=list[CategoryNodeResponse],
+    responses=_NOT_FOUND,
+    summary="Все потомки категории",
+)
+def get_descendants(
+    category_id: int,
+    max_depth: int | None = Query(None, gt=0, description="Максимальная глубина"),
+    db: Session = Depends(get_read_db)
+):
+    try:
+        return CategoryService.descendants(db, category_id, max_depth)
+    except ValueError as e:
+        raise _http_error_from_value_error(e)
+
+
+@router.get(
+    "/{category_id}/root",
+    response_model=CategoryResponse,
+    responses=_NOT_FOUND,
+    summary="Категория 1-го уровня",
+)
+def get_root(category_id: int, db: Session = Depends(get_read_db)):
+    try:
+        return CategoryService.root_of(db, category_id)
+    except ValueError as e:
+        raise _http_error_from_value_error(e)
+
+
+@router.get(
+    "/{category_id}/product-count",
+    response_model=CategoryProductCountResponse,
+    responses=_NOT_FOUND,
+    summary="Количество товаров в поддереве",
+)
+def get_product_count(category_id: int, db: Session = Depends(get_read_db)):
+    try:
+        return CategoryProductCountResponse(
+            category_id=category_id,
+            product_count=CategoryService.subtree_product_count(db, category_id)
+        )
+    except ValueError as e:
+        raise _http_error_from_value_error(e)
@@ -1,10 +1,23 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.schemas import AddItemToOrderRequest, OrderItemResponse, ErrorResponse
+from app.coalescing import add_item_coalescer, coalescing_enabled
+from app.database import ASYNC_MODE, get_async_db, get_db, get_read_db
+from app.export import MEDIA_TYPES, export_filename, export_orders
+from app.schemas import (
+    AddItemToOrderRequest, OrderItemResponse, ErrorResponse,
+    BulkAddItemsRequest, BulkAddItemsResponse, SetItemDiscountRequest,
+    OrderListResponse, OrderDetailResponse
+)
+from app.responses import ORJSONResponse, rows_to_dicts
+from app.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, IdempotencyConflict, idempotency_store
 from app.services import OrderService
 
 logger = logging.getLogger(__name__)
@@ -12,13 +25,35 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/orders", tags=["orders"])
 
 
-@router.post(
+def _http_error_from_value_error(error: ValueError) -> HTTPException:
+    """
+    Преобразует ошибку бизнес-логики в HTTP ответ: 404 для ненайденных
+    заказов и товаров, 400 для остальных ошибок валидации.
+    """
+    error_message = str(error)
+    if "не найден" in error_message:
+        logger.warning("Ресурс не найден: %s", error_message)
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_message
+        )
+    logger.warning("Ошибка валидации: %s", error_message)
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=error_message
+    )
+
+
+# Обработчик регистрируется ниже: синхронный или асинхронный по database.mode
+_add_item_route = router.post(
     "/add-item",
     response_model=OrderItemResponse,
     status_code=status.HTTP_200_OK,
     responses={
         404: {"model": ErrorResponse, "description": "Заказ или товар не найдены"},
         400: {"model": ErrorResponse, "description": "Недостаточно товара на складе"},
+        409: {"model": ErrorResponse, "description": "Запрос с этим Idempotency-Key еще выполняется"},
+        422: {"model": ErrorResponse, "description": "Idempotency-Key уже использован с другими параметрами"},
     },
     summary="Добавить товар в заказ",
     description="""
@@ -35,12 +70,36 @@ router = APIRouter(prefix="/api/orders", tags=["orders"])
     - Проверяется наличие товара на складе (поле `quantity` в таблице `products`)
     - Если товара недостаточно, возвращается ошибка 400
     
+    **Идемпотентность:**
+    - Необязательный заголовок `Idempotency-Key`: повтор запроса с тем же ключом и телом
+      возвращает сохраненный ответ (заголовок `Idempotency-Replayed: true`) без изменения заказа
+    
     **Возвращает:**
     - Объект позиции заказа (OrderItem) с обновленными данными
     """,
 )
+
+
+def _idempotency_error(error: IdempotencyConflict) -> HTTPException:
+    logger.warning("Конфликт ключа идемпотентности: %s", error.detail)
+    return HTTPException(status_code=error.status_code, detail=error.detail)
+
+
+def _replay_response(idempotency_key: str, replay: str) -> Response:
+    """
+    Сохраненный ответ (JSON из idempotency_keys) на повтор запроса с тем же Idempotency-Key.
+    """
+    logger.info("Повтор запроса по %s=%s, ответ из хранилища", IDEMPOTENCY_HEADER, idempotency_key)
+    return Response(replay, media_type="application/json", headers={REPLAYED_HEADER: "true"})
+
+
+def _item_response(row) -> dict:
+    return rows_to_dicts([row], OrderItemResponse.model_fields)[0]
+
+
 def add_item_to_order(
     request: AddItemToOrderRequest,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, max_length=255),
     db: Session = Depends(get_db)
 ):
     """
@@ -48,36 +107,262 @@ def add_item_to_order(
     
     Проверяет наличие заказа и товара, а также достаточность товара на складе.
     Если товар уже есть в заказе - увеличивает его количество.
+    Ответ собирается из строки RETURNING без повторной валидации по response_model.
     """
     logger.info(
-        f"Получен запрос на добавление товара: order_id={request.order_id}, "
-        f"product_id={request.product_id}, quantity={request.quantity}"
+        "Получен запрос на добавление товара: order_id=%s, product_id=%s, quantity=%s",
+        request.order_id, request.product_id, request.quantity
     )
+    if idempotency_key is not None:
+        try:
+            replay = idempotency_store.begin(db, idempotency_key, request.model_dump_json())
+        except IdempotencyConflict as e:
+            raise _idempotency_error(e)
+        if replay is not None:
+            return _replay_response(idempotency_key, replay)
     
     try:
-        result = OrderService.add_item_to_order(db, request)
+        if coalescing_enabled() and idempotency_key is None:
+            result = add_item_coalescer.add_item(db, request)
+        else:
+            # Ответ запроса с ключом записывается в его транзакции, поэтому без объединения
+            result = OrderService.add_item_to_order(db, request, idempotency_key=idempotency_key)
         logger.info(
-            f"Товар успешно добавлен в заказ: order_id={request.order_id}, "
-            f"product_id={request.product_id}, order_item_id={result.id}"
+            "Товар успешно добавлен в заказ: order_id=%s, product_id=%s, order_item_id=%s",
+            request.order_id, request.product_id, result.id
         )
-        return result
+        return ORJSONResponse(_item_response(result))
     except ValueError as e:
-        error_message = str(e)
-        if "не найден" in error_message:
-            logger.warning(f"Ресурс не найден: {error_message}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=error_message
-            )
-        else:
-            logger.warning(f"Ошибка валидации: {error_message}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=error_message
-            )
+        raise _http_error_from_value_error(e)
     except Exception as e:
-        logger.error(f"Неожиданная ошибка при добавлении товара в заказ: {e}", exc_info=True)
+        logger.error("Неожиданная ошибка при добавлении товара в заказ: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Внутренняя ошибка сервера"
         )
+    finally:
+        if idempotency_key is not None:
+            idempotency_store.release(idempotency_key)
+
+
+async def add_item_to_order_async(
+    request: AddItemToOrderRequest,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, max_length=255),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Асинхронный endpoint для добавления товара в заказ (database.mode: async).
+    """
+    logger.info(
+        "Получен запрос на добавление товара: order_id=%s, product_id=%s, quantity=%s",
+        request.order_id, request.product_id, request.quantity
+    )
+    if idempotency_key is not None:
+        try:
+            replay = await idempotency_store.begin_async(db, idempotency_key, request.model_dump_json())
+        except IdempotencyConflict as e:
+            raise _idempotency_error(e)
+        if replay is not None:
+            return _replay_response(idempotency_key, replay)
+    
+    try:
+        result = await OrderService.add_item_to_order_async(db, request, idempotency_key=idempotency_key)
+        logger.info(
+            "Товар успешно добавлен в заказ: order_id=%s, product_id=%s, order_item_id=%s",
+            request.order_id, request.product_id, result.id
+        )
+        return ORJSONResponse(_item_response(result))
+    except ValueError as e:
+        raise _http_error_from_value_error(e)
+    except Exception as e:
+        logger.error("Неожиданная ошибка при добавлении товара в заказ: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Внутренняя ошибка сервера"
+        )
+    finally:
+        if idempotency_key is not None:
+            idempotency_store.release(idempotency_key)
+
+
+_add_item_route(add_item_to_order_async if ASYNC_MODE else add_item_to_order)
+
+
+@router.post(
+    "/add-items",
+    response_model=BulkAddItemsResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        404: {"model": ErrorResponse, "description": "Заказ или товар не найдены"},
+        400: {"model": ErrorResponse, "description": "Недостаточно товара на складе"},
+    },
+    summary="Пакетно добавить товары в заказы",
+    description="""
+    Добавляет список позиций в один или несколько заказов одной транзакцией.
+    
+    **Параметры:**
+    - `items`: список позиций `{order_id, product_id, quantity}` (от 1 до 1000)
+    
+    **Логика работы:**
+    - Повторяющиеся пары заказ/товар в запросе суммируются
+    - Заказы, товары и существующие позиции загружаются несколькими запросами
+    - Остаток товара проверяется по суммарному количеству во всех позициях запроса
+    - Если хотя бы одна позиция не проходит проверку, не сохраняется ничего
+    
+    **Возвращает:**
+    - Позиции заказов в порядке строк запроса с обновленными данными
+    """,
+)
+def add_items_to_orders(
+    request: BulkAddItemsRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint для пакетного добавления товаров в заказы.
+    Ответ собирается из строк RETURNING без повторной валидации по response_model.
+    """
+    logger.info("Получен запрос на пакетное добавление товаров: позиций=%s", len(request.items))
+    
+    try:
+        rows = OrderService.add_item_rows(db, request)
+        logger.info("Товары успешно добавлены в заказы: позиций=%s", len(rows))
+        return ORJSONResponse({"items": rows_to_dicts(rows, OrderItemResponse.model_fields)})
+    except ValueError as e:
+        raise _http_error_from_value_error(e)
+    except Exception as e:
+        logger.error("Неожиданная ошибка при пакетном добавлении товаров: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Внутренняя ошибка сервера"
+        )
+
+
+@router.post(
+    "/set-item-discount",
+    response_model=OrderItemResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        404: {"model": ErrorResponse, "description": "Позиция заказа не найдена"},
+    },
+    summary="Установить скидку на позицию заказа",
+    description="""
+    Устанавливает процент скидки позиции заказа.
+    
+    **Параметры:**
+    - `order_id`: ID заказа
+    - `product_id`: ID товара в заказе
+    - `discount_percent`: скидка в процентах (0-100)
+    
+    **Логика работы:**
+    - `discount_amount` и `total_price` позиции пересчитываются
+    - Изменение скидки применяется к `discount_amount` и `total_amount` заказа в той же транзакции
+    """,
+)
+def set_item_discount(
+    request: SetItemDiscountRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint для изменения скидки позиции заказа.
+    """
+    try:
+        return OrderService.set_item_discount(db, request)
+    except ValueError as e:
+        raise _http_error_from_value_error(e)
+    except Exception as e:
+        logger.error("Неожиданная ошибка при изменении скидки позиции: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Внутренняя ошибка сервера"
+        )
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in (*MEDIA_TYPES.values(), "application/gzip")},
+            "description": "Поток заказов с позициями",
+        },
+    },
+    summary="Выгрузка заказов с позициями",
+    description="""
+    Потоково выгружает все заказы с позициями в порядке ID.
+    
+    **Параметры:**
+    - `format`: `ndjson` - строка JSON на заказ с массивом `items`;
+      `csv` - строка на позицию, поля позиции с префиксом `item_`
+    - `gzip`: сжать поток (`application/gzip`)
+    - `after_id`: выгружать заказы с ID больше указанного (продолжение прерванной выгрузки)
+    
+    Заказы читаются страницами по ID через серверный курсор, расход памяти
+    не зависит от количества строк.
+    """,
+)
+def export_orders_stream(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Формат выгрузки"),
+    compress: bool = Query(False, alias="gzip", description="Сжатие gzip"),
+    after_id: int = Query(0, ge=0, description="Выгружать заказы с ID больше указанного"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Endpoint потоковой выгрузки заказов.
+    """
+    filename = export_filename(export_format, compress)
+    return StreamingResponse(
+        export_orders(db, export_format, compress=compress, after_id=after_id),
+        media_type="application/gzip" if compress else MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get(
+    "",
+    response_model=OrderListResponse,
+    summary="Список заказов",
+    description="""
+    Заказы от новых к старым с фильтрами.
+    
+    **Параметры:**
+    - `customer_id`, `status_id`, `source_id`: фильтры по клиенту, статусу и источнику
+    - `date_from`, `date_to`: период по `order_date` (`date_to` не включается)
+    - `before_id`: курсор страницы - значение `next_before_id` из предыдущего ответа
+    - `limit`: размер страницы (1-500)
+    """,
+)
+def list_orders(
+    customer_id: Optional[int] = Query(None, gt=0),
+    status_id: Optional[int] = Query(None, gt=0),
+    source_id: Optional[int] = Query(None, gt=0),
+    date_from: Optional[date] = Query(None, description="order_date с даты (включительно)"),
+    date_to: Optional[date] = Query(None, description="order_date до даты (не включая)"),
+    before_id: Optional[int] = Query(None, gt=0, description="Курсор страницы"),
+    limit: int = Query(50, gt=0, le=500),
+    db: Session = Depends(get_read_db)
+):
+    return ORJSONResponse(OrderService.list_orders(
+        db,
+        customer_id=customer_id,
+        status_id=status_id,
+        source_id=source_id,
+        date_from=date_from,
+        date_to=date_to,
+        before_id=before_id,
+        limit=limit,
+    ))
+
+
+@router.get(
+    "/{order_id}",
+    response_model=OrderDetailResponse,
+    responses={
+        404: {"model": ErrorResponse, "description": "Заказ не найден"},
+    },
+    summary="Заказ с позициями, платежами, историей и комментариями",
+)
+def get_order(order_id: int, db: Session = Depends(get_read_db)):
+    try:
+        return OrderService.get_order(db, order_id)
+    except ValueError as e:
+        raise _http_error_from_value_error(e)
@@ -0,0 +1,41 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.cache import REFERENCE_MODELS, get_reference_table
+from app.database import get_read_db
+from app.schemas import ErrorResponse, ReferenceItemResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/reference", tags=["reference"])
+
+
+@router.get(
+    "/{table_name}",
+    response_model=list[ReferenceItemResponse],
+    responses={
+        404: {"model": ErrorResponse, "description": "Справочник не найден"},
+    },
+    summary="Получить справочник",
+    description=f"""
+    Возвращает все записи справочника. Справочники кэшируются в памяти процесса.
+    
+    **Доступные справочники:** {", ".join(f"`{name}`" for name in REFERENCE_MODELS)}
+    """,
+)
+def get_reference(
+    table_name: str,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Endpoint для чтения справочника целиком.
+    """
+    if table_name not in REFERENCE_MODELS:
+        logger.warning("Справочник не найден: %s", table_name)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Справочник {table_name} не найден"
+        )
+    return get_reference_table(db, table_name)
@@ -0,0 +1,52 @@
+import logging
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_read_db
+from app.schemas import CategoryChildrenResponse, ClientTotalResponse, TopProductResponse
+from app.services import ReportService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/reports", tags=["reports"])
+
+
+@router.get(
+    "/top-products",
+    response_model=list[TopProductResponse],
+    summary="Самые покупаемые товары",
+    description="""
+    Топ товаров по количеству проданных штук за последние `days` дней
+    с категорией 1-го уровня. Читается из сводной таблицы продаж по дням,
+    которая обновляется заданием `python -m app.jobs refresh-reports`.
+    """,
+)
+def top_products(
+    days: int = Query(30, gt=0, le=3660, description="Период, дней"),
+    limit: int = Query(5, gt=0, le=100, description="Количество товаров"),
+    db: Session = Depends(get_read_db)
+):
+    return ReportService.top_products(db, days=days, limit=limit)
+
+
+@router.get(
+    "/client-totals",
+    response_model=list[ClientTotalResponse],
+    summary="Сумма заказанных товаров по клиентам",
+)
+def client_totals(
+    limit: int = Query(100, gt=0, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db)
+):
+    return ReportService.client_totals(db, limit=limit, offset=offset)
+
+
+@router.get(
+    "/category-children",
+    response_model=list[CategoryChildrenResponse],
+    summary="Количество дочерних категорий первого уровня",
+)
+def category_children(db: Session = Depends(get_read_db)):
+    return ReportService.category_children(db)
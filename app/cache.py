@@ -0,0 +1,278 @@
+"""
+Кэш в памяти процесса для редко меняющихся данных:
+неизменяемые атрибуты товаров (name, price, category_id) и справочники целиком.
+
+Остатки товаров (products.quantity) не кэшируются и всегда читаются из БД.
+Кэш локален для процесса: изменения, сделанные через ORM в этом процессе,
+сбрасывают записи при commit транзакции (события SQLAlchemy; откат изменения
+кэш не трогает), изменения из других процессов и прямым SQL становятся видны
+по истечении TTL или после явной инвалидации.
+"""
+import logging
+import threading
+import time
+
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from config import setting
+from app.models import (
+    Product, OrderStatus, OrderPriority, PaymentMethod, PaymentStatus,
+    DeliveryType, OrderSource
+)
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Потокобезопасный кэш с ограничением размера (вытеснение LRU)
+    и временем жизни записей (TTL) со счетчиками попаданий и промахов.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Возвращает значение из кэша или загружает его через loader.
+        None из loader не кэшируется, чтобы новые записи в БД были видны сразу.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class ProductInfo(NamedTuple):
+    """Неизменяемые атрибуты товара без остатка."""
+    id: int
+    name: str
+    price: Decimal
+    category_id: Optional[int]
+
+
+REFERENCE_MODELS = {
+    model.__tablename__: model
+    for model in (OrderStatus, OrderPriority, PaymentMethod, PaymentStatus, DeliveryType, OrderSource)
+}
+
+
+def _cache_enabled() -> bool:
+    # cache.enabled читается при каждом обращении; размеры и TTL кэшей - при импорте
+    return bool(setting.cache.enabled)
+
+
+product_cache = TTLCache(
+    "products",
+    maxsize=setting.cache.products.maxsize,
+    ttl=setting.cache.products.ttl,
+)
+reference_cache = TTLCache(
+    "reference",
+    maxsize=setting.cache.reference.maxsize,
+    ttl=setting.cache.reference.ttl,
+)
+
+
+def _product_stmt(product_id: int, with_info: bool):
+    columns = (Product.quantity,)
+    if with_info:
+        columns += (Product.id, Product.name, Product.price, Product.category_id)
+    return select(*columns).where(Product.id == product_id)
+
+
+def _split_product_row(product_id: int, row) -> Optional[tuple[ProductInfo, int]]:
+    if row is None:
+        return None
+    info = ProductInfo(row.id, row.name, row.price, row.category_id)
+    if _cache_enabled():
+        product_cache.set(product_id, info)
+    return info, row.quantity
+
+
+def get_product_with_stock(db: Session, product_id: int) -> Optional[tuple[ProductInfo, int]]:
+    """
+    Атрибуты товара и его текущий остаток одним запросом.
+    При попадании в кэш из БД читается только остаток, при промахе -
+    остаток вместе с атрибутами, которые затем кладутся в кэш.
+    None, если товар не найден.
+    """
+    info = product_cache.get(product_id) if _cache_enabled() else None
+    if info is None:
+        return _split_product_row(product_id, db.execute(_product_stmt(product_id, True)).first())
+    quantity = db.execute(_product_stmt(product_id, False)).scalar_one_or_none()
+    if quantity is None:
+        invalidate_product(product_id)
+        return None
+    return info, quantity
+
+
+async def get_product_with_stock_async(db, product_id: int) -> Optional[tuple[ProductInfo, int]]:
+    """
+    Асинхронный вариант get_product_with_stock для AsyncSession.
+    """
+    info = product_cache.get(product_id) if _cache_enabled() else None
+    if info is None:
+        row = (await db.execute(_product_stmt(product_id, True))).first()
+        return _split_product_row(product_id, row)
+    quantity = (await db.execute(_product_stmt(product_id, False))).scalar_one_or_none()
+    if quantity is None:
+        invalidate_product(product_id)
+        return None
+    return info, quantity
+
+
+def get_reference_table(db: Session, table_name: str) -> list[dict[str, Any]]:
+    """
+    Все строки справочника (упорядочены по id). Справочник кэшируется целиком.
+    """
+    model = REFERENCE_MODELS[table_name]
+
+    def load() -> list[dict[str, Any]]:
+        columns = model.__table__.c
+        return [
+            dict(row._mapping)
+            for row in db.execute(select(columns).order_by(columns.id))
+        ]
+
+    if not _cache_enabled():
+        return load()
+    return reference_cache.get_or_load(table_name, load)
+
+
+def invalidate_product(product_id: Optional[int] = None) -> None:
+    """
+    Сбрасывает атрибуты одного товара или всех товаров.
+    """
+    if product_id is None:
+        product_cache.clear()
+    else:
+        product_cache.invalidate(product_id)
+
+
+def invalidate_reference(table_name: Optional[str] = None) -> None:
+    """
+    Сбрасывает один справочник или все справочники.
+    """
+    if table_name is None:
+        reference_cache.clear()
+    else:
+        reference_cache.invalidate(table_name)
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    return {cache.name: cache.stats() for cache in (product_cache, reference_cache)}
+
+
+# Ключи, измененные в транзакции сессии: сбрасываются после commit. Событие flush
+# приходит до commit - сброс в нем дал бы параллельному запросу перечитать
+# прежние зафиксированные значения и держать их весь TTL
+_PENDING_KEY = "cache_invalidations"
+
+
+def _invalidate_on_commit(target, key: tuple[str, Any]) -> None:
+    session = object_session(target)
+    if session is None:
+        _invalidate(key)
+        return
+    session.info.setdefault(_PENDING_KEY, set()).add(key)
+
+
+def _invalidate(key: tuple[str, Any]) -> None:
+    kind, value = key
+    if kind == "product":
+        invalidate_product(value)
+    else:
+        invalidate_reference(value)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session) -> None:
+    for key in session.info.pop(_PENDING_KEY, ()):
+        _invalidate(key)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _on_rollback(session, previous_transaction) -> None:
+    # Откат всей транзакции: изменения не зафиксированы, кэш остается.
+    # Откат точки сохранения ключи не снимает - лишний сброс безопасен
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+@event.listens_for(Product, "after_update")
+def _on_product_updated(mapper, connection, target) -> None:
+    # Изменение только остатка или резерва не затрагивает кэшируемые атрибуты
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ProductInfo._fields):
+        _invalidate_on_commit(target, ("product", target.id))
+
+
+@event.listens_for(Product, "after_delete")
+def _on_product_deleted(mapper, connection, target) -> None:
+    _invalidate_on_commit(target, ("product", target.id))
+
+
+def _on_reference_changed(mapper, connection, target) -> None:
+    _invalidate_on_commit(target, ("reference", target.__tablename__))
+
+
+for _model in REFERENCE_MODELS.values():
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _on_reference_changed)
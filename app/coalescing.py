@@ -0,0 +1,137 @@
+"""
+Объединение параллельных запросов add-item в один заказ (coalescing.enabled).
+
+Первый запрос к заказу становится ведущим: он ждет coalescing.window_ms
+(или пока не наберется max_batch_size запросов), затем выполняет все накопленные
+запросы к этому заказу одной транзакцией OrderService.add_item_rows
+(одинаковые товары сливаются в одну позицию) и раздает результаты ожидающим.
+Вместо сотен транзакций, конкурирующих за строки одного заказа, выполняется одна.
+
+Если пакет не прошел целиком (например, не хватает остатка одного из товаров),
+запросы пакета выполняются по одному, и каждый получает собственный результат или ошибку.
+
+Режим рассчитан на синхронный обработчик: ожидающие запросы занимают потоки
+пула FastAPI на время окна.
+"""
+import logging
+import threading
+
+from concurrent.futures import Future
+from typing import Optional
+
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from config import setting
+from app.schemas import AddItemToOrderRequest, BulkAddItemsRequest
+from app.services import OrderService
+
+logger = logging.getLogger(__name__)
+
+
+def coalescing_enabled() -> bool:
+    """
+    coalescing.enabled на момент вызова (меняется без перезапуска).
+    """
+    return bool(getattr(setting.coalescing, "enabled", False))
+
+
+class _Batch:
+    __slots__ = ("requests", "futures", "closed")
+
+    def __init__(self):
+        self.requests: list[AddItemToOrderRequest] = []
+        self.futures: list[Future] = []
+        self.closed = threading.Event()
+
+
+class AddItemCoalescer:
+    """
+    Накопление запросов add-item по order_id и выполнение их пакетами.
+    """
+
+    def __init__(self, window_ms: float, max_batch_size: int, reserve_stock: Optional[bool] = None):
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.reserve_stock = reserve_stock
+        self._pending: dict[int, _Batch] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.fallbacks = 0
+
+    def add_item(self, db: Session, request: AddItemToOrderRequest) -> Row:
+        """
+        Добавляет товар в заказ в составе пакета. Сессия db используется,
+        только если запрос стал ведущим для своего пакета.
+        """
+        future: Future = Future()
+        with self._lock:
+            self.requests += 1
+            batch = self._pending.get(request.order_id)
+            leader = batch is None
+            if leader:
+                batch = self._pending[request.order_id] = _Batch()
+            batch.requests.append(request)
+            batch.futures.append(future)
+            if len(batch.requests) >= self.max_batch_size:
+                del self._pending[request.order_id]
+                batch.closed.set()
+
+        if leader:
+            batch.closed.wait(self.window)
+            with self._lock:
+                if self._pending.get(request.order_id) is batch:
+                    del self._pending[request.order_id]
+            self._execute(db, batch)
+        return future.result()
+
+    def _execute(self, db: Session, batch: _Batch) -> None:
+        with self._lock:
+            self.batches += 1
+        try:
+            if len(batch.requests) == 1:
+                self._execute_one(db, batch.requests[0], batch.futures[0])
+                return
+            try:
+                rows = OrderService.add_item_rows(
+                    db, BulkAddItemsRequest(items=batch.requests), reserve_stock=self.reserve_stock
+                )
+            except Exception as e:
+                db.rollback()
+                with self._lock:
+                    self.fallbacks += 1
+                logger.warning(
+                    "Пакет add-item не выполнен целиком (%s), запросы выполняются по одному: "
+                    "order_id=%s, запросов=%s", e, batch.requests[0].order_id, len(batch.requests)
+                )
+                for request, future in zip(batch.requests, batch.futures):
+                    self._execute_one(db, request, future)
+                return
+            for future, item in zip(batch.futures, rows):
+                future.set_result(item)
+            logger.debug(
+                "Пакет add-item выполнен: order_id=%s, запросов=%s",
+                batch.requests[0].order_id, len(batch.requests)
+            )
+        finally:
+            # Ожидающие не должны зависнуть ни при какой ошибке ведущего
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(RuntimeError("Пакет add-item не выполнен"))
+
+    def _execute_one(self, db: Session, request: AddItemToOrderRequest, future: Future) -> None:
+        try:
+            future.set_result(OrderService.add_item_to_order(db, request, reserve_stock=self.reserve_stock))
+        except Exception as e:
+            future.set_exception(e)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "batches": self.batches, "fallbacks": self.fallbacks}
+
+
+add_item_coalescer = AddItemCoalescer(
+    window_ms=setting.coalescing.window_ms,
+    max_batch_size=setting.coalescing.max_batch_size,
+)
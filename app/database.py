@@ -1,54 +1,239 @@
 import logging
 import os
+import threading
 
-from sys import exit
+from typing import Optional
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from pydantic_settings import BaseSettings
+from sqlalchemy.pool import NullPool
 
 from config import setting
+from app.replicas import ReplicaSet, RoutingSession
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 
-database_url: str = setting.database.database_url
-
-
-if "@" not in database_url:
-    msg = "Не верная срока подключения"
-    logger.error(msg)
-    exit(1)
-
-database_url = database_url
-if not database_url.endswith("/orders_db"):
-    url_parts = database_url.split("/")
-    db_name = url_parts[-1] if url_parts else None
-    if db_name and db_name != setting.database.name:
-        msg = f"Имя базы данных в URL: '{db_name}', ожидается 'orders_db'"
-        logger.warning(f"Имя базы данных в URL: '{db_name}', ожидается 'orders_db'")
-
-db_url_parts = database_url.split("@")
-try:
-    engine = create_engine(
-        database_url,
-        pool_pre_ping=setting.engine.pool_pre_ping or 10,
-        pool_size=setting.engine.pool_size or 10,
-        max_overflow=setting.engine.max_overflow or 10,
-        connect_args={
-            "connect_timeout": setting.engine.connect_args.connect_timeout or 10
-        }
+def database_url() -> str:
+    """
+    Строка подключения database.database_url с проверкой.
+    Проверяется при создании engine, а не при импорте модуля:
+    неверная строка - исключение при запуске приложения или задания.
+    """
+    url: str = setting.database.database_url
+    if "@" not in url:
+        raise ValueError("Неверная строка подключения database.database_url")
+    db_name = url.rsplit("/", 1)[-1]
+    if not url.endswith("/orders_db") and db_name and db_name != setting.database.name:
+        logger.warning("Имя базы данных в URL: '%s', ожидается '%s'", db_name, setting.database.name)
+    return url
+
+
+def worker_count() -> int:
+    """
+    Число процессов сервера: WEB_CONCURRENCY (выставляет gunicorn.conf.py,
+    по нему же uvicorn --workers выбирает число процессов по умолчанию).
+    """
+    return max(int(os.getenv("WEB_CONCURRENCY") or 1), 1)
+
+
+def pool_limits() -> tuple[int, int]:
+    """
+    pool_size и max_overflow пула процесса.
+
+    engine.connection_budget - сколько соединений с одним сервером БД могут открыть
+    все процессы приложения вместе (меньше max_connections PostgreSQL с запасом
+    для заданий и администрирования). Пул процесса (pool_size + max_overflow)
+    ограничивается долей бюджета на процесс и на engine процесса
+    (в database.mode: async их два - синхронный и асинхронный).
+    """
+    pool_size = setting.engine.pool_size or 10
+    max_overflow = setting.engine.max_overflow or 10
+    budget = getattr(setting.engine, "connection_budget", 0) or 0
+    if budget:
+        engines = 2 if getattr(setting.database, "mode", "sync") == "async" else 1
+        per_engine = budget // (worker_count() * engines)
+        if per_engine < 1:
+            logger.warning(
+                "Бюджет соединений %s меньше числа процессов (%s) и engine (%s): по одному соединению",
+                budget, worker_count(), engines
+            )
+            per_engine = 1
+        pool_size = min(pool_size, per_engine)
+        max_overflow = min(max_overflow, per_engine - pool_size)
+    return pool_size, max_overflow
+
+
+def engine_options(async_driver: bool = False) -> dict:
+    """
+    Параметры create_engine / create_async_engine из секции engine.
+
+    engine.pool: queue - пул соединений процесса (QueuePool);
+                 null  - без пула (NullPool), соединение открывается на каждый запрос;
+                         для работы через PgBouncer, который сам держит пул.
+    pool_pre_ping проверяет соединение лишним запросом при каждой выдаче из пула;
+    без него устаревшие соединения отсекаются по возрасту (pool_recycle).
+    """
+    connect_timeout = setting.engine.connect_args.connect_timeout or 10
+    options = {
+        "pool_pre_ping": bool(setting.engine.pool_pre_ping),
+        "connect_args": {"timeout" if async_driver else "connect_timeout": connect_timeout},
+    }
+    if getattr(setting.engine, "pool", "queue") == "null":
+        options["poolclass"] = NullPool
+        if async_driver:
+            # PgBouncer в режиме transaction не сохраняет подготовленные выражения asyncpg
+            options["connect_args"]["statement_cache_size"] = 0
+        return options
+    pool_size, max_overflow = pool_limits()
+    options.update(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=getattr(setting.engine, "pool_recycle", -1) or -1,
+        pool_timeout=getattr(setting.engine, "pool_timeout", 30) or 30,
+        pool_use_lifo=bool(getattr(setting.engine, "pool_use_lifo", False)),
     )
-except Exception as e:
-    logger.error("%s", e, exc_info=True)
+    return options
+
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Асинхронный стек (database.mode: async): asyncpg вместо psycopg2.
+# При импорте: обработчик add-item выбирается при создании приложения (меняется перезапуском)
+ASYNC_MODE: bool = getattr(setting.database, "mode", "sync") == "async"
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Заменяет синхронный драйвер в URL на асинхронный:
+    postgresql+psycopg2:// -> postgresql+asyncpg://
+    """
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS[parsed.get_backend_name()]).render_as_string(
+        hide_password=False
+    )
+
+
+class _LazySessionMaker(sessionmaker):
+    """
+    sessionmaker, который перед первой сессией создает engine (init_database).
+    """
+
+    def __call__(self, **local_kw):
+        init_database()
+        return super().__call__(**local_kw)
+
+
+# Engine создаются не при импорте, а в lifespan приложения (app.main)
+# или при первом обращении: импорт модуля не открывает и не проверяет подключение
+_init_lock = threading.Lock()
+_engine: Optional[Engine] = None
+_replicas: Optional[ReplicaSet] = None
+_async_engine = None
+# max_overflow, с которым созданы пулы engine процесса (None - engine.pool: null)
+_pool_max_overflow: Optional[int] = None
+
+SessionLocal = _LazySessionMaker(autocommit=False, autoflush=False)
+# Реплики только для чтения (database.replica_urls): обработчики чтения и отчеты
+ReadSessionLocal = _LazySessionMaker(class_=RoutingSession, autocommit=False, autoflush=False)
+AsyncSessionLocal = None
+
+
+def init_database() -> Engine:
+    """
+    Создает engine основного сервера, реплик и (database.mode: async) асинхронный
+    и привязывает к ним фабрики сессий. Соединения при этом не открываются.
+    Повторный вызов возвращает уже созданный engine.
+    """
+    global _engine, _replicas, _async_engine, _pool_max_overflow, AsyncSessionLocal
+
+    if _engine is not None:
+        return _engine
+    with _init_lock:
+        if _engine is not None:
+            return _engine
+        url = database_url()
+        options = engine_options()
+        engine = create_engine(url, **options)
+        if getattr(setting.engine, "pool", "queue") != "null":
+            logger.info(
+                "Пул соединений процесса: pool_size=%s, max_overflow=%s, процессов=%s",
+                *pool_limits(), worker_count()
+            )
+        replicas = ReplicaSet(
+            [create_engine(replica_url, **options)
+             for replica_url in getattr(setting.database, "replica_urls", None) or []],
+            eject_seconds=float(getattr(setting.database, "replica_eject_seconds", 30)),
+        )
+        SessionLocal.configure(bind=engine)
+        ReadSessionLocal.configure(bind=engine, replicas=replicas)
+        if ASYNC_MODE:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            _async_engine = create_async_engine(to_async_url(url), **engine_options(async_driver=True))
+            # expire_on_commit=False: после commit атрибуты не перечитываются неявным await
+            AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+        _replicas = replicas
+        _pool_max_overflow = options.get("max_overflow")
+        _engine = engine
+    return _engine
+
+
+def get_engine() -> Engine:
+    """
+    Engine основного сервера (создается при первом обращении).
+    """
+    return _engine if _engine is not None else init_database()
+
+
+def pool_max_overflow() -> Optional[int]:
+    """
+    max_overflow, с которым созданы пулы engine (None, если engine.pool: null).
+    """
+    init_database()
+    return _pool_max_overflow
+
+
+def get_replicas() -> ReplicaSet:
+    """
+    Реплики для чтения (пустой ReplicaSet, если database.replica_urls не заданы).
+    """
+    init_database()
+    return _replicas
+
+
+def get_async_engine():
+    """
+    Асинхронный engine (None, если database.mode не async).
+    """
+    init_database()
+    return _async_engine
+
+
+def dispose_engines(close: bool = True) -> None:
+    """
+    Закрывает пулы уже созданных engine, не созданные не создаются.
+    close=False - после fork: соединения родительского процесса не закрываются, а забываются.
+    Асинхронный engine с close=True закрывается dispose_async_engine.
+    """
+    if _engine is None:
+        return
+    for target in (_engine, *_replicas.engines):
+        target.dispose(close=close)
+    if _async_engine is not None and not close:
+        _async_engine.sync_engine.dispose(close=False)
+
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
 
 def get_db():
     db = SessionLocal()
@@ -56,3 +241,76 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """
+    Сессия обработчиков только на чтение: запросы идут на реплики,
+    после записи в той же сессии - на основной сервер.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    init_database()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_stats(target_engine=None) -> dict:
+    """
+    Состояние пула соединений engine (по умолчанию - основного).
+    """
+    pool = (target_engine or get_engine()).pool
+    stats = {"pool": type(pool).__name__}
+    if hasattr(pool, "size"):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    return stats
+
+
+def warm_up_pool(count: int = None) -> int:
+    """
+    Открывает count соединений (по умолчанию pool_size) и возвращает их в пул,
+    чтобы первые запросы после старта не ждали установки соединения.
+    """
+    engine = get_engine()
+    if not hasattr(engine.pool, "size"):
+        return 0
+    count = count or engine.pool.size()
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+    logger.info("Пул соединений прогрет: соединений=%s", len(connections))
+    return len(connections)
+
+
+async def warm_up_async_pool(count: int = None) -> int:
+    """
+    Асинхронный вариант warm_up_pool для async_engine.
+    """
+    async_engine = get_async_engine()
+    if async_engine is None or not hasattr(async_engine.pool, "size"):
+        return 0
+    count = count or async_engine.pool.size()
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(await async_engine.connect())
+    finally:
+        for connection in connections:
+            await connection.close()
+    logger.info("Асинхронный пул соединений прогрет: соединений=%s", len(connections))
+    return len(connections)
@@ -0,0 +1,193 @@
+"""
+Потоковая выгрузка заказов с позициями в NDJSON или CSV.
+
+Заказы читаются страницами с keyset-пагинацией по orders.id (id больше последнего
+выгруженного, ORDER BY id LIMIT page_size), страница - одним запросом
+orders LEFT JOIN order_items через серверный курсор (stream_results, yield_per).
+Транзакция завершается после каждой страницы, поэтому выгрузка не держит снимок БД
+часами. В памяти находятся только строки одной порции курсора и буфер вывода,
+объем выгрузки на расход памяти не влияет.
+
+Форматы:
+- ndjson - строка JSON на заказ, позиции в массиве items;
+- csv    - строка на позицию, поля заказа повторяются, поля позиции с префиксом item_
+  (заказ без позиций - одна строка с пустыми полями позиции).
+"""
+import csv
+import io
+import json
+import logging
+import time
+import zlib
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterator
+
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+
+from config import setting
+from app.models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+_ORDER_COLUMNS = tuple(Order.__table__.c)
+_ITEM_COLUMNS = tuple(
+    column for column in OrderItem.__table__.c if column.name not in ("order_id", "order_date")
+)
+ORDER_FIELDS = tuple(column.name for column in _ORDER_COLUMNS)
+ITEM_FIELDS = tuple(column.name for column in _ITEM_COLUMNS)
+CSV_HEADER = ORDER_FIELDS + tuple(f"item_{name}" for name in ITEM_FIELDS)
+
+
+def export_filename(export_format: str, compress: bool) -> str:
+    return f"orders.{export_format}" + (".gz" if compress else "")
+
+
+def _page_stmt(after_id: int, page_size: int):
+    """
+    Страница заказов с id > after_id вместе с позициями, в порядке (order.id, item.id).
+    """
+    orders = Order.__table__
+    order_items = OrderItem.__table__
+    page = (
+        select(orders.c.id, orders.c.order_date)
+        .where(orders.c.id > after_id)
+        .order_by(orders.c.id)
+        .limit(page_size)
+        .subquery()
+    )
+    return (
+        select(*_ORDER_COLUMNS, *(column.label(f"item_{column.name}") for column in _ITEM_COLUMNS))
+        .select_from(
+            page
+            .join(orders, and_(orders.c.id == page.c.id, orders.c.order_date == page.c.order_date))
+            .outerjoin(order_items, and_(
+                order_items.c.order_id == orders.c.id, order_items.c.order_date == orders.c.order_date
+            ))
+        )
+        .order_by(orders.c.id, order_items.c.id)
+    )
+
+
+def iter_orders(
+    db: Session,
+    after_id: int = 0,
+    page_size: int = 10_000,
+    yield_per: int = 1_000,
+) -> Iterator[tuple[tuple, list[tuple]]]:
+    """
+    Заказы с id > after_id в порядке id: пары (значения ORDER_FIELDS, список значений ITEM_FIELDS).
+    """
+    order_width = len(_ORDER_COLUMNS)
+    while True:
+        result = db.execute(
+            _page_stmt(after_id, page_size),
+            execution_options={"stream_results": True, "yield_per": yield_per},
+        )
+        order, items, orders_in_page = None, [], 0
+        for rows in result.partitions():
+            for row in rows:
+                if order is None or row[0] != order[0]:
+                    if order is not None:
+                        yield order, items
+                    order, items = tuple(row[:order_width]), []
+                    orders_in_page += 1
+                if row[order_width] is not None:
+                    items.append(tuple(row[order_width:]))
+        # Транзакция только читает: завершение освобождает снимок между страницами
+        db.rollback()
+        if order is None:
+            return
+        yield order, items
+        if orders_in_page < page_size:
+            return
+        after_id = order[0]
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _ndjson_writer(buffer: io.StringIO):
+    def write(order: tuple, items: list[tuple]) -> int:
+        record = dict(zip(ORDER_FIELDS, order))
+        record["items"] = [dict(zip(ITEM_FIELDS, item)) for item in items]
+        buffer.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=_json_value))
+        buffer.write("\n")
+        return len(items)
+    return write
+
+
+def _csv_writer(buffer: io.StringIO):
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    empty_item = (None,) * len(ITEM_FIELDS)
+
+    def write(order: tuple, items: list[tuple]) -> int:
+        if items:
+            writer.writerows(order + item for item in items)
+        else:
+            writer.writerow(order + empty_item)
+        return len(items)
+    return write
+
+
+def export_orders(
+    db: Session,
+    export_format: str = "ndjson",
+    compress: bool = False,
+    after_id: int = 0,
+) -> Iterator[bytes]:
+    """
+    Выгрузка заказов порциями байт для StreamingResponse или записи в файл.
+    compress=True - поток в формате gzip. Размеры страницы, порции курсора
+    и буфера вывода - секция export в setting.yaml.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {export_format}")
+    page_size = getattr(setting.export, "page_size", 10_000)
+    yield_per = getattr(setting.export, "yield_per", 1_000)
+    chunk_size = getattr(setting.export, "chunk_size", 65_536)
+
+    buffer = io.StringIO()
+    write = _ndjson_writer(buffer) if export_format == "ndjson" else _csv_writer(buffer)
+    # wbits=31 - zlib с заголовком gzip
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    orders = items = written = 0
+    started = time.perf_counter()
+
+    def flush() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    logger.info("Выгрузка заказов: формат=%s, gzip=%s, после id=%s", export_format, compress, after_id)
+    for order, order_items in iter_orders(db, after_id, page_size, yield_per):
+        items += write(order, order_items)
+        orders += 1
+        if buffer.tell() >= chunk_size:
+            chunk = flush()
+            if chunk:
+                written += len(chunk)
+                yield chunk
+    chunk = flush() + (compressor.flush() if compressor else b"")
+    if chunk:
+        written += len(chunk)
+        yield chunk
+    logger.info(
+        "Выгрузка заказов завершена: заказов=%s, позиций=%s, байт=%s, время=%.1f с",
+        orders, items, written, time.perf_counter() - started
+    )
@@ -0,0 +1,60 @@
+"""
+Проверка готовности сервиса (/health/ready): доступность БД, задержка
+простого запроса, состояние пула соединений и реплик для чтения.
+
+Результат кэшируется на health.ready_cache_seconds: при частых пробах
+балансировщика к БД обращается только одна проверка за период,
+остальные получают сохраненный ответ.
+"""
+import logging
+import threading
+import time
+
+from typing import Any, Optional
+
+from sqlalchemy import text
+
+from config import setting
+from app.database import get_engine, get_replicas, pool_stats
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_cached: Optional[tuple[float, dict[str, Any]]] = None
+
+
+def _check_database() -> dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        with get_engine().connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.error("Проверка готовности: БД недоступна: %s", e)
+        return {"status": "unavailable", "database": {"ok": False, "error": str(e)}}
+    return {
+        "status": "ok",
+        "database": {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)},
+    }
+
+
+def readiness() -> dict[str, Any]:
+    """
+    Результат проверки готовности; проверка БД выполняется не чаще раза
+    в health.ready_cache_seconds, параллельные пробы ждут одну проверку.
+    """
+    global _cached
+
+    with _lock:
+        now = time.monotonic()
+        cache_seconds = float(getattr(setting.health, "ready_cache_seconds", 2))
+        if _cached is None or now - _cached[0] >= cache_seconds:
+            result = _check_database()
+            result["checked_at"] = time.time()
+            _cached = (now, result)
+        checked_at, result = _cached
+    response = {**result, "cache_age_seconds": round(time.monotonic() - checked_at, 3), "pool": pool_stats()}
+    replicas = get_replicas()
+    if replicas:
+        # Недоступная реплика не влияет на готовность: чтение переходит на другие или основной сервер
+        response["replicas"] = replicas.stats()
+    return response
@@ -0,0 +1,178 @@
+"""
+Идемпотентность POST /api/orders/add-item по заголовку Idempotency-Key.
+
+Ключи хранятся в таблице idempotency_keys, общей для всех процессов сервера:
+- запрос с ключом первым делом вставляет строку ключа (begin) в своей транзакции.
+  Параллельный запрос с тем же ключом из любого процесса ждет на уникальном ключе,
+  пока первая транзакция не завершится;
+- ответ записывается в строку ключа (record_stmt) в той же транзакции, что и позиция
+  заказа: фиксируются оба или ни одно - ошибка откатывает и ключ, и его можно повторить;
+- повтор с тем же ключом и телом получает сохраненный ответ без изменения заказа,
+  с другим телом - 422. Повтор, пришедший в тот же процесс, пока первый запрос
+  еще выполняется, сразу получает 409, не занимая соединение с БД.
+
+Ключ старше idempotency.ttl секунд используется как новый; старые строки удаляет
+python -m app.jobs purge-idempotency-keys.
+"""
+import threading
+
+from datetime import UTC, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import setting
+from app.models import IdempotencyKey
+from app.responses import dumps, rows_to_dicts
+from app.schemas import OrderItemResponse
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotency-Replayed"
+
+
+class IdempotencyConflict(Exception):
+    """
+    Ключ идемпотентности нельзя использовать для этого запроса.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _now() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+class IdempotencyStore:
+    """
+    Ключи запросов в таблице idempotency_keys и ключи, выполняющиеся в этом процессе.
+    """
+
+    def __init__(self):
+        self._in_flight: set[str] = set()
+        self._lock = threading.Lock()
+        self.claimed = 0
+        self.replayed = 0
+        self.conflicts = 0
+
+    @staticmethod
+    def _ttl() -> float:
+        return float(getattr(setting.idempotency, "ttl", 86400))
+
+    @staticmethod
+    def _claim_stmt(dialect_name: str, key: str, fingerprint: str):
+        """
+        Вставка строки ключа; занятый ключ перезаписывается, только если он старше TTL.
+        Строка RETURNING есть, если ключ получен этим запросом.
+        """
+        table = IdempotencyKey.__table__
+        insert_ = sqlite_insert if dialect_name == "sqlite" else postgresql_insert
+        now = _now()
+        stmt = insert_(table).values(key=key, fingerprint=fingerprint, response=None, created_at=now)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={"fingerprint": stmt.excluded.fingerprint, "response": None, "created_at": stmt.excluded.created_at},
+            where=table.c.created_at < now - timedelta(seconds=IdempotencyStore._ttl()),
+        ).returning(table.c.key)
+
+    @staticmethod
+    def _saved_stmt(key: str):
+        table = IdempotencyKey.__table__
+        return select(table.c.fingerprint, table.c.response).where(table.c.key == key)
+
+    @staticmethod
+    def record_stmt(key: str, item: Row):
+        """
+        Запись ответа (позиция заказа из RETURNING) в строку ключа;
+        выполняется в транзакции, изменившей заказ.
+        """
+        table = IdempotencyKey.__table__
+        response = dumps(rows_to_dicts([item], OrderItemResponse.model_fields)[0]).decode()
+        return update(table).where(table.c.key == key).values(response=response)
+
+    @staticmethod
+    def purge_stmt():
+        table = IdempotencyKey.__table__
+        return delete(table).where(table.c.created_at < _now() - timedelta(seconds=IdempotencyStore._ttl()))
+
+    def _enter(self, key: str) -> None:
+        with self._lock:
+            if key in self._in_flight:
+                self.conflicts += 1
+                raise IdempotencyConflict(409, f"Запрос с {IDEMPOTENCY_HEADER} {key} еще выполняется")
+            self._in_flight.add(key)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _replay(self, key: str, fingerprint: str, saved: Optional[Row]) -> str:
+        """
+        Сохраненный ответ (JSON) для ключа, который уже занят другим запросом.
+        """
+        if saved is not None and saved.fingerprint != fingerprint:
+            self._count("conflicts")
+            raise IdempotencyConflict(
+                422, f"{IDEMPOTENCY_HEADER} {key} уже использован с другими параметрами запроса"
+            )
+        if saved is None or saved.response is None:
+            self._count("conflicts")
+            raise IdempotencyConflict(409, f"Запрос с {IDEMPOTENCY_HEADER} {key} еще выполняется")
+        self._count("replayed")
+        return saved.response
+
+    def begin(self, db: Session, key: str, fingerprint: str) -> Optional[str]:
+        """
+        Занимает ключ в транзакции сессии db и возвращает None - запрос нужно выполнить,
+        записать ответ record_stmt и по завершении вызвать release();
+        либо возвращает сохраненный ответ (JSON) для повтора.
+        """
+        self._enter(key)
+        try:
+            if db.execute(self._claim_stmt(db.get_bind().dialect.name, key, fingerprint)).first() is not None:
+                self._count("claimed")
+                return None
+            replay = self._replay(key, fingerprint, db.execute(self._saved_stmt(key)).first())
+        except BaseException:
+            self.release(key)
+            raise
+        self.release(key)
+        return replay
+
+    async def begin_async(self, db: AsyncSession, key: str, fingerprint: str) -> Optional[str]:
+        """
+        Асинхронный вариант begin.
+        """
+        self._enter(key)
+        try:
+            if (await db.execute(self._claim_stmt(db.bind.dialect.name, key, fingerprint))).first() is not None:
+                self._count("claimed")
+                return None
+            replay = self._replay(key, fingerprint, (await db.execute(self._saved_stmt(key))).first())
+        except BaseException:
+            self.release(key)
+            raise
+        self.release(key)
+        return replay
+
+    def release(self, key: str) -> None:
+        """
+        Снимает отметку выполнения ключа в процессе. Строку ключа фиксирует
+        или откатывает транзакция запроса.
+        """
+        with self._lock:
+            self._in_flight.discard(key)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"claimed": self.claimed, "replayed": self.replayed, "conflicts": self.conflicts}
+
+
+idempotency_store = IdempotencyStore()
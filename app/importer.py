@@ -0,0 +1,378 @@
+"""
+Массовая загрузка категорий, товаров, клиентов и истории заказов из CSV/NDJSON.
+
+Файл (.csv, .ndjson/.jsonl, в том числе .gz) читается потоково порциями
+по import.chunk_size записей. Для каждой порции:
+1. значения приводятся к типам колонок модели, пустые заполняются значениями по умолчанию;
+2. порция проверяется целиком по множествам значений: ссылки на связанные таблицы
+   и уникальные ключи - один запрос на ключ для всей порции, а не на строку;
+3. принятые строки загружаются COPY ... FROM STDIN (PostgreSQL/psycopg2) или пакетом
+   insert (SQLite), в той же транзакции обновляется отметка import_checkpoints.
+
+Отклоненные строки с причиной пишутся в <файл>.rejected.ndjson. После сбоя повторный
+запуск продолжает с первой незагруженной порции. ID из файла сохраняются (ссылки между
+файлами), последовательности id выставляются после загрузки. order_date позиций и других
+дочерних строк заказа берется из заказа.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import time
+
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple, Optional
+
+from sqlalchemy import PrimaryKeyConstraint, UniqueConstraint, func, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+
+from config import setting
+from app.database import get_engine
+from app.models import Category, Client, ImportCheckpoint, Order, OrderItem, Product
+
+logger = logging.getLogger(__name__)
+
+# Порядок загрузки: таблица ссылается только на загруженные раньше
+IMPORT_MODELS = {
+    "categories": Category,
+    "products": Product,
+    "clients": Client,
+    "orders": Order,
+    "order_items": OrderItem,
+}
+# NULL в COPY: пустая строка в файле остается пустой строкой
+_COPY_NULL = r"\N"
+
+
+class ImportResult(NamedTuple):
+    table: str
+    rows: int
+    loaded: int
+    rejected: int
+    seconds: float
+    # Диапазон ID заказов загруженных позиций - для пересчета итогов
+    order_ids: Optional[tuple[int, int]] = None
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    normalized = str(value).strip().lower()
+    if normalized in ("1", "true", "t", "yes", "y"):
+        return True
+    if normalized in ("0", "false", "f", "no", "n"):
+        return False
+    raise ValueError(f"ожидается логическое значение: {value!r}")
+
+
+def _to_datetime(value: Any) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def _to_date(value: Any) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _to_str(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def _converter(column) -> Callable[[Any], Any]:
+    python_type = column.type.python_type
+    return {
+        bool: _to_bool,
+        datetime: _to_datetime,
+        date: _to_date,
+        Decimal: lambda value: Decimal(str(value)),
+        str: _to_str,
+    }.get(python_type, python_type)
+
+
+def _read_records(path: Path) -> Iterator[dict]:
+    opener = gzip.open if path.suffix == ".gz" else open
+    name = path.stem if path.suffix == ".gz" else path.name
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        if name.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _chunks(records: Iterator[dict], size: int) -> Iterator[list[dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class TableImporter:
+    """
+    Проверка и загрузка порций записей одной таблицы.
+    """
+
+    def __init__(self, table_name: str):
+        self.table = IMPORT_MODELS[table_name].__table__
+        # order_date дочерних строк заказа не загружается из файла, а берется из заказа
+        self.derives_order_date = "order_date" in self.table.c and "order_id" in self.table.c
+        self.columns = [
+            column for column in self.table.columns
+            if not (self.derives_order_date and column.name == "order_date")
+        ]
+        self.converters = {column.name: _converter(column) for column in self.columns}
+        self.defaults = {
+            column.name: column.default
+            for column in self.columns
+            if column.default is not None and not column.primary_key
+        }
+        self.required = [
+            column.name for column in self.columns
+            if not column.nullable and not column.primary_key
+            and column.name not in self.defaults and column.server_default is None
+        ]
+        self.foreign_keys = [
+            (column.name, next(iter(column.foreign_keys)).column)
+            for column in self.columns if column.foreign_keys
+        ]
+        self.unique_keys = [
+            tuple(column.name for column in constraint.columns)
+            for constraint in self.table.constraints
+            if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint)) and constraint.columns
+        ]
+
+    def check_header(self, record: dict) -> None:
+        unknown = set(record) - {column.name for column in self.table.columns}
+        if unknown:
+            raise ValueError(f"Неизвестные колонки таблицы {self.table.name}: {', '.join(sorted(map(str, unknown)))}")
+
+    def _convert(self, record: dict) -> dict:
+        row = {}
+        for name, convert in self.converters.items():
+            value = record.get(name)
+            if value is None or value == "":
+                default = self.defaults.get(name)
+                if default is not None and default.is_scalar:
+                    value = default.arg
+                elif default is not None and default.is_callable:
+                    value = default.arg(None)
+                else:
+                    value = None
+            else:
+                try:
+                    value = convert(value)
+                except (ValueError, TypeError, ArithmeticError):
+                    raise ValueError(f"{name}: некорректное значение {value!r}")
+            row[name] = value
+        missing = [name for name in self.required if row[name] is None]
+        if missing:
+            raise ValueError(f"не заполнены обязательные поля: {', '.join(missing)}")
+        return row
+
+    def _existing(self, conn: Connection, columns: tuple[str, ...], values: set) -> set:
+        if not values:
+            return set()
+        table_columns = [self.table.c[name] for name in columns]
+        if len(columns) == 1:
+            condition = table_columns[0].in_([value[0] for value in values])
+        else:
+            condition = tuple_(*table_columns).in_(list(values))
+        return set(conn.execute(select(*table_columns).where(condition)).all())
+
+    def validate(self, conn: Connection, records: list[dict]) -> tuple[list[dict], list[tuple[dict, str]]]:
+        """
+        Проверяет порцию: возвращает (строки для загрузки, [(запись, причина)]).
+        """
+        rows, rejected = [], []
+        for record in records:
+            try:
+                rows.append((record, self._convert(record)))
+            except ValueError as e:
+                rejected.append((record, str(e)))
+
+        for column_name, target in self.foreign_keys:
+            values = {row[column_name] for _, row in rows if row[column_name] is not None}
+            if not values:
+                continue
+            if target.table is self.table:
+                # Ссылка внутри таблицы (categories.parent_id): на строки порции или уже загруженные
+                known = {row[target.name] for _, row in rows}
+                known |= set(conn.execute(select(target).where(target.in_(values - known))).scalars())
+            elif self.derives_order_date and column_name == "order_id":
+                order_dates = dict(conn.execute(
+                    select(target.table.c.id, target.table.c.order_date).where(target.in_(values))
+                ).all())
+                for _, row in rows:
+                    row["order_date"] = order_dates.get(row["order_id"])
+                known = set(order_dates)
+            else:
+                known = set(conn.execute(select(target).where(target.in_(values))).scalars())
+            checked = []
+            for record, row in rows:
+                if row[column_name] is None or row[column_name] in known:
+                    checked.append((record, row))
+                else:
+                    rejected.append((record, f"{column_name}: нет строки {target.table.name}.{target.name}={row[column_name]}"))
+            rows = checked
+
+        for key in self.unique_keys:
+            # Ключ с NULL (например, id назначит последовательность) не конфликтует
+            values = {
+                record_id: tuple(row.get(name) for name in key)
+                for record_id, (_, row) in enumerate(rows)
+            }
+            existing = self._existing(conn, key, {value for value in values.values() if None not in value})
+            checked, seen = [], set()
+            for record_id, (record, row) in enumerate(rows):
+                value = values[record_id]
+                if None in value:
+                    checked.append((record, row))
+                elif value in existing or value in seen:
+                    rejected.append((record, f"{', '.join(key)}: значение ({', '.join(map(str, value))}) уже существует"))
+                else:
+                    seen.add(value)
+                    checked.append((record, row))
+            rows = checked
+        return [row for _, row in rows], rejected
+
+    def load(self, conn: Connection, rows: list[dict]) -> None:
+        if not rows:
+            return
+        names = [name for name in self.table.c.keys() if any(row.get(name) is not None for row in rows)]
+        if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            for row in rows:
+                writer.writerow([_copy_value(row.get(name)) for name in names])
+            buffer.seek(0)
+            cursor = conn.connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {self.table.name} ({', '.join(names)}) FROM STDIN "
+                    f"WITH (FORMAT csv, NULL '{_COPY_NULL}')",
+                    buffer,
+                )
+            finally:
+                cursor.close()
+        else:
+            conn.execute(self.table.insert(), [{name: row.get(name) for name in names} for row in rows])
+
+
+def _copy_value(value: Any) -> Any:
+    if value is None:
+        return _COPY_NULL
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _save_checkpoint(conn: Connection, source: str, rows_done: int) -> None:
+    checkpoints = ImportCheckpoint.__table__
+    insert_ = sqlite_insert if conn.dialect.name == "sqlite" else postgresql_insert
+    stmt = insert_(checkpoints).values(source=source, rows_done=rows_done, updated_at=func.now())
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[checkpoints.c.source],
+        set_={"rows_done": stmt.excluded.rows_done, "updated_at": stmt.excluded.updated_at},
+    ))
+
+
+def _sync_sequence(conn: Connection, table) -> None:
+    """
+    После загрузки с явными ID последовательность id PostgreSQL выставляется на max(id).
+    """
+    if conn.dialect.name != "postgresql" or "id" not in table.c:
+        return
+    conn.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+        f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+    ))
+
+
+def import_file(
+    table_name: str,
+    path: str,
+    engine: Optional[Engine] = None,
+    chunk_size: Optional[int] = None,
+    restart: bool = False,
+) -> ImportResult:
+    """
+    Загружает файл в таблицу table_name (ключ IMPORT_MODELS) порциями.
+    Продолжает с отметки import_checkpoints, если файл уже загружался (restart=True - сначала).
+    """
+    engine = engine or get_engine()
+    chunk_size = chunk_size or getattr(setting.importer, "chunk_size", 5_000)
+    file_path = Path(path).resolve()
+    if not any(file_path.name.endswith(ext) for ext in (".csv", ".ndjson", ".jsonl", ".csv.gz", ".ndjson.gz", ".jsonl.gz")):
+        raise ValueError(f"Неизвестный формат файла {path}: ожидается .csv, .ndjson или .jsonl (можно .gz)")
+    importer = TableImporter(table_name)
+    source = f"{table_name}:{file_path}"
+    checkpoints = ImportCheckpoint.__table__
+
+    with engine.begin() as conn:
+        if restart:
+            conn.execute(checkpoints.delete().where(checkpoints.c.source == source))
+        rows_done = conn.execute(
+            select(checkpoints.c.rows_done).where(checkpoints.c.source == source)
+        ).scalar() or 0
+    if rows_done:
+        logger.info("Импорт %s: продолжение после записи %s", source, rows_done)
+
+    records = _read_records(file_path)
+    for _ in range(rows_done):
+        next(records, None)
+
+    rows = loaded = rejected_count = 0
+    order_ids: Optional[tuple[int, int]] = None
+    started = time.perf_counter()
+    rejected_path = file_path.with_name(file_path.name + ".rejected.ndjson")
+    with open(rejected_path, "a" if rows_done else "w", encoding="utf-8") as rejected_file:
+        for chunk in _chunks(records, chunk_size):
+            if rows == 0:
+                importer.check_header(chunk[0])
+            with engine.begin() as conn:
+                valid, rejected = importer.validate(conn, chunk)
+                importer.load(conn, valid)
+                _save_checkpoint(conn, source, rows_done + rows + len(chunk))
+            for record, reason in rejected:
+                rejected_file.write(json.dumps({"record": record, "error": reason}, ensure_ascii=False, default=str) + "\n")
+            if valid and "order_id" in importer.table.c:
+                chunk_ids = [row["order_id"] for row in valid]
+                low, high = min(chunk_ids), max(chunk_ids)
+                order_ids = (min(low, order_ids[0]), max(high, order_ids[1])) if order_ids else (low, high)
+            rows += len(chunk)
+            loaded += len(valid)
+            rejected_count += len(rejected)
+            elapsed = time.perf_counter() - started
+            logger.info(
+                "Импорт %s: записей=%s, загружено=%s, отклонено=%s, %.0f записей/с",
+                table_name, rows, loaded, rejected_count, rows / elapsed if elapsed else 0
+            )
+
+    with engine.begin() as conn:
+        _sync_sequence(conn, importer.table)
+    if not rejected_count and rejected_path.exists() and rejected_path.stat().st_size == 0:
+        rejected_path.unlink()
+
+    result = ImportResult(table_name, rows, loaded, rejected_count, time.perf_counter() - started, order_ids)
+    logger.info(
+        "Импорт %s завершен: записей=%s, загружено=%s, отклонено=%s, время=%.1f с, %.0f записей/с",
+        table_name, result.rows, result.loaded, result.rejected, result.seconds, result.rows_per_sec
+    )
+    if result.rejected:
+        logger.warning("Отклоненные записи: %s", rejected_path)
+    return result
@@ -1,15 +1,28 @@
 """
 Скрипт инициализации базы данных.
 Создает все таблицы согласно схеме БД и создает административного пользователя.
+
+Обслуживание секций orders и дочерних таблиц (PostgreSQL, схема init-db/init.sql
+или migrations/0006_partition_orders.sql):
+    python -m app.init_db partitions [--months-ahead 3]
+    python -m app.init_db archive [--archive-after-months 12]
 """
+from datetime import date
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import OperationalError
-from app.database import engine, Base, SessionLocal
+from config import setting
+from app.database import Base, SessionLocal, get_engine
+from app.logger_config import setup_logging
 from app.models import (
     Client, Category, Product, Order, OrderItem,
     OrderStatus, OrderPriority, PaymentMethod, PaymentStatus,
     DeliveryType, OrderSource, Payment, OrderStatusHistory, OrderComment
 )
+import argparse
+import re
 import time
 import logging
 
@@ -22,11 +35,10 @@ def wait_for_db(max_retries=30, delay=2):
     """
     Ожидает готовности базы данных.
     """
-    from sqlalchemy import text
     logger.info("Проверка готовности базы данных...")
     for i in range(max_retries):
         try:
-            with engine.connect() as conn:
+            with get_engine().connect() as conn:
                 conn.execute(text("SELECT 1"))
             logger.info("База данных готова к подключению!")
             return True
@@ -46,7 +58,7 @@ def init_database():
     """
     logger.info("Начало создания таблиц в базе данных...")
     try:
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=get_engine())
         logger.info("Все таблицы успешно созданы в базе данных!")
     except Exception as e:
         logger.error(f"Ошибка при создании таблиц: {e}", exc_info=True)
@@ -102,5 +114,218 @@ def init_db_with_admin():
         raise
 
 
+# Секционированные по месяцам order_date таблицы: orders и таблицы со ссылкой на заказ
+PARTITIONED_TABLES = ("orders", "order_items", "payments", "order_status_history", "order_comments")
+_MONTH_SUFFIX = re.compile(r"_(\d{4})_(\d{2})$")
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def _is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('public.orders'))"
+    )).scalar_one()
+
+
+def _monthly_partitions(conn: Connection, table: str) -> dict[date, str]:
+    """
+    Месячные секции таблицы в схеме public: {первое число месяца: имя секции}.
+    Секция DEFAULT не входит.
+    """
+    names = conn.execute(text(
+        """
+        SELECT child.relname
+        FROM pg_inherits i
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table)
+        """
+    ), {"table": f"public.{table}"}).scalars()
+    partitions = {}
+    for name in names:
+        match = _MONTH_SUFFIX.search(name)
+        if match and name == f"{table}{match[0]}":
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def _partition_bounds(month: date) -> str:
+    return f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+
+
+def _default_has_rows(conn: Connection, table: str, month: date) -> bool:
+    """
+    Есть ли в секции DEFAULT таблицы строки месяца month.
+    """
+    default = f"{table}_default"
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": f"public.{default}"}).scalar() is None:
+        return False
+    return conn.execute(text(
+        f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE order_date >= :start AND order_date < :end)'
+    ), {"start": month, "end": _add_months(month, 1)}).scalar_one()
+
+
+def _move_from_default(conn: Connection, month: date) -> list[str]:
+    """
+    Создает секции месяца всех таблиц, когда строки этого месяца уже попали в секции DEFAULT
+    (секции не были созданы заранее): CREATE TABLE ... PARTITION OF в этом случае падает.
+    
+    Строки копируются из DEFAULT в отдельные таблицы и удаляются из DEFAULT (сначала
+    дочерние таблицы, затем orders - внешние ключи), таблицы присоединяются как секции
+    (сначала orders). Ключи order_keys, удаленные триггером вместе со строками orders_default,
+    восстанавливаются. На время переноса секции DEFAULT заблокированы.
+    """
+    bounds = {"start": month, "end": _add_months(month, 1)}
+    in_month = "order_date >= :start AND order_date < :end"
+    names = {table: _partition_name(table, month) for table in PARTITIONED_TABLES}
+    for table in PARTITIONED_TABLES:
+        conn.execute(text(f'LOCK TABLE "{table}_default" IN ACCESS EXCLUSIVE MODE'))
+    moved = {}
+    for table in PARTITIONED_TABLES:
+        conn.execute(text(
+            f'CREATE TABLE "{names[table]}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        ))
+        moved[table] = conn.execute(text(
+            f'INSERT INTO "{names[table]}" SELECT * FROM "{table}_default" WHERE {in_month}'
+        ), bounds).rowcount
+    for table in reversed(PARTITIONED_TABLES):
+        conn.execute(text(f'DELETE FROM "{table}_default" WHERE {in_month}'), bounds)
+    for table in PARTITIONED_TABLES:
+        conn.execute(text(f'ALTER TABLE "{table}" ATTACH PARTITION "{names[table]}" {_partition_bounds(month)}'))
+    if conn.execute(text("SELECT to_regclass('public.order_keys')")).scalar() is not None:
+        conn.execute(text(
+            f"""
+            INSERT INTO order_keys (id, order_number, order_date)
+            SELECT id, order_number, order_date FROM "{names['orders']}"
+            ON CONFLICT (id) DO NOTHING
+            """
+        ))
+    logger.info(
+        "Строки за %s перенесены из секций DEFAULT: %s",
+        f"{month:%Y-%m}", ", ".join(f"{table}={count}" for table, count in moved.items())
+    )
+    return list(names.values())
+
+
+def create_partitions(months_ahead: Optional[int] = None) -> list[str]:
+    """
+    Создает недостающие месячные секции всех секционированных таблиц
+    с текущего месяца на months_ahead месяцев вперед (partitioning.months_ahead).
+    Запускается по расписанию, чтобы новые заказы не попадали в секцию DEFAULT.
+    Если строки месяца уже в секциях DEFAULT, они переносятся в новые секции
+    (_move_from_default). Возвращает имена созданных секций.
+    """
+    if months_ahead is None:
+        months_ahead = getattr(setting.partitioning, "months_ahead", 3)
+    current_month = date.today().replace(day=1)
+    created = []
+    with get_engine().begin() as conn:
+        if not _is_partitioned(conn):
+            logger.warning("Таблица orders не секционирована, создание секций пропущено")
+            return created
+        existing = {table: _monthly_partitions(conn, table) for table in PARTITIONED_TABLES}
+        for offset in range(months_ahead + 1):
+            month = _add_months(current_month, offset)
+            missing = [table for table in PARTITIONED_TABLES if month not in existing[table]]
+            if not any(_default_has_rows(conn, table, month) for table in missing):
+                for table in missing:
+                    name = _partition_name(table, month)
+                    conn.execute(text(f'CREATE TABLE "{name}" PARTITION OF "{table}" {_partition_bounds(month)}'))
+                    created.append(name)
+            elif len(missing) == len(PARTITIONED_TABLES):
+                created.extend(_move_from_default(conn, month))
+            else:
+                raise RuntimeError(
+                    f"Секции DEFAULT содержат строки за {month:%Y-%m}, а секции этого месяца есть "
+                    f"не у всех таблиц (нет: {', '.join(missing)}): перенесите строки вручную"
+                )
+    logger.info("Секции созданы: %s", ", ".join(created) or "нет новых")
+    return created
+
+
+def archive_partitions(archive_after_months: Optional[int] = None) -> list[str]:
+    """
+    Переносит секции месяцев старше archive_after_months (partitioning.archive_after_months)
+    в схему partitioning.archive_schema: секция отсоединяется от рабочей таблицы
+    и присоединяется к одноименной архивной (archive.orders, archive.order_items, ...).
+    
+    Месяц переносится одной транзакцией для всех таблиц: сначала дочерние секции
+    (их внешние ключи на orders удаляются), затем секция orders. DETACH берет
+    кратковременную исключительную блокировку родительской таблицы, поэтому команда
+    запускается в период низкой нагрузки. Возвращает имена перенесенных секций.
+    """
+    if archive_after_months is None:
+        archive_after_months = getattr(setting.partitioning, "archive_after_months", 12)
+    schema = getattr(setting.partitioning, "archive_schema", "archive")
+    cutoff = _add_months(date.today().replace(day=1), -archive_after_months)
+    
+    with get_engine().begin() as conn:
+        if not _is_partitioned(conn):
+            logger.warning("Таблица orders не секционирована, архивация пропущена")
+            return []
+        conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        for table in PARTITIONED_TABLES:
+            conn.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{schema}"."{table}" (LIKE public."{table}") '
+                f'PARTITION BY RANGE (order_date)'
+            ))
+        months = sorted(month for month in _monthly_partitions(conn, "orders") if month < cutoff)
+    
+    archived = []
+    for month in months:
+        with get_engine().begin() as conn:
+            for table in reversed(PARTITIONED_TABLES):
+                name = _partition_name(table, month)
+                if month not in _monthly_partitions(conn, table):
+                    continue
+                conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+                if table != "orders":
+                    references = conn.execute(text(
+                        """
+                        SELECT conname FROM pg_constraint
+                        WHERE conrelid = to_regclass(:name) AND confrelid = to_regclass('public.orders')
+                        """
+                    ), {"name": f"public.{name}"}).scalars().all()
+                    for constraint in references:
+                        conn.execute(text(f'ALTER TABLE "{name}" DROP CONSTRAINT "{constraint}"'))
+                conn.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{schema}"'))
+                conn.execute(text(
+                    f'ALTER TABLE "{schema}"."{table}" ATTACH PARTITION "{schema}"."{name}" {_partition_bounds(month)}'
+                ))
+                archived.append(f"{schema}.{name}")
+        logger.info("Секции за %s перенесены в схему %s", f"{month:%Y-%m}", schema)
+    
+    logger.info("Архивация завершена: перенесено секций=%s", len(archived))
+    return archived
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Инициализация и обслуживание базы данных")
+    commands = parser.add_subparsers(dest="command")
+    
+    commands.add_parser("init", help="Создать таблицы и администратора (по умолчанию)")
+    partitions = commands.add_parser("partitions", help="Создать секции на следующие месяцы")
+    partitions.add_argument("--months-ahead", type=int, default=None)
+    archive = commands.add_parser("archive", help="Перенести старые секции в архивную схему")
+    archive.add_argument("--archive-after-months", type=int, default=None)
+    
+    args = parser.parse_args()
+    setup_logging()
+    if args.command == "partitions":
+        create_partitions(args.months_ahead)
+    elif args.command == "archive":
+        archive_partitions(args.archive_after_months)
+    else:
+        init_db_with_admin()
+
+
 if __name__ == "__main__":
-    init_db_with_admin()
+    main()
@@ -0,0 +1,201 @@
+"""
+Фоновые задания обслуживания данных.
+
+Пример:
+    python -m app.jobs reconcile-totals --from-id 1 --to-id 100000
+    python -m app.jobs refresh-reports
+    python -m app.jobs rebuild-reports
+    python -m app.jobs rebuild-category-closure
+    python -m app.jobs export-orders --format csv --gzip --output orders.csv.gz
+    python -m app.jobs import-data products products.csv
+    python -m app.jobs purge-idempotency-keys
+"""
+import argparse
+import logging
+import time
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.export import EXPORT_FORMATS, export_orders
+from app.idempotency import IdempotencyStore
+from app.importer import IMPORT_MODELS, ImportResult, import_file
+from app.logger_config import setup_logging
+from app.models import Order
+from app.services import CategoryService, OrderService, ReportService
+
+logger = logging.getLogger(__name__)
+
+
+def reconcile_totals(from_order_id: int, to_order_id: int, batch_size: int = 1000) -> int:
+    """
+    Пересчитывает итоги заказов диапазона пачками по batch_size ID,
+    каждая пачка - отдельная транзакция, чтобы не держать блокировки долго.
+    Без to_order_id обрабатываются заказы до максимального ID.
+    """
+    db = SessionLocal()
+    try:
+        if to_order_id is None:
+            to_order_id = db.execute(select(func.max(Order.id))).scalar() or 0
+        logger.info(f"Сверка итогов заказов: ID {from_order_id}-{to_order_id}, пачка={batch_size}")
+        started = time.perf_counter()
+        updated = 0
+        for batch_start in range(from_order_id, to_order_id + 1, batch_size):
+            batch_end = min(batch_start + batch_size - 1, to_order_id)
+            updated += OrderService.reconcile_order_totals(db, batch_start, batch_end)
+            db.commit()
+        logger.info(
+            f"Сверка итогов завершена: заказов={updated}, "
+            f"время={time.perf_counter() - started:.2f} с"
+        )
+        return updated
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Ошибка сверки итогов заказов: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
+
+
+def refresh_reports(full: bool = False) -> None:
+    """
+    Обновляет сводные таблицы отчетов: инкрементально из журнала продаж
+    или полностью по order_items (full=True).
+    """
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        if full:
+            ReportService.rebuild(db)
+        else:
+            ReportService.refresh(db)
+        logger.info(f"Обновление отчетов: время={time.perf_counter() - started:.2f} с")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Ошибка обновления отчетов: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
+
+
+def rebuild_category_closure() -> None:
+    """
+    Пересобирает таблицу замыкания категорий, например после загрузки
+    категорий прямым SQL в обход CategoryService.
+    """
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        CategoryService.rebuild_closure(db)
+        db.commit()
+        logger.info(f"Пересборка замыкания категорий: время={time.perf_counter() - started:.2f} с")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Ошибка пересборки замыкания категорий: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
+
+
+def export_orders_to_file(output: str, export_format: str = "ndjson", compress: bool = False, after_id: int = 0) -> None:
+    """
+    Выгружает заказы с позициями в файл потоково, как GET /api/orders/export
+    (stdout занят логами приложения).
+    """
+    db = SessionLocal()
+    try:
+        with open(output, "wb") as f:
+            for chunk in export_orders(db, export_format, compress=compress, after_id=after_id):
+                f.write(chunk)
+    except Exception as e:
+        db.rollback()
+        logger.error("Ошибка выгрузки заказов: %s", e, exc_info=True)
+        raise
+    finally:
+        db.close()
+
+
+def import_data(table: str, path: str, chunk_size: int = None, restart: bool = False) -> ImportResult:
+    """
+    Загружает файл в таблицу (app.importer) и выполняет то, что при поштучном
+    создании делают сервисы: замыкание категорий после категорий,
+    итоги заказов и отчеты после позиций.
+    """
+    try:
+        result = import_file(table, path, chunk_size=chunk_size, restart=restart)
+    except Exception as e:
+        logger.error("Ошибка загрузки %s в %s: %s", path, table, e, exc_info=True)
+        raise
+    if table == "categories" and result.loaded:
+        rebuild_category_closure()
+    elif table == "order_items" and result.order_ids:
+        reconcile_totals(*result.order_ids)
+        refresh_reports(full=True)
+    return result
+
+
+def purge_idempotency_keys() -> int:
+    """
+    Удаляет ключи Idempotency-Key старше idempotency.ttl.
+    """
+    db = SessionLocal()
+    try:
+        deleted = db.execute(IdempotencyStore.purge_stmt()).rowcount
+        db.commit()
+        logger.info("Удалено устаревших ключей идемпотентности: %s", deleted)
+        return deleted
+    except Exception as e:
+        db.rollback()
+        logger.error("Ошибка удаления ключей идемпотентности: %s", e, exc_info=True)
+        raise
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Задания обслуживания данных")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = commands.add_parser("reconcile-totals", help="Пересчитать итоги заказов по позициям")
+    reconcile.add_argument("--from-id", type=int, default=1)
+    reconcile.add_argument("--to-id", type=int, default=None)
+    reconcile.add_argument("--batch-size", type=int, default=1000)
+
+    commands.add_parser("refresh-reports", help="Перенести журнал продаж в сводные таблицы отчетов")
+    commands.add_parser("rebuild-reports", help="Полностью пересобрать сводные таблицы отчетов")
+    commands.add_parser("rebuild-category-closure", help="Пересобрать таблицу замыкания категорий")
+
+    export = commands.add_parser("export-orders", help="Выгрузить заказы с позициями в NDJSON/CSV")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    export.add_argument("--gzip", action="store_true")
+    export.add_argument("--after-id", type=int, default=0)
+    export.add_argument("--output", required=True, help="Файл выгрузки")
+
+    importer = commands.add_parser("import-data", help="Загрузить CSV/NDJSON в таблицу порциями")
+    importer.add_argument("table", choices=IMPORT_MODELS)
+    importer.add_argument("path", help="Файл .csv, .ndjson или .jsonl (можно .gz)")
+    importer.add_argument("--chunk-size", type=int, default=None)
+    importer.add_argument("--restart", action="store_true", help="Загрузить файл сначала, без отметки прогресса")
+
+    commands.add_parser("purge-idempotency-keys", help="Удалить ключи Idempotency-Key старше idempotency.ttl")
+
+    args = parser.parse_args()
+    setup_logging()
+    if args.command == "reconcile-totals":
+        reconcile_totals(args.from_id, args.to_id, args.batch_size)
+    elif args.command == "refresh-reports":
+        refresh_reports()
+    elif args.command == "rebuild-reports":
+        refresh_reports(full=True)
+    elif args.command == "rebuild-category-closure":
+        rebuild_category_closure()
+    elif args.command == "export-orders":
+        export_orders_to_file(args.output, args.format, compress=args.gzip, after_id=args.after_id)
+    elif args.command == "import-data":
+        import_data(args.table, args.path, args.chunk_size, args.restart)
+    elif args.command == "purge-idempotency-keys":
+        purge_idempotency_keys()
+
+
+if __name__ == "__main__":
+    main()
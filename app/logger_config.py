@@ -1,47 +1,204 @@
 """
 Конфигурация системы логирования.
 Настройка вывода логов в консоль.
+
+Режимы (секция logger в setting.yaml):
+- handler: sync  - запись в stdout в потоке, создавшем запись;
+- handler: queue - запись кладется в ограниченную очередь (QueueHandler), в stdout
+  ее пишет отдельный поток QueueListener, поэтому медленный stdout не задерживает
+  обработку запросов. При заполненной очереди запись отбрасывается (queue_policy: drop)
+  или поток ждет до queue_block_timeout секунд (queue_policy: block).
+Формат - текстовый (format/datefmt) или JSON (json: True).
 """
+import atexit
+import copy
+import json
 import logging
+import queue
 import sys
+import threading
 
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
 
 from config import setting
 
+_exception_formatter = logging.Formatter()
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["BoundedQueueHandler"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Запись лога одной строкой JSON.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "location": f"{record.filename}:{record.lineno}",
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler для ограниченной очереди со счетчиками
+    поставленных в очередь, отброшенных и задержанных записей.
+    """
+
+    def __init__(self, log_queue: queue.Queue, policy: str = "drop", block_timeout: float = 0.05):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.queued = 0
+        self.dropped = 0
+        self.delayed = 0
+        self._counters_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # В потоке запроса только подставляются аргументы (они могут измениться
+        # после вызова) и текст исключения; формат строки или JSON строит QueueListener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.policy != "block":
+                self._count("dropped")
+                return
+            self._count("delayed")
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                self._count("dropped")
+                return
+        self._count("queued")
+
+    def _count(self, counter: str) -> None:
+        with self._counters_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict[str, int]:
+        with self._counters_lock:
+            return {
+                "queued": self.queued,
+                "dropped": self.dropped,
+                "delayed": self.delayed,
+                "queue_size": self.queue.qsize(),
+                "queue_maxsize": self.queue.maxsize,
+            }
+
+
+def _make_formatter() -> logging.Formatter:
+    if getattr(setting.logger, "json", False):
+        return JsonFormatter()
+    return logging.Formatter(
+        fmt=setting.logger.format,
+        datefmt=setting.logger.datefmt
+    )
+
+
 def setup_logging(log_level: str = setting.logger.level):
     """
     Настраивает систему логирования.
-    
+
     Args:
         log_level: Уровень логирования (DEBUG, INFO, WARNING, ERROR, CRITICAL)
     """
+    global _listener, _queue_handler
+
     numeric_level = getattr(logging, log_level.upper(), logging.INFO)
-    
-    log_format = logging.Formatter(
-        fmt=setting.logger.format,
-        datefmt=setting.logger.datefmt
-    )
-    
+    handler_mode = getattr(setting.logger, "handler", "sync")
+
     root_logger = logging.getLogger()
     root_logger.setLevel(numeric_level)
-    
+
+    stop_logging()
     existing_handlers = root_logger.handlers[:]
     for handler in existing_handlers:
         if not (isinstance(handler, logging.StreamHandler) and handler.stream == sys.stdout):
             root_logger.removeHandler(handler)
-    
+        elif handler_mode == "queue":
+            root_logger.removeHandler(handler)
+
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(numeric_level)
-    console_handler.setFormatter(log_format)
-    
-    root_logger.addHandler(console_handler)
-    
+    console_handler.setFormatter(_make_formatter())
+
+    if handler_mode == "queue":
+        _queue_handler = BoundedQueueHandler(
+            queue.Queue(maxsize=getattr(setting.logger, "queue_maxsize", 10_000)),
+            policy=getattr(setting.logger, "queue_policy", "drop"),
+            block_timeout=getattr(setting.logger, "queue_block_timeout", 0.05),
+        )
+        _queue_handler.setLevel(numeric_level)
+        _listener = QueueListener(_queue_handler.queue, console_handler, respect_handler_level=True)
+        _listener.start()
+        root_logger.addHandler(_queue_handler)
+    else:
+        root_logger.addHandler(console_handler)
+
+    for logger_name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(logger_name).handlers = []
+        logging.getLogger(logger_name).propagate = True
     logging.getLogger("uvicorn").setLevel(logging.CRITICAL)
     logging.getLogger("uvicorn.access").setLevel(logging.CRITICAL)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.CRITICAL)
-    
+
     logger = logging.getLogger(__name__)
-    logger.info(f"Система логирования настроена. Уровень: {log_level}")
-    
+    logger.info("Система логирования настроена. Уровень: %s, режим: %s", log_level, handler_mode)
+
     return logger
+
+
+def stop_logging() -> None:
+    """
+    Останавливает поток QueueListener, дописав накопленные записи в stdout.
+    Вызывается автоматически при завершении процесса.
+    """
+    global _listener
+
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    stats = _queue_handler.stats()
+    if stats["dropped"] or stats["delayed"]:
+        # Итог пишется напрямую в обработчики слушателя: очереди уже нет
+        record = logging.getLogger(__name__).makeRecord(
+            __name__, logging.WARNING, __file__, 0,
+            "Очередь логов: отброшено записей=%s, задержано записей=%s",
+            (stats["dropped"], stats["delayed"]), None
+        )
+        for handler in _listener.handlers:
+            handler.handle(record)
+    _listener = None
+
+
+def logging_stats() -> dict[str, Any]:
+    """
+    Счетчики очереди логов (в режиме handler: sync - только режим).
+    """
+    if _queue_handler is None:
+        return {"handler": "sync"}
+    return {"handler": "queue", "policy": _queue_handler.policy, **_queue_handler.stats()}
+
+
+atexit.register(stop_logging)
@@ -1,24 +1,94 @@
 import logging
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from config import setting
-from app.api.routes import orders
+from app.api.routes import categories, orders, reference, reports
+from app.coalescing import coalescing_enabled
+from app.database import (
+    ASYNC_MODE, dispose_async_engine, dispose_engines, get_async_engine, get_replicas, init_database,
+    pool_max_overflow, warm_up_async_pool, warm_up_pool
+)
+from app.health import readiness
 from app.logger_config import setup_logging
+from app.responses import ORJSONResponse
+from app.metrics import METRICS_ENABLED, MetricsMiddleware, instrument_engine, render_metrics
 
 
 setup_logging(log_level=setting.logger.level)
 logger = logging.getLogger(__name__)
 
+
+async def warm_up_connections():
+    """
+    Прогрев пула соединений при запуске (engine.pool_warmup).
+    """
+    if not getattr(setting.engine, "pool_warmup", False):
+        return
+    try:
+        await run_in_threadpool(warm_up_pool)
+        await warm_up_async_pool()
+    except Exception as e:
+        logger.error("Не удалось прогреть пул соединений: %s", e)
+
+
+def warn_ignored_settings():
+    """
+    Предупреждения о настройках, которые не действуют в текущем режиме.
+    """
+    if ASYNC_MODE and coalescing_enabled():
+        logger.warning(
+            "coalescing.enabled не действует при database.mode: async - "
+            "запросы add-item выполняются без объединения"
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Запуск: наблюдатель за setting.yaml и перезагрузка по SIGHUP, создание engine
+    (импорт app.main их не создает), метрики SQL, прогрев пула.
+    Остановка: закрытие пулов соединений.
+    """
+    setting.start_watcher()
+    setting.install_signal_handler()
+    warn_ignored_settings()
+    engine = init_database()
+    if METRICS_ENABLED:
+        max_overflow = pool_max_overflow()
+        instrument_engine(engine, max_overflow=max_overflow)
+        async_engine = get_async_engine()
+        if async_engine is not None:
+            instrument_engine(async_engine.sync_engine, "primary_async", max_overflow)
+        for index, replica_engine in enumerate(get_replicas().engines, start=1):
+            instrument_engine(replica_engine, f"replica{index}", max_overflow)
+    await warm_up_connections()
+    yield
+    await dispose_async_engine()
+    dispose_engines()
+
+
 app = FastAPI(
     title=setting.api_setting.title,
     description=setting.api_setting.description,
     version=setting.api_setting.version,
     docs_url=setting.api_setting.docs_url,
-    redoc_url=setting.api_setting.redoc_url
+    redoc_url=setting.api_setting.redoc_url,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(orders.router)
+app.include_router(reference.router)
+app.include_router(reports.router)
+app.include_router(categories.router)
 
 
 # можно использовать инициализацию БД / проверку...
@@ -59,3 +129,22 @@ def health_check():
     Проверка здоровья сервиса.
     """
     return {"status": "ok", "service": "order-management-api"}
+
+
+@app.get("/health/ready")
+def readiness_check():
+    """
+    Готовность сервиса: доступность и задержка БД, состояние пула соединений.
+    Результат проверки БД кэшируется на health.ready_cache_seconds.
+    """
+    result = readiness()
+    status_code = status.HTTP_200_OK if result["status"] == "ok" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(result, status_code=status_code)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """
+    Метрики в текстовом формате Prometheus.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
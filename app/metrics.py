@@ -0,0 +1,342 @@
+"""
+Метрики производительности запросов в формате Prometheus.
+
+- MetricsMiddleware (ASGI) измеряет длительность запроса по шаблону маршрута;
+- события SQLAlchemy на engine считают SQL-запросы и время в БД для текущего запроса
+  (через contextvar, который наследуют и пул потоков FastAPI, и greenlet асинхронного стека);
+- обертка Engine.raw_connection измеряет ожидание соединения из пула;
+- заполнение пула (занято / pool_size + max_overflow) снимается в момент запроса /metrics.
+
+Медленные запросы (metrics.slow_request_ms > 0) пишутся в лог вместе с выполненными SQL.
+"""
+import logging
+import threading
+import time
+
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import setting
+
+logger = logging.getLogger(__name__)
+
+# При импорте: middleware метрик подключается при создании приложения (меняется перезапуском)
+METRICS_ENABLED: bool = bool(getattr(setting.metrics, "enabled", True))
+# Сколько SQL сохранять для лога медленного запроса и до какой длины обрезать каждый
+SLOW_REQUEST_MAX_STATEMENTS = 50
+SLOW_REQUEST_STATEMENT_LENGTH = 300
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+class Histogram:
+    """
+    Гистограмма Prometheus с набором меток: кумулятивные бакеты, сумма и количество.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float], label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = label_names
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(items):
+            base = _format_labels(zip(self.label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_bucket_labels(base, bound)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_bucket_labels(base, '+Inf')} {count}")
+            lines.append(f"{self.name}_sum{_wrap(base)} {total}")
+            lines.append(f"{self.name}_count{_wrap(base)} {count}")
+        return lines
+
+
+class CounterVec:
+    """
+    Счетчик Prometheus с набором меток.
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_wrap(_format_labels(zip(self.label_names, labels)))} {value}")
+        return lines
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+def _bucket_labels(base: str, bound: Any) -> str:
+    le = f'le="{bound}"'
+    return "{" + (f"{base},{le}" if base else le) + "}"
+
+
+def _wrap(labels: str) -> str:
+    return "{" + labels + "}" if labels else ""
+
+
+def _gauge(name: str, help_text: str, samples: Iterable[tuple[str, Any]], metric_type: str = "gauge") -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines.extend(f"{name}{_wrap(labels)} {value}" for labels, value in samples)
+    return lines
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Длительность HTTP запроса", LATENCY_BUCKETS, ("method", "route"),
+)
+requests_total = CounterVec(
+    "http_requests_total", "Количество HTTP запросов", ("method", "route", "status"),
+)
+request_statements = Histogram(
+    "http_request_db_statements", "Количество SQL-запросов на HTTP запрос", STATEMENT_BUCKETS, ("method", "route"),
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Время выполнения SQL на HTTP запрос", LATENCY_BUCKETS, ("method", "route"),
+)
+pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Ожидание соединения из пула", LATENCY_BUCKETS, ("engine",),
+)
+statements_total = CounterVec("db_statements_total", "Количество SQL-запросов", ("engine",))
+slow_requests_total = CounterVec("http_slow_requests_total", "Количество медленных HTTP запросов", ("method", "route"))
+
+
+class RequestStats:
+    """
+    Статистика БД одного HTTP запроса.
+    """
+    __slots__ = ("statements", "db_time", "statement_log")
+
+    def __init__(self, keep_statements: bool):
+        self.statements = 0
+        self.db_time = 0.0
+        self.statement_log: Optional[list[str]] = [] if keep_statements else None
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+_instrumented_engines: dict[str, Engine] = {}
+# max_overflow пулов по имени engine - из настроек, с которыми engine создан
+_engine_max_overflow: dict[str, Optional[int]] = {}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _make_after_cursor_execute(engine_name: str):
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - conn.info["query_started"]
+        statements_total.inc(engine_name)
+        stats = _request_stats.get()
+        if stats is None:
+            return
+        stats.statements += 1
+        stats.db_time += elapsed
+        if stats.statement_log is not None and len(stats.statement_log) < SLOW_REQUEST_MAX_STATEMENTS:
+            stats.statement_log.append(
+                f"{elapsed * 1000:.1f} ms: {' '.join(statement.split())[:SLOW_REQUEST_STATEMENT_LENGTH]}"
+            )
+    return _after_cursor_execute
+
+
+def instrument_engine(engine: Engine, name: str = "primary", max_overflow: Optional[int] = None) -> None:
+    """
+    Подключает счетчики SQL и ожидания пула к синхронному engine
+    (для AsyncEngine передается async_engine.sync_engine).
+    max_overflow - значение, с которым создан пул (app.database.pool_max_overflow):
+    по нему считается емкость пула; None - емкость и заполненность не публикуются.
+    """
+    if not METRICS_ENABLED or name in _instrumented_engines:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _make_after_cursor_execute(name))
+
+    # Engine.raw_connection - единственная точка получения соединения из пула;
+    # обертка на экземпляре переживает engine.dispose() (пул пересоздается, engine тот же)
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - started, name)
+
+    engine.raw_connection = timed_raw_connection
+    _engine_max_overflow[name] = max_overflow
+    _instrumented_engines[name] = engine
+
+
+def _pool_samples() -> list[str]:
+    checked_out, capacity, overflow = [], [], []
+    for name, engine in _instrumented_engines.items():
+        pool = engine.pool
+        label = f'engine="{_escape(name)}"'
+        if hasattr(pool, "checkedout"):
+            checked_out.append((label, pool.checkedout()))
+        if hasattr(pool, "overflow") and hasattr(pool, "size"):
+            max_overflow = _engine_max_overflow.get(name)
+            if max_overflow is not None:
+                capacity.append((label, pool.size() + max(max_overflow, 0)))
+            overflow.append((label, max(pool.overflow(), 0)))
+    lines = _gauge("db_pool_checked_out", "Соединений выдано из пула", checked_out)
+    lines += _gauge("db_pool_capacity", "Максимум соединений пула (pool_size + max_overflow)", capacity)
+    lines += _gauge("db_pool_overflow", "Соединений сверх pool_size", overflow)
+    totals = dict(capacity)
+    saturation = [
+        (label, round(busy / totals[label], 4))
+        for label, busy in checked_out if totals.get(label)
+    ]
+    lines += _gauge("db_pool_saturation", "Доля занятых соединений пула", saturation)
+    return lines
+
+
+def _cache_samples() -> list[str]:
+    from app.cache import cache_stats
+
+    stats_by_cache = cache_stats()
+    lines = []
+    for field, metric_type in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("size", "gauge")):
+        lines += _gauge(
+            f"app_cache_{field}" + ("_total" if metric_type == "counter" else ""),
+            f"Кэш: {field}",
+            ((f'cache="{name}"', stats[field]) for name, stats in stats_by_cache.items()),
+            metric_type,
+        )
+    return lines
+
+
+def _logging_samples() -> list[str]:
+    from app.logger_config import logging_stats
+
+    stats = logging_stats()
+    if stats["handler"] != "queue":
+        return []
+    lines = []
+    for field in ("queued", "dropped", "delayed"):
+        lines += _gauge(f"app_log_records_{field}_total", f"Записи лога: {field}", (("", stats[field]),), "counter")
+    lines += _gauge("app_log_queue_size", "Записей в очереди лога", (("", stats["queue_size"]),))
+    return lines
+
+
+def _idempotency_samples() -> list[str]:
+    from app.idempotency import idempotency_store
+
+    lines = []
+    for field, stat in idempotency_store.stats().items():
+        lines += _gauge(f"app_idempotency_{field}_total", f"Ключи Idempotency-Key: {field}", (("", stat),), "counter")
+    return lines
+
+
+def _coalescing_samples() -> list[str]:
+    from app.coalescing import add_item_coalescer, coalescing_enabled
+
+    if not coalescing_enabled():
+        return []
+    lines = []
+    for field, stat in add_item_coalescer.stats().items():
+        lines += _gauge(f"app_add_item_coalesced_{field}_total", f"Объединение add-item: {field}", (("", stat),), "counter")
+    return lines
+
+
+def render_metrics() -> str:
+    """
+    Все метрики в текстовом формате Prometheus.
+    """
+    lines: list[str] = []
+    for metric in (
+        request_duration, requests_total, request_statements, request_db_time,
+        slow_requests_total, statements_total, pool_checkout_wait,
+    ):
+        lines += metric.render()
+    lines += _pool_samples()
+    lines += _cache_samples()
+    lines += _logging_samples()
+    lines += _idempotency_samples()
+    lines += _coalescing_samples()
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: длительность запроса, число SQL и время в БД по шаблону маршрута.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        slow_request_ms = float(getattr(setting.metrics, "slow_request_ms", 0) or 0)
+        stats = RequestStats(keep_statements=slow_request_ms > 0)
+        token = _request_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            request_duration.observe(elapsed, method, route_path)
+            requests_total.inc(method, route_path, str(status_code))
+            request_statements.observe(stats.statements, method, route_path)
+            request_db_time.observe(stats.db_time, method, route_path)
+            if slow_request_ms and elapsed * 1000 >= slow_request_ms:
+                slow_requests_total.inc(method, route_path)
+                logger.warning(
+                    "Медленный запрос: %s %s, статус=%s, время=%.1f мс, SQL=%s, время в БД=%.1f мс%s",
+                    method, scope["path"], status_code, elapsed * 1000, stats.statements,
+                    stats.db_time * 1000, "".join("\n" + line for line in stats.statement_log or ())
+                )
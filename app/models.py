@@ -1,6 +1,9 @@
 from datetime import datetime, UTC
 
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, JSON, Boolean, Text
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Numeric, ForeignKey, Date, DateTime, JSON, Boolean, Text,
+    CheckConstraint, UniqueConstraint, PrimaryKeyConstraint, Index, DDL, event
+)
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -11,17 +14,37 @@ class Category(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    parent_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("categories.id"), nullable=True, index=True)
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
 
 
+class CategoryClosure(Base):
+    """
+    Таблица замыкания дерева категорий: строка на каждую пару предок-потомок
+    (включая саму категорию с depth=0). Поддерживается CategoryService.
+    """
+    __tablename__ = "category_closure"
+    __table_args__ = (
+        PrimaryKeyConstraint("ancestor_id", "descendant_id", name="pk_category_closure"),
+        Index("ix_category_closure_descendant_depth", "descendant_id", "depth"),
+    )
+    
+    ancestor_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
+    descendant_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
+    depth = Column(Integer, nullable=False)
+
+
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        CheckConstraint("quantity >= 0", name="ck_products_quantity_non_negative"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    category_id = Column(Integer, ForeignKey("categories.id"))
+    category_id = Column(Integer, ForeignKey("categories.id"), index=True)
     name = Column(String, nullable=False)
-    quantity = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)  # свободный остаток
+    reserved_quantity = Column(Integer, nullable=False, default=0, server_default="0")  # резерв под заказы
     price = Column(Numeric(10, 2), nullable=False)
 
 
@@ -84,7 +107,17 @@ class OrderSource(Base):
 
 
 class Order(Base):
+    """
+    В PostgreSQL (init-db/init.sql) orders и дочерние таблицы секционированы
+    по месяцам order_date; дочерние строки хранят order_date своего заказа.
+    """
     __tablename__ = "orders"
+    __table_args__ = (
+        # Индексы фильтров списка заказов включают id для keyset-пагинации по id
+        Index("ix_orders_customer_id", "customer_id", "id"),
+        Index("ix_orders_status_id", "status_id", "id"),
+        Index("ix_orders_source_id", "source_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("clients.id"))
@@ -102,7 +135,7 @@ class Order(Base):
     phone = Column(String)
     email = Column(String)
     tracking_number = Column(String)
-    order_date = Column(DateTime, default=lambda: datetime.now(UTC))
+    order_date = Column(DateTime, nullable=False, default=lambda: datetime.now(UTC), index=True)
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
     
@@ -114,15 +147,83 @@ class Order(Base):
     delivery_type_id = Column(Integer, ForeignKey("delivery_types.id"))
     source_id = Column(Integer, ForeignKey("order_sources.id"))
     
-    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan", order_by="OrderItem.id")
+    payments = relationship("Payment", order_by="Payment.id")
+    status_history = relationship("OrderStatusHistory", order_by="OrderStatusHistory.id")
+    comments = relationship("OrderComment", order_by="OrderComment.id")
+
+
+class OrderKey(Base):
+    """
+    Ключи заказов вне секций orders: глобально уникальный order_number
+    (в секционированной таблице уникальность возможна только вместе с order_date)
+    и order_date по id - поиск заказа по id читает только его секцию.
+    Строки ведет триггер на orders (init-db/init.sql, migrations/0010_order_keys.sql;
+    при create_all - DDL ниже).
+    """
+    __tablename__ = "order_keys"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_number = Column(String, unique=True)
+    order_date = Column(DateTime, nullable=False)
+
+
+_ORDER_KEYS_TRIGGERS = {
+    "sqlite": [
+        """
+        CREATE TRIGGER trg_orders_insert_order_keys AFTER INSERT ON orders BEGIN
+            INSERT INTO order_keys (id, order_number, order_date) VALUES (NEW.id, NEW.order_number, NEW.order_date);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_orders_update_order_keys AFTER UPDATE OF order_number, order_date ON orders BEGIN
+            UPDATE order_keys SET order_number = NEW.order_number, order_date = NEW.order_date WHERE id = OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER trg_orders_delete_order_keys AFTER DELETE ON orders BEGIN
+            DELETE FROM order_keys WHERE id = OLD.id;
+        END
+        """,
+    ],
+    "postgresql": [
+        """
+        CREATE OR REPLACE FUNCTION orders_sync_order_keys() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO order_keys (id, order_number, order_date) VALUES (NEW.id, NEW.order_number, NEW.order_date);
+            ELSIF TG_OP = 'UPDATE' THEN
+                UPDATE order_keys SET order_number = NEW.order_number, order_date = NEW.order_date WHERE id = OLD.id;
+            ELSE
+                DELETE FROM order_keys WHERE id = OLD.id;
+            END IF;
+            RETURN NULL;
+        END $$
+        """,
+        """
+        CREATE TRIGGER trg_orders_sync_order_keys
+            AFTER INSERT OR UPDATE OF order_number, order_date OR DELETE ON orders
+            FOR EACH ROW EXECUTE FUNCTION orders_sync_order_keys()
+        """,
+    ],
+}
+for _dialect, _statements in _ORDER_KEYS_TRIGGERS.items():
+    for _statement in _statements:
+        event.listen(Order.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
 
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        # Уникальный индекс (order_id, product_id, order_date) обслуживает и поиск позиций по order_id;
+        # order_date позиции равна дате заказа и нужна в ключе секционированной таблицы
+        UniqueConstraint("order_id", "product_id", "order_date", name="uq_order_items_order_product"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    order_date = Column(DateTime, nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     product_name = Column(String)
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Numeric(10, 2), nullable=False)
@@ -139,7 +240,8 @@ class Payment(Base):
     __tablename__ = "payments"
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    order_date = Column(DateTime, nullable=False)
     payment_method_id = Column(Integer, ForeignKey("payment_methods.id"))
     transaction_id = Column(String)
     amount = Column(Numeric(10, 2), nullable=False)
@@ -151,7 +253,8 @@ class OrderStatusHistory(Base):
     __tablename__ = "order_status_history"
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    order_date = Column(DateTime, nullable=False)
     status_id = Column(Integer, ForeignKey("order_statuses.id"))
     changed_by = Column(String)
     notes = Column(String)
@@ -162,8 +265,64 @@ class OrderComment(Base):
     __tablename__ = "order_comments"
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    order_date = Column(DateTime, nullable=False)
     author_name = Column(String)
     comment_text = Column(Text)
     is_internal = Column(Boolean, default=False)
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
+
+
+# Отчеты: журнал изменений продаж и сводные таблицы, обновляемые из журнала
+class ReportSalesJournal(Base):
+    __tablename__ = "report_sales_journal"
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    order_id = Column(Integer, nullable=False)
+    # Дата заказа: соединение с orders по (id, order_date) читает только секции этих дат
+    order_date = Column(DateTime, nullable=False)
+    product_id = Column(Integer, nullable=False)
+    quantity_delta = Column(Integer, nullable=False)
+    amount_delta = Column(Numeric(12, 2), nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(UTC))
+
+
+class ReportDailyProductSales(Base):
+    __tablename__ = "report_daily_product_sales"
+    
+    sales_date = Column(Date, primary_key=True)
+    product_id = Column(Integer, primary_key=True, index=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    amount = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+class ReportClientTotals(Base):
+    __tablename__ = "report_client_totals"
+    
+    client_id = Column(Integer, primary_key=True)
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+class IdempotencyKey(Base):
+    """
+    Ключ Idempotency-Key запроса add-item (app.idempotency), общий для всех процессов сервера.
+    Ответ записывается в транзакции, изменившей заказ.
+    """
+    __tablename__ = "idempotency_keys"
+    
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(Text, nullable=False)  # тело запроса
+    response = Column(Text)  # JSON ответа, NULL до фиксации запроса
+    created_at = Column(DateTime, nullable=False, index=True)
+
+
+class ImportCheckpoint(Base):
+    """
+    Прогресс загрузки файла (app.importer): количество обработанных записей
+    обновляется в транзакции каждой загруженной порции.
+    """
+    __tablename__ = "import_checkpoints"
+    
+    source = Column(String, primary_key=True)  # "<таблица>:<путь к файлу>"
+    rows_done = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
@@ -0,0 +1,165 @@
+"""
+Маршрутизация чтения на реплики БД (database.replica_urls).
+
+ReplicaSet выдает engine реплик по кругу. Реплика, на которой не удалось
+установить соединение или оно оборвалось, исключается на replica_eject_seconds,
+затем снова получает запросы; если исключены все реплики, чтение идет
+на основной сервер.
+
+RoutingSession - сессия обработчиков только на чтение (get_read_db):
+- SELECT выполняются на одной реплике, выбранной при первом запросе сессии;
+- INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE, text() и flush ORM - на основном сервере,
+  и все последующие запросы этой сессии (запроса API) тоже идут на основной,
+  чтобы чтение после записи видело записанное. text() идет на реплику, только если
+  помечен text(...).execution_options(read_only=True);
+- если реплика исключена из-за ошибки запроса сессии, транзакция сессии откатывается
+  и запрос один раз повторяется на следующей реплике (или на основном сервере).
+Реплика отстает от основного сервера: данные, записанные другим запросом
+мгновенье назад, на реплике могут еще отсутствовать.
+"""
+import logging
+import threading
+import time
+
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+logger = logging.getLogger(__name__)
+
+
+def engine_label(engine: Engine) -> str:
+    return engine.url.render_as_string(hide_password=True)
+
+
+class ReplicaSet:
+    """
+    Engine реплик: выбор по кругу с исключением недоступных.
+    """
+
+    def __init__(self, engines: list[Engine], eject_seconds: float = 30):
+        self.engines = list(engines)
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._next = 0
+        self._ejected_until: dict[int, float] = {}
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def choose(self) -> Optional[Engine]:
+        """
+        Следующая по кругу доступная реплика или None, если доступных нет.
+        """
+        with self._lock:
+            now = time.monotonic()
+            for _ in range(len(self.engines)):
+                index = self._next
+                self._next = (self._next + 1) % len(self.engines)
+                if self._ejected_until.get(index, 0) <= now:
+                    return self.engines[index]
+        return None
+
+    def available(self, engine: Engine) -> bool:
+        index = self.engines.index(engine)
+        with self._lock:
+            return self._ejected_until.get(index, 0) <= time.monotonic()
+
+    def eject(self, engine: Engine) -> None:
+        index = self.engines.index(engine)
+        with self._lock:
+            self._ejected_until[index] = time.monotonic() + self.eject_seconds
+        logger.warning("Реплика %s исключена на %s с", engine_label(engine), self.eject_seconds)
+
+    def _on_error(self, context) -> None:
+        # Ошибка установки соединения (connection is None) или обрыв - реплика недоступна;
+        # ошибки самих запросов реплику не исключают
+        if context.engine is not None and (context.connection is None or context.is_disconnect):
+            self.eject(context.engine)
+
+    def stats(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            ejected = dict(self._ejected_until)
+        return [
+            {
+                "url": engine_label(engine),
+                "available": ejected.get(index, 0) <= now,
+                "ejected_for_seconds": round(max(ejected.get(index, 0) - now, 0), 1),
+            }
+            for index, engine in enumerate(self.engines)
+        ]
+
+
+def _is_write(clause: Any) -> bool:
+    if isinstance(clause, TextClause):
+        return not clause.get_execution_options().get("read_only", False)
+    return isinstance(clause, UpdateBase) or getattr(clause, "_for_update_arg", None) is not None
+
+
+class RoutingSession(Session):
+    """
+    Сессия чтения: запросы на реплику, запись и все после нее - на основной сервер
+    (bind сессии). Без реплик работает как обычная сессия.
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not self.replicas or self.info.get("primary") or _is_write(clause):
+            self.info["primary"] = True
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        replica = self.info.get("replica")
+        if replica is None:
+            replica = self.replicas.choose()
+            if replica is None:
+                logger.warning("Нет доступных реплик, чтение с основного сервера")
+                self.info["primary"] = True
+                return super().get_bind(mapper, clause=clause, **kwargs)
+            self.info["replica"] = replica
+        return replica
+
+    def _retry_on_next_replica(self, error: DBAPIError) -> bool:
+        """
+        True, если ошибка исключила реплику сессии (ReplicaSet._on_error): транзакция
+        сессии откатывается, следующий запрос выберет другую реплику.
+        """
+        replica = self.info.get("replica")
+        if replica is None or self.info.get("primary") or self.replicas.available(replica):
+            return False
+        logger.warning("Повтор чтения после ошибки реплики %s: %s", engine_label(replica), error.orig)
+        self.rollback()
+        del self.info["replica"]
+        return True
+
+    def _read(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except DBAPIError as e:
+            if not self._retry_on_next_replica(e):
+                raise
+        return method(*args, **kwargs)
+
+    def execute(self, *args, **kwargs):
+        return self._read(super().execute, *args, **kwargs)
+
+    def scalar(self, *args, **kwargs):
+        return self._read(super().scalar, *args, **kwargs)
+
+    def scalars(self, *args, **kwargs):
+        return self._read(super().scalars, *args, **kwargs)
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _flush_on_primary(session, flush_context, instances) -> None:
+    # flush ORM пишет: он и все последующие запросы сессии - на основной сервер
+    session.info["primary"] = True
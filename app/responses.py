@@ -0,0 +1,55 @@
+"""
+Быстрая сериализация ответов API.
+
+ORJSONResponse - класс ответа по умолчанию (FastAPI default_response_class):
+JSON собирается orjson, Decimal выводится строкой, как при сериализации pydantic.
+
+Для списков из тысяч строк обработчик возвращает ORJSONResponse сам:
+словари ответа строятся прямо из строк Row запроса (rows_to_dicts),
+без объектов ORM и без валидации pydantic - ни при создании схемы в сервисе,
+ни повторной по response_model (FastAPI не проверяет готовый Response).
+response_model обработчика при этом остается описанием ответа в OpenAPI.
+"""
+from decimal import Decimal
+from operator import itemgetter
+from typing import Any, Sequence
+
+import orjson
+
+from fastapi.responses import ORJSONResponse as _ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy.engine import Row
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    JSON тела ответа: то же, что отдает ORJSONResponse.
+    """
+    return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(_ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(rows: Sequence[Row], fields: Sequence[str]) -> list[dict[str, Any]]:
+    """
+    Строки Row в словари с ключами fields (поля схемы ответа, колонки запроса с теми же именами).
+    Лишние колонки запроса в ответ не попадают.
+    """
+    if not rows:
+        return []
+    fields = tuple(fields)
+    getter = itemgetter(*(rows[0]._fields.index(name) for name in fields))
+    if len(fields) == 1:
+        return [{fields[0]: getter(row)} for row in rows]
+    return [dict(zip(fields, getter(row))) for row in rows]
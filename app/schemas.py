@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional
+from datetime import datetime
 from decimal import Decimal
 
 
@@ -25,6 +26,8 @@ class OrderItemResponse(BaseModel):
     product_name: Optional[str]
     quantity: int
     unit_price: Decimal
+    discount_percent: Optional[int] = 0
+    discount_amount: Optional[Decimal] = Decimal("0")
     total_price: Decimal
     
     class Config:
@@ -37,11 +40,203 @@ class OrderItemResponse(BaseModel):
                 "product_name": "Товар",
                 "quantity": 3,
                 "unit_price": "1000.00",
+                "discount_percent": 0,
+                "discount_amount": "0.00",
                 "total_price": "3000.00"
             }
         }
 
 
+class BulkAddItemsRequest(BaseModel):
+    items: list[AddItemToOrderRequest] = Field(
+        ..., min_length=1, max_length=1000, description="Позиции для добавления"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"order_id": 1, "product_id": 5, "quantity": 3},
+                    {"order_id": 1, "product_id": 7, "quantity": 1},
+                    {"order_id": 2, "product_id": 5, "quantity": 2}
+                ]
+            }
+        }
+
+
+class SetItemDiscountRequest(BaseModel):
+    order_id: int = Field(..., description="ID заказа", gt=0)
+    product_id: int = Field(..., description="ID номенклатуры", gt=0)
+    discount_percent: int = Field(..., ge=0, le=100, description="Скидка на позицию, %")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "order_id": 1,
+                "product_id": 5,
+                "discount_percent": 10
+            }
+        }
+
+
+class BulkAddItemsResponse(BaseModel):
+    items: list[OrderItemResponse] = Field(
+        ..., description="Результат по каждой позиции запроса в исходном порядке"
+    )
+
+
+class OrderSummaryResponse(BaseModel):
+    id: int
+    order_number: Optional[str]
+    customer_id: Optional[int]
+    status_id: Optional[int]
+    source_id: Optional[int]
+    order_date: datetime
+    subtotal: Optional[Decimal]
+    discount_amount: Optional[Decimal]
+    total_amount: Optional[Decimal]
+    paid_amount: Optional[Decimal]
+    
+    class Config:
+        from_attributes = True
+
+
+class OrderListResponse(BaseModel):
+    items: list[OrderSummaryResponse]
+    next_before_id: Optional[int] = Field(
+        None, description="before_id для следующей страницы, null - страниц больше нет"
+    )
+
+
+class PaymentResponse(BaseModel):
+    id: int
+    payment_method_id: Optional[int]
+    transaction_id: Optional[str]
+    amount: Decimal
+    status: Optional[str]
+    created_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
+
+
+class OrderStatusHistoryResponse(BaseModel):
+    id: int
+    status_id: Optional[int]
+    changed_by: Optional[str]
+    notes: Optional[str]
+    changed_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
+
+
+class OrderCommentResponse(BaseModel):
+    id: int
+    author_name: Optional[str]
+    comment_text: Optional[str]
+    is_internal: Optional[bool]
+    created_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
+
+
+class OrderDetailResponse(OrderSummaryResponse):
+    priority_id: Optional[int]
+    payment_method_id: Optional[int]
+    payment_status_id: Optional[int]
+    delivery_type_id: Optional[int]
+    tax_amount: Optional[Decimal]
+    shipping_amount: Optional[Decimal]
+    delivery_address: Optional[str]
+    city: Optional[str]
+    zipcode: Optional[str]
+    recipient_name: Optional[str]
+    phone: Optional[str]
+    email: Optional[str]
+    tracking_number: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    items: list[OrderItemResponse]
+    payments: list[PaymentResponse]
+    status_history: list[OrderStatusHistoryResponse]
+    comments: list[OrderCommentResponse]
+
+
+class ReferenceItemResponse(BaseModel):
+    id: int
+    code: Optional[int]
+    name: Optional[str]
+    has_address: Optional[bool] = None
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": 1,
+                "code": 10,
+                "name": "Новый"
+            }
+        }
+
+
+class TopProductResponse(BaseModel):
+    product_id: int
+    product_name: str
+    category_name: Optional[str] = Field(None, description="Категория 1-го уровня")
+    quantity: int = Field(..., description="Общее количество проданных штук")
+    
+    class Config:
+        from_attributes = True
+
+
+class ClientTotalResponse(BaseModel):
+    client_id: int
+    client_name: str
+    total_amount: Decimal
+    
+    class Config:
+        from_attributes = True
+
+
+class CategoryChildrenResponse(BaseModel):
+    category_id: int
+    category_name: str
+    children_count: int
+    
+    class Config:
+        from_attributes = True
+
+
+class CategoryCreateRequest(BaseModel):
+    name: str = Field(..., min_length=1, description="Наименование категории")
+    parent_id: Optional[int] = Field(None, gt=0, description="ID родительской категории")
+
+
+class CategoryMoveRequest(BaseModel):
+    parent_id: Optional[int] = Field(
+        None, gt=0, description="ID нового родителя, null - перенести в корень"
+    )
+
+
+class CategoryResponse(BaseModel):
+    id: int
+    name: str
+    parent_id: Optional[int]
+    
+    class Config:
+        from_attributes = True
+
+
+class CategoryNodeResponse(CategoryResponse):
+    depth: int = Field(..., description="Глубина относительно запрошенной категории")
+
+
+class CategoryProductCountResponse(BaseModel):
+    category_id: int
+    product_count: int
+
+
 class ErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
@@ -1,93 +1,1232 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Date, Numeric, and_, bindparam, delete, exists, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, raiseload, selectinload, with_loader_criteria
 from sqlalchemy.exc import IntegrityError
-from decimal import Decimal
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import NamedTuple, Optional
 import logging
-from app.models import Order, OrderItem, Product
-from app.schemas import AddItemToOrderRequest, OrderItemResponse
+
+from config import setting
+from app.cache import get_product_with_stock, get_product_with_stock_async
+from app.idempotency import IdempotencyStore
+from app.models import (
+    Category, Client, Order, OrderItem, OrderKey, OrderComment, OrderStatusHistory, Payment, Product,
+    CategoryClosure, ReportSalesJournal, ReportDailyProductSales, ReportClientTotals
+)
+from app.schemas import (
+    AddItemToOrderRequest, OrderItemResponse,
+    BulkAddItemsRequest, BulkAddItemsResponse, SetItemDiscountRequest,
+    CategoryCreateRequest, CategoryMoveRequest,
+    OrderSummaryResponse, OrderDetailResponse
+)
+from app.responses import rows_to_dicts
 
 logger = logging.getLogger(__name__)
 
+MONEY_QUANT = Decimal("0.01")
+
+
+class LineChange(NamedTuple):
+    """Изменение позиции заказа для итогов заказа и журнала продаж."""
+    order_id: int
+    order_date: datetime
+    product_id: int
+    quantity_delta: int
+    subtotal_delta: Decimal
+    discount_delta: Decimal
+
 
 class OrderService:
     @staticmethod
-    def add_item_to_order(db: Session, request: AddItemToOrderRequest) -> OrderItemResponse:
+    def _reservation_enabled(reserve_stock: Optional[bool]) -> bool:
+        """
+        Режим работы с остатками: явный параметр или настройка stock.reservation.
+        """
+        if reserve_stock is not None:
+            return reserve_stock
+        return bool(setting.stock.reservation)
+    
+    @staticmethod
+    def _lean_enabled(lean: Optional[bool]) -> bool:
+        """
+        Облегченный режим add-item: явный параметр или настройка orders.lean.
+        """
+        if lean is not None:
+            return lean
+        return bool(getattr(setting.orders, "lean", False))
+    
+    @staticmethod
+    def _order_key_date(order_id: int):
+        """
+        Дата заказа по id из несекционированной order_keys. Условие order_date = _order_key_date(id)
+        рядом с условием по id оставляет в плане одну секцию orders и дочерних таблиц
+        (отсечение секций при выполнении), без него поиск по id проверяет индексы всех секций.
+        """
+        order_keys = OrderKey.__table__
+        return select(order_keys.c.order_date).where(order_keys.c.id == order_id).scalar_subquery()
+    
+    @staticmethod
+    def _order_product_stmt(order_id: int, product_id: int):
+        """
+        Дата заказа и нужные колонки товара с остатком одним запросом. Строка есть всегда:
+        order_date NULL, если нет заказа, product_id NULL, если нет товара.
+        Атрибуты товара читаются из БД, кэш товаров не используется.
+        """
+        products = Product.__table__
+        order_date = OrderService._order_date_stmt(order_id).scalar_subquery()
+        one_row = select(literal(1).label("one")).subquery()
+        return (
+            select(
+                order_date.label("order_date"), products.c.id.label("product_id"),
+                products.c.name, products.c.price, products.c.quantity
+            )
+            .select_from(one_row.outerjoin(products, products.c.id == product_id))
+        )
+    
+    @staticmethod
+    def _order_date_stmt(order_id: int):
+        orders = Order.__table__
+        return select(orders.c.order_date).where(
+            orders.c.id == order_id, orders.c.order_date == OrderService._order_key_date(order_id)
+        )
+    
+    @staticmethod
+    def _raise_order_or_product_not_found(request: AddItemToOrderRequest, order_exists: bool) -> None:
+        if not order_exists:
+            logger.warning("Заказ с ID %s не найден", request.order_id)
+            raise ValueError(f"Заказ с ID {request.order_id} не найден")
+        logger.warning("Товар с ID %s не найден", request.product_id)
+        raise ValueError(f"Товар с ID {request.product_id} не найден")
+    
+    @staticmethod
+    def _order_and_product(request: AddItemToOrderRequest, row: Row) -> tuple[datetime, Row, int]:
+        """
+        Облегченный режим: дата заказа, товар (name, price) и остаток из строки
+        _order_product_stmt; ValueError, если нет заказа или товара.
+        """
+        if row.order_date is None:
+            OrderService._raise_order_or_product_not_found(request, False)
+        if row.product_id is None:
+            OrderService._raise_order_or_product_not_found(request, True)
+        return row.order_date, row, row.quantity
+    
+    @staticmethod
+    def _load_order_and_product(db: Session, request: AddItemToOrderRequest) -> tuple[datetime, Row, int]:
+        """
+        Облегченный режим: дата заказа, name и price товара и остаток одним запросом Core,
+        без объектов ORM.
+        """
+        row = db.execute(OrderService._order_product_stmt(request.order_id, request.product_id)).one()
+        return OrderService._order_and_product(request, row)
+    
+    @staticmethod
+    def _reserve_stock_stmt(product_id: int, quantity: int):
+        """
+        Условный UPDATE резервирования: остаток уменьшается, резерв
+        увеличивается, только если свободного остатка достаточно.
+        Строка товара остается заблокированной до конца транзакции.
+        """
+        return (
+            update(Product)
+            .where(Product.id == product_id, Product.quantity >= quantity)
+            .values(
+                quantity=Product.quantity - quantity,
+                reserved_quantity=Product.reserved_quantity + quantity
+            )
+            .returning(Product.name, Product.price, Product.quantity)
+            .execution_options(synchronize_session=False)
+        )
+    
+    @staticmethod
+    def _raise_reservation_failed(product_id: int, quantity: int, available: Optional[int]) -> None:
+        if available is None:
+            logger.warning("Товар с ID %s не найден", product_id)
+            raise ValueError(f"Товар с ID {product_id} не найден")
+        logger.warning(
+            "Недостаточно товара на складе: product_id=%s, доступно=%s, требуется=%s",
+            product_id, available, quantity
+        )
+        raise ValueError(
+            f"Недостаточно товара на складе. "
+            f"Доступно: {available}, требуется: {quantity}"
+        )
+    
+    @staticmethod
+    def _reserve_stock(db: Session, product_id: int, quantity: int):
+        """
+        Атомарно резервирует товар. Возвращает name и price товара.
+        """
+        row = db.execute(OrderService._reserve_stock_stmt(product_id, quantity)).first()
+        if row is not None:
+            logger.debug(
+                "Товар зарезервирован: product_id=%s, зарезервировано=%s, свободный остаток=%s",
+                product_id, quantity, row.quantity
+            )
+            return row
+        
+        available = db.execute(
+            select(Product.quantity).where(Product.id == product_id)
+        ).scalar_one_or_none()
+        OrderService._raise_reservation_failed(product_id, quantity, available)
+    
+    @staticmethod
+    def _item_returning_columns():
+        order_items = OrderItem.__table__
+        return (
+            order_items.c.id,
+            order_items.c.order_id,
+            order_items.c.order_date,
+            order_items.c.product_id,
+            order_items.c.product_name,
+            order_items.c.quantity,
+            order_items.c.unit_price,
+            order_items.c.discount_percent,
+            order_items.c.discount_amount,
+            order_items.c.total_price,
+        )
+    
+    @staticmethod
+    def _upsert_order_items_stmt(dialect_name: str, rows: list[dict]):
+        """
+        INSERT ... ON CONFLICT DO UPDATE для позиций заказа.
+        Для уже существующей пары (order_id, product_id) количество увеличивается,
+        а discount_amount и total_price пересчитываются в БД по цене и скидке позиции.
+        order_date позиции равна дате заказа, поэтому входит в ключ конфликта
+        (уникальность в секционированной таблице должна включать ключ секционирования).
+        """
+        order_items = OrderItem.__table__
+        insert_ = sqlite_insert if dialect_name == "sqlite" else postgresql_insert
+        stmt = insert_(order_items).values(rows)
+        new_quantity = order_items.c.quantity + stmt.excluded.quantity
+        gross = new_quantity * order_items.c.unit_price
+        discount = func.round(
+            gross * func.coalesce(order_items.c.discount_percent, 0) / 100, 2
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[order_items.c.order_id, order_items.c.product_id, order_items.c.order_date],
+            set_={
+                "quantity": new_quantity,
+                "discount_amount": discount,
+                "total_price": gross - discount,
+            },
+        ).returning(*OrderService._item_returning_columns())
+    
+    @staticmethod
+    def _order_totals_delta_stmt():
+        """
+        Инкрементальное обновление итогов заказа: к subtotal, discount_amount и
+        total_amount прибавляются изменения позиций. Выполняется в той же
+        транзакции, что и изменение позиций, поэтому итоги всегда согласованы.
+        Условие по order_date ограничивает UPDATE секцией заказа.
+        """
+        orders = Order.__table__
+        subtotal_delta = bindparam("subtotal_delta", type_=Numeric(12, 2))
+        discount_delta = bindparam("discount_delta", type_=Numeric(12, 2))
+        return (
+            update(orders)
+            .where(
+                orders.c.id == bindparam("target_order_id"),
+                orders.c.order_date == bindparam("target_order_date"),
+            )
+            .values(
+                subtotal=func.coalesce(orders.c.subtotal, 0) + subtotal_delta,
+                discount_amount=func.coalesce(orders.c.discount_amount, 0) + discount_delta,
+                total_amount=func.coalesce(orders.c.total_amount, 0) + subtotal_delta - discount_delta,
+            )
+        )
+    
+    @staticmethod
+    def _line_discount(gross: Decimal, discount_percent: Optional[int]) -> Decimal:
+        return (gross * Decimal(discount_percent or 0) / 100).quantize(
+            MONEY_QUANT, rounding=ROUND_HALF_UP
+        )
+    
+    @staticmethod
+    def _line_change(added_quantity: int, item) -> LineChange:
+        """
+        Изменение позиции после увеличения на added_quantity.
+        item - строка позиции после записи (RETURNING).
+        """
+        unit_price = Decimal(item.unit_price)
+        old_gross = unit_price * (item.quantity - added_quantity)
+        old_discount = OrderService._line_discount(old_gross, item.discount_percent)
+        return LineChange(
+            order_id=item.order_id,
+            order_date=item.order_date,
+            product_id=item.product_id,
+            quantity_delta=added_quantity,
+            subtotal_delta=unit_price * added_quantity,
+            discount_delta=Decimal(item.discount_amount or 0) - old_discount,
+        )
+    
+    @staticmethod
+    def _line_change_statements(changes: list[LineChange]) -> list[tuple]:
+        """
+        Команды, сопровождающие изменение позиций в той же транзакции:
+        обновление итогов заказов (по одной строке orders на заказ, в порядке ID)
+        и запись изменений в журнал продаж для инкрементального обновления отчетов.
+        Журнал только дополняется, поэтому не создает конкуренции за строки.
+        """
+        order_deltas: dict[tuple[int, datetime], list[Decimal]] = defaultdict(lambda: [Decimal(0), Decimal(0)])
+        for change in changes:
+            order_deltas[(change.order_id, change.order_date)][0] += change.subtotal_delta
+            order_deltas[(change.order_id, change.order_date)][1] += change.discount_delta
+        totals_params = [
+            {
+                "target_order_id": order_id,
+                "target_order_date": order_date,
+                "subtotal_delta": subtotal_delta,
+                "discount_delta": discount_delta,
+            }
+            for (order_id, order_date), (subtotal_delta, discount_delta) in sorted(order_deltas.items())
+        ]
+        journal_params = [
+            {
+                "order_id": change.order_id,
+                "order_date": change.order_date,
+                "product_id": change.product_id,
+                "quantity_delta": change.quantity_delta,
+                "amount_delta": change.subtotal_delta - change.discount_delta,
+            }
+            for change in changes
+        ]
+        return [
+            (OrderService._order_totals_delta_stmt(), totals_params),
+            (insert(ReportSalesJournal.__table__), journal_params),
+        ]
+    
+    @staticmethod
+    def _apply_line_changes(db: Session, changes: list[LineChange]) -> None:
+        for stmt, params in OrderService._line_change_statements(changes):
+            db.execute(stmt, params)
+    
+    @staticmethod
+    def _upsert_order_items(db: Session, rows: list[dict]) -> list:
+        """
+        Вставляет позиции заказа одной командой upsert.
+        Возвращает записанные строки (RETURNING) в порядке rows.
+        """
+        stmt = OrderService._upsert_order_items_stmt(db.get_bind().dialect.name, rows)
+        written = {
+            (row.order_id, row.product_id): row for row in db.execute(stmt)
+        }
+        return [written[(row["order_id"], row["product_id"])] for row in rows]
+    
+    @staticmethod
+    def _item_row(request: AddItemToOrderRequest, order_date: datetime, product) -> dict:
+        unit_price = Decimal(str(product.price))
+        return {
+            "order_id": request.order_id,
+            "order_date": order_date,
+            "product_id": request.product_id,
+            "product_name": product.name,
+            "quantity": request.quantity,
+            "unit_price": unit_price,
+            "total_price": unit_price * request.quantity,
+        }
+    
+    @staticmethod
+    def _check_item_stock(request: AddItemToOrderRequest, available: int, item) -> None:
+        """
+        Проверяет наличие товара на складе по итоговому количеству в позиции.
+        Конкурентные добавления той же позиции сериализуются на ее строке,
+        поэтому проверка видит количество с учетом всех зафиксированных изменений.
+        """
+        if available < item.quantity:
+            logger.warning(
+                "Недостаточно товара на складе: product_id=%s, доступно=%s, требуется=%s",
+                request.product_id, available, item.quantity
+            )
+            raise ValueError(
+                f"Недостаточно товара на складе. "
+                f"Доступно: {available}, требуется: {item.quantity}"
+            )
+    
+    @staticmethod
+    def _log_item_written(request: AddItemToOrderRequest, item) -> None:
+        if item.quantity > request.quantity:
+            logger.info(
+                "Количество товара увеличено: order_id=%s, product_id=%s, было=%s, стало=%s",
+                request.order_id, request.product_id, item.quantity - request.quantity, item.quantity
+            )
+        else:
+            logger.info(
+                "Новая позиция создана: order_id=%s, product_id=%s, quantity=%s, total_price=%s",
+                request.order_id, request.product_id, request.quantity, item.total_price
+            )
+    
+    @staticmethod
+    def add_item_to_order(
+        db: Session,
+        request: AddItemToOrderRequest,
+        reserve_stock: Optional[bool] = None,
+        lean: Optional[bool] = None,
+        idempotency_key: Optional[str] = None
+    ) -> Row:
         """
         Добавляет товар в заказ. Если товар уже есть - увеличивает количество.
         Проверяет наличие товара на складе.
+        Возвращает строку RETURNING позиции (колонки с именами полей OrderItemResponse):
+        обработчик строит ответ из нее без схемы pydantic.
+        
+        В режиме резервирования (stock.reservation или reserve_stock=True)
+        остаток товара списывается в резерв в той же транзакции, что и
+        изменение позиции заказа, без гонок между параллельными запросами.
+        
+        Облегченный режим (orders.lean или lean=True): заказ и товар читаются
+        запросами Core только нужных колонок, без объектов ORM; без резервирования
+        проверка заказа и чтение товара с остатком - один запрос.
+        
+        idempotency_key - ключ, занятый IdempotencyStore.begin в этой же сессии:
+        ответ записывается в строку ключа перед commit, в транзакции позиции.
         """
-        logger.info(f"Добавление товара в заказ: order_id={request.order_id}, product_id={request.product_id}, quantity={request.quantity}")
+        logger.info("Добавление товара в заказ: order_id=%s, product_id=%s, quantity=%s", request.order_id, request.product_id, request.quantity)
+        reservation = OrderService._reservation_enabled(reserve_stock)
+        lean = OrderService._lean_enabled(lean)
         
-        # Проверяем существование заказа
-        order = db.query(Order).filter(Order.id == request.order_id).first()
-        if not order:
-            logger.warning(f"Заказ с ID {request.order_id} не найден")
-            raise ValueError(f"Заказ с ID {request.order_id} не найден")
+        if lean and not reservation:
+            order_date, product, available = OrderService._load_order_and_product(db, request)
+        else:
+            # Проверяем существование заказа
+            if lean:
+                order_date = db.execute(OrderService._order_date_stmt(request.order_id)).scalar()
+            else:
+                order = db.query(Order).filter(
+                    Order.id == request.order_id, Order.order_date == OrderService._order_key_date(request.order_id)
+                ).first()
+                order_date = order.order_date if order else None
+            if order_date is None:
+                logger.warning("Заказ с ID %s не найден", request.order_id)
+                raise ValueError(f"Заказ с ID {request.order_id} не найден")
+            
+            if reservation:
+                try:
+                    product = OrderService._reserve_stock(db, request.product_id, request.quantity)
+                except ValueError:
+                    db.rollback()
+                    raise
+            else:
+                # Проверяем существование товара: атрибуты из кэша, остаток из БД
+                found = get_product_with_stock(db, request.product_id)
+                if not found:
+                    logger.warning("Товар с ID %s не найден", request.product_id)
+                    raise ValueError(f"Товар с ID {request.product_id} не найден")
+                product, available = found
         
-        logger.debug(f"Заказ найден: order_number={order.order_number}")
+        logger.debug("Товар найден: name=%s, price=%s", product.name, product.price)
         
-        # Проверяем существование товара и его количество на складе
-        product = db.query(Product).filter(Product.id == request.product_id).first()
-        if not product:
-            logger.warning(f"Товар с ID {request.product_id} не найден")
-            raise ValueError(f"Товар с ID {request.product_id} не найден")
+        # Вставка или увеличение количества одной командой
+        item = OrderService._upsert_order_items(
+            db, [OrderService._item_row(request, order_date, product)]
+        )[0]
         
-        logger.debug(f"Товар найден: name={product.name}, quantity_available={product.quantity}, price={product.price}")
+        if not reservation:
+            try:
+                OrderService._check_item_stock(request, available, item)
+            except ValueError:
+                db.rollback()
+                raise
         
-        # Проверяем наличие товара на складе
-        current_quantity_in_order = 0
-        existing_item = db.query(OrderItem).filter(
-            OrderItem.order_id == request.order_id,
-            OrderItem.product_id == request.product_id
-        ).first()
+        OrderService._apply_line_changes(db, [OrderService._line_change(request.quantity, item)])
+        if idempotency_key is not None:
+            db.execute(IdempotencyStore.record_stmt(idempotency_key, item))
+        db.commit()
+        OrderService._log_item_written(request, item)
+        
+        return item
+    
+    @staticmethod
+    async def add_item_to_order_async(
+        db: AsyncSession,
+        request: AddItemToOrderRequest,
+        reserve_stock: Optional[bool] = None,
+        lean: Optional[bool] = None,
+        idempotency_key: Optional[str] = None
+    ) -> Row:
+        """
+        Асинхронный вариант add_item_to_order для режима database.mode: async.
+        Логика и набор команд те же, ожидание БД не занимает поток.
+        """
+        logger.info("Добавление товара в заказ: order_id=%s, product_id=%s, quantity=%s", request.order_id, request.product_id, request.quantity)
+        reservation = OrderService._reservation_enabled(reserve_stock)
+        lean = OrderService._lean_enabled(lean)
         
-        if existing_item:
-            current_quantity_in_order = existing_item.quantity
-            logger.debug(f"Товар уже есть в заказе: текущее количество={current_quantity_in_order}")
+        if lean and not reservation:
+            row = (await db.execute(
+                OrderService._order_product_stmt(request.order_id, request.product_id)
+            )).one()
+            order_date, product, available = OrderService._order_and_product(request, row)
+        else:
+            order_date = (await db.execute(OrderService._order_date_stmt(request.order_id))).scalar()
+            if order_date is None:
+                logger.warning("Заказ с ID %s не найден", request.order_id)
+                raise ValueError(f"Заказ с ID {request.order_id} не найден")
+            
+            if reservation:
+                product = (await db.execute(
+                    OrderService._reserve_stock_stmt(request.product_id, request.quantity)
+                )).first()
+                if product is None:
+                    available = (await db.execute(
+                        select(Product.quantity).where(Product.id == request.product_id)
+                    )).scalar_one_or_none()
+                    await db.rollback()
+                    OrderService._raise_reservation_failed(request.product_id, request.quantity, available)
+            else:
+                found = await get_product_with_stock_async(db, request.product_id)
+                if not found:
+                    logger.warning("Товар с ID %s не найден", request.product_id)
+                    raise ValueError(f"Товар с ID {request.product_id} не найден")
+                product, available = found
         
-        required_quantity = current_quantity_in_order + request.quantity
+        logger.debug("Товар найден: name=%s, price=%s", product.name, product.price)
         
+        stmt = OrderService._upsert_order_items_stmt(
+            db.bind.dialect.name, [OrderService._item_row(request, order_date, product)]
+        )
+        item = (await db.execute(stmt)).one()
+        
+        if not reservation:
+            try:
+                OrderService._check_item_stock(request, available, item)
+            except ValueError:
+                await db.rollback()
+                raise
+        
+        for stmt, params in OrderService._line_change_statements(
+            [OrderService._line_change(request.quantity, item)]
+        ):
+            await db.execute(stmt, params)
+        if idempotency_key is not None:
+            await db.execute(IdempotencyStore.record_stmt(idempotency_key, item))
+        await db.commit()
+        OrderService._log_item_written(request, item)
+        
+        return item
+    
+    @staticmethod
+    def _check_bulk_stock(product: Product, required_quantity: int) -> None:
         if product.quantity < required_quantity:
             logger.warning(
-                f"Недостаточно товара на складе: product_id={request.product_id}, "
-                f"доступно={product.quantity}, требуется={required_quantity}"
+                "Недостаточно товара на складе: product_id=%s, доступно=%s, требуется=%s",
+                product.id, product.quantity, required_quantity
             )
             raise ValueError(
-                f"Недостаточно товара на складе. "
+                f"Недостаточно товара на складе (товар ID {product.id}). "
                 f"Доступно: {product.quantity}, требуется: {required_quantity}"
             )
+    
+    @staticmethod
+    def add_items_to_orders(
+        db: Session,
+        request: BulkAddItemsRequest,
+        reserve_stock: Optional[bool] = None
+    ) -> BulkAddItemsResponse:
+        """
+        Пакетное добавление товаров (add_item_rows) с результатом в виде схемы.
+        """
+        return BulkAddItemsResponse(items=[
+            OrderItemResponse.model_validate(row)
+            for row in OrderService.add_item_rows(db, request, reserve_stock)
+        ])
+    
+    @staticmethod
+    def add_item_rows(
+        db: Session,
+        request: BulkAddItemsRequest,
+        reserve_stock: Optional[bool] = None
+    ) -> list[Row]:
+        """
+        Пакетно добавляет товары в один или несколько заказов одной транзакцией.
+        Заказы и товары читаются запросами по множествам ID, позиции записываются
+        одной командой upsert, остаток проверяется по суммарному количеству на товар.
+        Либо применяются все позиции, либо ни одна.
+        
+        В режиме резервирования строки товаров блокируются (SELECT ... FOR UPDATE
+        в порядке ID) и остаток списывается в резерв.
+        
+        Возвращает строки RETURNING позиций в порядке строк запроса
+        (колонки с именами полей OrderItemResponse).
+        """
+        lines = request.items
+        logger.info("Пакетное добавление товаров: позиций=%s", len(lines))
+        reservation = OrderService._reservation_enabled(reserve_stock)
         
-        # Если товар уже есть в заказе - увеличиваем количество
-        if existing_item:
-            old_quantity = existing_item.quantity
-            existing_item.quantity += request.quantity
-            existing_item.total_price = Decimal(existing_item.quantity) * existing_item.unit_price
+        # Одинаковые пары (заказ, товар) в запросе сливаются в одну позицию
+        added_quantities: dict[tuple[int, int], int] = defaultdict(int)
+        for line in lines:
+            added_quantities[(line.order_id, line.product_id)] += line.quantity
+        
+        order_ids = {order_id for order_id, _ in added_quantities}
+        product_ids = {product_id for _, product_id in added_quantities}
+        
+        # Даты заказов из order_keys, соединение с orders по (id, order_date) читает
+        # только секции этих дат; архивированные заказы не находятся
+        order_keys = OrderKey.__table__
+        orders = Order.__table__
+        order_dates = dict(db.execute(
+            select(orders.c.id, orders.c.order_date)
+            .select_from(order_keys.join(
+                orders, and_(orders.c.id == order_keys.c.id, orders.c.order_date == order_keys.c.order_date)
+            ))
+            .where(order_keys.c.id.in_(order_ids))
+        ).all())
+        missing_order_ids = sorted(order_ids - order_dates.keys())
+        if missing_order_ids:
+            logger.warning("Заказы не найдены: %s", missing_order_ids)
+            raise ValueError(
+                f"Заказ с ID {', '.join(map(str, missing_order_ids))} не найден"
+            )
+        
+        products_query = db.query(Product).filter(Product.id.in_(product_ids))
+        if reservation:
+            # Единый порядок блокировок исключает взаимные блокировки между пакетами
+            products_query = products_query.order_by(Product.id).with_for_update()
+        products = {product.id: product for product in products_query}
+        missing_product_ids = sorted(product_ids - products.keys())
+        if missing_product_ids:
+            logger.warning("Товары не найдены: %s", missing_product_ids)
+            raise ValueError(
+                f"Товар с ID {', '.join(map(str, missing_product_ids))} не найден"
+            )
+        
+        try:
+            if reservation:
+                # Уже добавленное в заказы количество списано ранее,
+                # поэтому проверяется и резервируется только добавляемое
+                reserved_quantities: dict[int, int] = defaultdict(int)
+                for (_, product_id), quantity in added_quantities.items():
+                    reserved_quantities[product_id] += quantity
+                for product_id, quantity in reserved_quantities.items():
+                    OrderService._check_bulk_stock(products[product_id], quantity)
+                    products[product_id].quantity -= quantity
+                    products[product_id].reserved_quantity += quantity
+                db.flush()
+            
+            rows = []
+            for (order_id, product_id), quantity in added_quantities.items():
+                product = products[product_id]
+                unit_price = Decimal(str(product.price))
+                rows.append({
+                    "order_id": order_id,
+                    "order_date": order_dates[order_id],
+                    "product_id": product_id,
+                    "product_name": product.name,
+                    "quantity": quantity,
+                    "unit_price": unit_price,
+                    "total_price": unit_price * quantity,
+                })
+            items = {
+                (item.order_id, item.product_id): item
+                for item in OrderService._upsert_order_items(db, rows)
+            }
+            
+            if not reservation:
+                # Проверяем остаток по суммарному итоговому количеству
+                # во всех затронутых позициях товара
+                required_quantities: dict[int, int] = defaultdict(int)
+                for (_, product_id), item in items.items():
+                    required_quantities[product_id] += item.quantity
+                for product_id, required_quantity in required_quantities.items():
+                    OrderService._check_bulk_stock(products[product_id], required_quantity)
+            
+            OrderService._apply_line_changes(db, [
+                OrderService._line_change(added_quantities[key], item)
+                for key, item in items.items()
+            ])
+            
+            result = [items[(line.order_id, line.product_id)] for line in lines]
             db.commit()
-            db.refresh(existing_item)
-            logger.info(
-                f"Количество товара увеличено: order_id={request.order_id}, "
-                f"product_id={request.product_id}, было={old_quantity}, стало={existing_item.quantity}"
+        except Exception:
+            db.rollback()
+            raise
+        
+        logger.info(
+            "Пакетное добавление завершено: позиций в запросе=%s, записано позиций=%s, заказов=%s",
+            len(lines), len(items), len(order_ids)
+        )
+        return result
+
+    @staticmethod
+    def set_item_discount(db: Session, request: SetItemDiscountRequest) -> OrderItemResponse:
+        """
+        Устанавливает процент скидки позиции заказа. discount_amount и
+        total_price позиции пересчитываются в БД, изменение скидки
+        применяется к итогам заказа в той же транзакции.
+        """
+        logger.info(
+            "Изменение скидки позиции: order_id=%s, product_id=%s, discount_percent=%s",
+            request.order_id, request.product_id, request.discount_percent
+        )
+        order_items = OrderItem.__table__
+        item_filter = (
+            order_items.c.order_id == request.order_id,
+            order_items.c.product_id == request.product_id,
+            order_items.c.order_date == OrderService._order_key_date(request.order_id),
+        )
+        
+        old_discount = db.execute(
+            select(order_items.c.discount_amount, order_items.c.order_date)
+            .where(*item_filter)
+            .with_for_update()
+        ).first()
+        if old_discount is None:
+            logger.warning("Товар с ID %s в заказе %s не найден", request.product_id, request.order_id)
+            raise ValueError(f"Товар с ID {request.product_id} в заказе {request.order_id} не найден")
+        
+        gross = order_items.c.quantity * order_items.c.unit_price
+        discount = func.round(gross * request.discount_percent / 100, 2)
+        item = db.execute(
+            update(order_items)
+            .where(*item_filter)
+            .values(
+                discount_percent=request.discount_percent,
+                discount_amount=discount,
+                total_price=gross - discount,
             )
-            return OrderItemResponse.model_validate(existing_item)
+            .returning(*OrderService._item_returning_columns())
+        ).one()
         
-        # Создаем новую позицию в заказе
-        unit_price = Decimal(str(product.price))
-        new_item = OrderItem(
+        OrderService._apply_line_changes(db, [LineChange(
             order_id=request.order_id,
+            order_date=old_discount.order_date,
             product_id=request.product_id,
-            product_name=product.name,
-            quantity=request.quantity,
-            unit_price=unit_price,
-            total_price=unit_price * request.quantity
-        )
-        
-        db.add(new_item)
+            quantity_delta=0,
+            subtotal_delta=Decimal(0),
+            discount_delta=Decimal(item.discount_amount or 0) - Decimal(old_discount.discount_amount or 0),
+        )])
         db.commit()
-        db.refresh(new_item)
         
         logger.info(
-            f"Новая позиция создана: order_id={request.order_id}, "
-            f"product_id={request.product_id}, quantity={request.quantity}, "
-            f"total_price={new_item.total_price}"
+            "Скидка позиции изменена: order_id=%s, product_id=%s, discount_amount=%s",
+            request.order_id, request.product_id, item.discount_amount
+        )
+        return OrderItemResponse.model_validate(item)
+    
+    @staticmethod
+    def reconcile_order_totals(db: Session, from_order_id: int, to_order_id: int) -> int:
+        """
+        Пересчитывает итоги заказов с ID из диапазона [from_order_id, to_order_id]
+        по их позициям одной командой UPDATE ... FROM. Используется для сверки
+        инкрементально поддерживаемых итогов и для заказов, загруженных в обход
+        сервиса. Возвращает количество обновленных заказов, commit не выполняет.
+        """
+        orders = Order.__table__
+        order_items = OrderItem.__table__
+        sums = (
+            select(
+                orders.c.id.label("order_id"),
+                func.coalesce(func.sum(order_items.c.quantity * order_items.c.unit_price), 0).label("subtotal"),
+                func.coalesce(func.sum(order_items.c.discount_amount), 0).label("discount"),
+            )
+            .select_from(orders.outerjoin(
+                order_items,
+                and_(order_items.c.order_id == orders.c.id, order_items.c.order_date == orders.c.order_date)
+            ))
+            .where(orders.c.id.between(from_order_id, to_order_id))
+            .group_by(orders.c.id)
+            .subquery()
+        )
+        result = db.execute(
+            update(orders)
+            .where(orders.c.id == sums.c.order_id)
+            .values(
+                subtotal=sums.c.subtotal,
+                discount_amount=sums.c.discount,
+                total_amount=sums.c.subtotal - sums.c.discount
+                + func.coalesce(orders.c.tax_amount, 0)
+                + func.coalesce(orders.c.shipping_amount, 0),
+            )
+        )
+        logger.info(
+            "Итоги заказов пересчитаны: ID %s-%s, заказов=%s",
+            from_order_id, to_order_id, result.rowcount
+        )
+        return result.rowcount
+    
+    @staticmethod
+    def list_orders(
+        db: Session,
+        customer_id: Optional[int] = None,
+        status_id: Optional[int] = None,
+        source_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        before_id: Optional[int] = None,
+        limit: int = 50,
+    ) -> dict:
+        """
+        Список заказов от новых к старым с keyset-пагинацией по id:
+        следующая страница - заказы с id < next_before_id, без OFFSET.
+        Фильтры по клиенту, статусу и источнику обслуживают индексы (поле, id),
+        период [date_from, date_to) по order_date ограничивает чтение секциями периода.
+        Читаются только колонки списка, без загрузки объектов ORM; ответ в форме
+        OrderListResponse собирается словарями из строк, без валидации pydantic.
+        """
+        orders = Order.__table__
+        stmt = select(*(orders.c[name] for name in OrderSummaryResponse.model_fields))
+        for column, value in (
+            (orders.c.customer_id, customer_id),
+            (orders.c.status_id, status_id),
+            (orders.c.source_id, source_id),
+        ):
+            if value is not None:
+                stmt = stmt.where(column == value)
+        if date_from is not None:
+            stmt = stmt.where(orders.c.order_date >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(orders.c.order_date < date_to)
+        if before_id is not None:
+            stmt = stmt.where(orders.c.id < before_id)
+        # Лишняя строка показывает, есть ли следующая страница
+        rows = db.execute(stmt.order_by(orders.c.id.desc()).limit(limit + 1)).all()
+        page = rows[:limit]
+        return {
+            "items": rows_to_dicts(page, OrderSummaryResponse.model_fields),
+            "next_before_id": page[-1].id if len(rows) > limit else None,
+        }
+    
+    @staticmethod
+    def get_order(db: Session, order_id: int) -> OrderDetailResponse:
+        """
+        Заказ с позициями, платежами, историей статусов и комментариями.
+        Коллекции загружаются selectinload - всегда 5 запросов независимо
+        от количества строк; остальные связи загружать запрещено (raiseload).
+        Каждый запрос ограничен датой заказа из order_keys и читает одну секцию.
+        """
+        order_date = OrderService._order_key_date(order_id)
+        order = (
+            db.query(Order)
+            .options(
+                selectinload(Order.items),
+                selectinload(Order.payments),
+                selectinload(Order.status_history),
+                selectinload(Order.comments),
+                raiseload("*"),
+                *(
+                    with_loader_criteria(model, model.order_date == order_date)
+                    for model in (OrderItem, Payment, OrderStatusHistory, OrderComment)
+                ),
+            )
+            .filter(Order.id == order_id, Order.order_date == order_date)
+            .first()
+        )
+        if order is None:
+            logger.warning("Заказ с ID %s не найден", order_id)
+            raise ValueError(f"Заказ с ID {order_id} не найден")
+        return OrderDetailResponse.model_validate(order)
+
+
+class CategoryService:
+    """
+    Дерево категорий с таблицей замыкания category_closure.
+    Создание, перенос и удаление категорий обновляют замыкание в той же
+    транзакции, поэтому запросы по поддереву выполняются одним индексным
+    поиском без рекурсивного обхода.
+    """
+    
+    # Ключ advisory lock PostgreSQL, упорядочивающий изменения дерева категорий
+    TREE_LOCK_KEY = 7_340_002
+    
+    @staticmethod
+    def _lock_tree(db: Session) -> None:
+        """
+        Блокировка дерева до конца транзакции (PostgreSQL, pg_advisory_xact_lock):
+        изменения дерева выполняются по одному, проверки (перенос в собственное
+        поддерево, наличие дочерних) видят результат предыдущего изменения,
+        и замыкание не расходится с parent_id. В SQLite запись и так последовательна.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(select(func.pg_advisory_xact_lock(CategoryService.TREE_LOCK_KEY)))
+    
+    @staticmethod
+    def _get_category(db: Session, category_id: int) -> Category:
+        category = db.get(Category, category_id)
+        if not category:
+            logger.warning("Категория с ID %s не найдена", category_id)
+            raise ValueError(f"Категория с ID {category_id} не найдена")
+        return category
+    
+    @staticmethod
+    def rebuild_closure(db) -> None:
+        """
+        Полностью пересобирает таблицу замыкания по categories.parent_id.
+        Нужна после загрузки категорий в обход сервиса. db - Session или Connection,
+        commit выполняет вызывающий код.
+        """
+        categories = Category.__table__
+        closure = CategoryClosure.__table__
+        paths = select(
+            categories.c.id.label("ancestor_id"),
+            categories.c.id.label("descendant_id"),
+            literal(0).label("depth"),
+        ).cte("paths", recursive=True)
+        paths = paths.union_all(
+            select(paths.c.ancestor_id, categories.c.id, paths.c.depth + 1)
+            .join(paths, categories.c.parent_id == paths.c.descendant_id)
+        )
+        db.execute(delete(closure))
+        db.execute(insert(closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(paths.c.ancestor_id, paths.c.descendant_id, paths.c.depth)
+        ))
+        logger.info("Таблица замыкания категорий пересобрана")
+    
+    @staticmethod
+    def _link_subtree(db: Session, category_id: int, parent_id: int) -> None:
+        """
+        Связывает поддерево category_id со всеми предками parent_id.
+        """
+        closure = CategoryClosure.__table__
+        ancestors = closure.alias("ancestors")
+        subtree = closure.alias("subtree")
+        db.execute(insert(closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                ancestors.c.ancestor_id,
+                subtree.c.descendant_id,
+                ancestors.c.depth + subtree.c.depth + 1,
+            )
+            .select_from(ancestors.join(subtree, literal(True)))
+            .where(ancestors.c.descendant_id == parent_id, subtree.c.ancestor_id == category_id)
+        ))
+    
+    @staticmethod
+    def create_category(db: Session, request: CategoryCreateRequest) -> Category:
+        CategoryService._lock_tree(db)
+        if request.parent_id is not None:
+            CategoryService._get_category(db, request.parent_id)
+        category = Category(name=request.name, parent_id=request.parent_id)
+        db.add(category)
+        db.flush()
+        db.execute(insert(CategoryClosure.__table__).values(
+            ancestor_id=category.id, descendant_id=category.id, depth=0
+        ))
+        if request.parent_id is not None:
+            CategoryService._link_subtree(db, category.id, request.parent_id)
+        db.commit()
+        logger.info("Категория создана: id=%s, parent_id=%s", category.id, request.parent_id)
+        return category
+    
+    @staticmethod
+    def move_category(db: Session, category_id: int, request: CategoryMoveRequest) -> Category:
+        """
+        Переносит категорию вместе с поддеревом под другого родителя
+        (или в корень при parent_id=None).
+        """
+        CategoryService._lock_tree(db)
+        category = CategoryService._get_category(db, category_id)
+        closure = CategoryClosure.__table__
+        if request.parent_id is not None:
+            CategoryService._get_category(db, request.parent_id)
+            in_subtree = db.execute(select(exists().where(
+                closure.c.ancestor_id == category_id,
+                closure.c.descendant_id == request.parent_id,
+            ))).scalar()
+            if in_subtree:
+                raise ValueError(
+                    f"Нельзя перенести категорию {category_id} в собственное поддерево"
+                )
+        
+        # Отвязываем поддерево от прежних предков
+        subtree_ids = select(closure.c.descendant_id).where(closure.c.ancestor_id == category_id)
+        db.execute(delete(closure).where(
+            closure.c.descendant_id.in_(subtree_ids),
+            closure.c.ancestor_id.not_in(subtree_ids),
+        ))
+        if request.parent_id is not None:
+            CategoryService._link_subtree(db, category_id, request.parent_id)
+        category.parent_id = request.parent_id
+        db.commit()
+        logger.info("Категория перенесена: id=%s, parent_id=%s", category_id, request.parent_id)
+        return category
+    
+    @staticmethod
+    def delete_category(db: Session, category_id: int) -> None:
+        """
+        Удаляет категорию без дочерних категорий и товаров.
+        """
+        CategoryService._lock_tree(db)
+        category = CategoryService._get_category(db, category_id)
+        has_children = db.execute(
+            select(exists().where(Category.parent_id == category_id))
+        ).scalar()
+        has_products = db.execute(
+            select(exists().where(Product.category_id == category_id))
+        ).scalar()
+        if has_children or has_products:
+            raise ValueError(
+                f"Категория {category_id} содержит дочерние категории или товары"
+            )
+        db.execute(delete(CategoryClosure.__table__).where(
+            CategoryClosure.descendant_id == category_id
+        ))
+        db.delete(category)
+        db.commit()
+        logger.info("Категория удалена: id=%s", category_id)
+    
+    @staticmethod
+    def descendants(db: Session, category_id: int, max_depth: Optional[int] = None) -> list:
+        """
+        Все потомки категории (без нее самой) с глубиной относительно нее.
+        """
+        CategoryService._get_category(db, category_id)
+        closure = CategoryClosure.__table__
+        categories = Category.__table__
+        stmt = (
+            select(categories.c.id, categories.c.name, categories.c.parent_id, closure.c.depth)
+            .join(categories, categories.c.id == closure.c.descendant_id)
+            .where(closure.c.ancestor_id == category_id, closure.c.depth > 0)
+            .order_by(closure.c.depth, categories.c.id)
         )
+        if max_depth is not None:
+            stmt = stmt.where(closure.c.depth <= max_depth)
+        return db.execute(stmt).all()
+    
+    @staticmethod
+    def root_of(db: Session, category_id: int):
+        """
+        Категория 1-го уровня для category_id - самый дальний предок.
+        """
+        closure = CategoryClosure.__table__
+        categories = Category.__table__
+        root = db.execute(
+            select(categories.c.id, categories.c.name, categories.c.parent_id)
+            .join(closure, categories.c.id == closure.c.ancestor_id)
+            .where(closure.c.descendant_id == category_id)
+            .order_by(closure.c.depth.desc())
+            .limit(1)
+        ).first()
+        if root is None:
+            logger.warning("Категория с ID %s не найдена", category_id)
+            raise ValueError(f"Категория с ID {category_id} не найдена")
+        return root
+    
+    @staticmethod
+    def subtree_product_count(db: Session, category_id: int) -> int:
+        """
+        Количество товаров в категории и всех ее потомках.
+        """
+        CategoryService._get_category(db, category_id)
+        closure = CategoryClosure.__table__
+        products = Product.__table__
+        return db.execute(
+            select(func.count(products.c.id))
+            .select_from(closure.join(products, products.c.category_id == closure.c.descendant_id))
+            .where(closure.c.ancestor_id == category_id)
+        ).scalar_one()
+
+
+class ReportService:
+    """
+    Сводные таблицы для отчетов из tasks/request.sql.
+    
+    Сервис заказов дописывает изменения позиций в журнал report_sales_journal,
+    refresh() переносит накопленный журнал в сводные таблицы и очищает его.
+    Обновление выполняется заданием (python -m app.jobs refresh-reports),
+    а не в транзакции добавления товара: иначе все заказы горячего товара
+    конкурировали бы за одну строку сводки.
+    """
+    
+    # Ключ advisory lock PostgreSQL, исключающий параллельные обновления отчетов
+    REFRESH_LOCK_KEY = 7_340_001
+    
+    @staticmethod
+    def _begin_snapshot(db: Session) -> bool:
+        """
+        Начинает транзакцию обновления отчетов. В PostgreSQL - REPEATABLE READ,
+        чтобы агрегирование и удаление журнала видели один и тот же набор строк,
+        и advisory lock против параллельного обновления.
+        Возвращает False, если обновление уже выполняется другим процессом.
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return True
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        return bool(db.execute(
+            select(func.pg_try_advisory_xact_lock(ReportService.REFRESH_LOCK_KEY))
+        ).scalar())
+    
+    @staticmethod
+    def _upsert_additive(db: Session, table, key_columns: list[str], value_columns: list[str], source) -> None:
+        """
+        INSERT ... SELECT ... ON CONFLICT DO UPDATE с прибавлением значений
+        к уже накопленным в сводной таблице.
+        """
+        insert_ = sqlite_insert if db.get_bind().dialect.name == "sqlite" else postgresql_insert
+        stmt = insert_(table).from_select(key_columns + value_columns, source)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={name: table.c[name] + stmt.excluded[name] for name in value_columns},
+        ))
+    
+    @staticmethod
+    def _sales_date(orders):
+        return func.date(func.coalesce(orders.c.order_date, orders.c.created_at), type_=Date)
+    
+    @staticmethod
+    def refresh(db: Session) -> int:
+        """
+        Инкрементально переносит журнал продаж в сводные таблицы:
+        продажи товара по дням и суммы по клиентам.
+        Возвращает количество обработанных записей журнала.
+        """
+        if not ReportService._begin_snapshot(db):
+            logger.info("Обновление отчетов уже выполняется, пропуск")
+            db.rollback()
+            return 0
+        
+        journal = ReportSalesJournal.__table__
+        orders = Order.__table__
+        max_id = db.execute(select(func.max(journal.c.id))).scalar()
+        processed = 0
+        if max_id is not None:
+            batch = journal.c.id <= max_id
+            source = journal.join(orders, and_(
+                orders.c.id == journal.c.order_id, orders.c.order_date == journal.c.order_date
+            ))
+            sales_date = ReportService._sales_date(orders)
+            
+            daily = ReportDailyProductSales.__table__
+            ReportService._upsert_additive(
+                db, daily, ["sales_date", "product_id"], ["quantity", "amount"],
+                select(
+                    sales_date,
+                    journal.c.product_id,
+                    func.sum(journal.c.quantity_delta),
+                    func.sum(journal.c.amount_delta),
+                ).select_from(source).where(batch).group_by(sales_date, journal.c.product_id)
+            )
+            
+            clients = ReportClientTotals.__table__
+            ReportService._upsert_additive(
+                db, clients, ["client_id"], ["total_amount"],
+                select(orders.c.customer_id, func.sum(journal.c.amount_delta))
+                .select_from(source)
+                .where(batch, orders.c.customer_id.is_not(None))
+                .group_by(orders.c.customer_id)
+            )
+            
+            processed = db.execute(delete(journal).where(batch)).rowcount
+        
+        db.commit()
+        logger.info("Отчеты обновлены: записей журнала=%s", processed)
+        return processed
+    
+    @staticmethod
+    def rebuild(db: Session) -> None:
+        """
+        Полностью пересобирает сводные таблицы по order_items.
+        Нужен для первоначального заполнения и после загрузки данных в обход сервиса.
+        Секции, перенесенные в архив (python -m app.init_db archive), в пересборку не входят.
+        """
+        if not ReportService._begin_snapshot(db):
+            logger.info("Обновление отчетов уже выполняется, пропуск")
+            db.rollback()
+            return
         
-        return OrderItemResponse.model_validate(new_item)
+        order_items = OrderItem.__table__
+        orders = Order.__table__
+        daily = ReportDailyProductSales.__table__
+        clients = ReportClientTotals.__table__
+        source = order_items.join(orders, and_(
+            orders.c.id == order_items.c.order_id, orders.c.order_date == order_items.c.order_date
+        ))
+        sales_date = ReportService._sales_date(orders)
+        
+        # Журнал, видимый в снимке, уже учтен в order_items
+        db.execute(delete(ReportSalesJournal.__table__))
+        db.execute(delete(daily))
+        db.execute(delete(clients))
+        db.execute(insert(daily).from_select(
+            ["sales_date", "product_id", "quantity", "amount"],
+            select(
+                sales_date,
+                order_items.c.product_id,
+                func.sum(order_items.c.quantity),
+                func.sum(order_items.c.total_price),
+            ).select_from(source).group_by(sales_date, order_items.c.product_id)
+        ))
+        db.execute(insert(clients).from_select(
+            ["client_id", "total_amount"],
+            select(orders.c.customer_id, func.sum(order_items.c.total_price))
+            .select_from(source)
+            .where(orders.c.customer_id.is_not(None))
+            .group_by(orders.c.customer_id)
+        ))
+        db.commit()
+        logger.info("Отчеты пересобраны полностью")
+    
+    @staticmethod
+    def top_products(db: Session, days: int = 30, limit: int = 5) -> list:
+        """
+        Самые покупаемые товары за последние days дней (по количеству штук)
+        с категорией 1-го уровня.
+        """
+        daily = ReportDailyProductSales.__table__
+        products = Product.__table__
+        closure = CategoryClosure.__table__
+        roots = Category.__table__.alias("root")
+        quantity = func.sum(daily.c.quantity).label("quantity")
+        # Категория 1-го уровня - предок из таблицы замыкания без родителя
+        product_root = closure.join(
+            roots, and_(roots.c.id == closure.c.ancestor_id, roots.c.parent_id.is_(None))
+        )
+        return db.execute(
+            select(
+                products.c.id.label("product_id"),
+                products.c.name.label("product_name"),
+                roots.c.name.label("category_name"),
+                quantity,
+            )
+            .select_from(
+                daily.join(products, products.c.id == daily.c.product_id)
+                .outerjoin(product_root, closure.c.descendant_id == products.c.category_id)
+            )
+            .where(daily.c.sales_date >= date.today() - timedelta(days=days))
+            .group_by(products.c.id, products.c.name, roots.c.name)
+            .order_by(quantity.desc())
+            .limit(limit)
+        ).all()
+    
+    @staticmethod
+    def client_totals(db: Session, limit: int = 100, offset: int = 0) -> list:
+        """
+        Сумма заказанных товаров по клиентам.
+        """
+        totals = ReportClientTotals.__table__
+        clients = Client.__table__
+        return db.execute(
+            select(
+                clients.c.id.label("client_id"),
+                clients.c.name.label("client_name"),
+                totals.c.total_amount,
+            )
+            .select_from(totals.join(clients, clients.c.id == totals.c.client_id))
+            .order_by(clients.c.id)
+            .limit(limit)
+            .offset(offset)
+        ).all()
+    
+    @staticmethod
+    def category_children(db: Session) -> list:
+        """
+        Количество дочерних элементов первого уровня для каждой категории
+        (использует индекс ix_categories_parent_id).
+        """
+        parents = Category.__table__.alias("p")
+        children = Category.__table__.alias("c")
+        return db.execute(
+            select(
+                parents.c.id.label("category_id"),
+                parents.c.name.label("category_name"),
+                func.count(children.c.id).label("children_count"),
+            )
+            .select_from(parents.outerjoin(children, children.c.parent_id == parents.c.id))
+            .group_by(parents.c.id, parents.c.name)
+            .order_by(parents.c.id)
+        ).all()
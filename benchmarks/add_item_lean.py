@@ -0,0 +1,93 @@
+"""
+Бенчмарк OrderService.add_item_to_order в режимах orders.lean:
+- orm  - заказ загружается объектом ORM, товар - через кэш атрибутов и запрос остатка;
+- lean - заказ и товар с остатком одним запросом Core только нужных колонок.
+
+Вызовы выполняются последовательно в одном потоке, каждый - отдельная сессия,
+как запрос API. Выводится время и процессорное время на вызов и число SQL-запросов
+(обращений к БД) на вызов. Для SQLite процессорное время включает работу самой БД
+в процессе, для PostgreSQL - только приложение.
+
+Пример:
+    python -m benchmarks.add_item_lean --calls 2000
+"""
+import argparse
+import random
+import time
+
+from app.schemas import AddItemToOrderRequest
+from app.services import OrderService
+from benchmarks.common import (
+    StatementCounter, add_database_argument, make_engine, make_session_factory, quiet_app_logging, seed_dataset
+)
+
+
+def run_mode(session_factory, counter: StatementCounter, lean: bool, pairs: list[tuple[int, int]]) -> dict:
+    counter.reset()
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    for order_id, product_id in pairs:
+        with session_factory() as db:
+            OrderService.add_item_to_order(
+                db, AddItemToOrderRequest(order_id=order_id, product_id=product_id, quantity=1), lean=lean
+            )
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    calls = len(pairs)
+    return {
+        "mode": "lean" if lean else "orm",
+        "calls": calls,
+        "ms_per_call": elapsed * 1000 / calls,
+        "cpu_ms_per_call": cpu * 1000 / calls,
+        "statements_per_call": counter.reset() / calls,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_argument(parser)
+    parser.add_argument("--calls", type=int, default=2_000, help="Вызовов на режим")
+    parser.add_argument("--orders", type=int, default=2_000)
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--rounds", type=int, default=3, help="Чередующихся прогонов каждого режима")
+    args = parser.parse_args()
+
+    quiet_app_logging()
+    engine = make_engine(args.database_url, pool_size=1)
+    ids = seed_dataset(engine, products=args.products, orders=args.orders, lines_per_order=1)
+    session_factory = make_session_factory(engine)
+    counter = StatementCounter(engine)
+
+    rnd = random.Random(42)
+    pairs = [
+        (rnd.randint(*ids["order_ids"]), rnd.randint(*ids["product_ids"]))
+        for _ in range(args.calls)
+    ]
+    # Прогрев: кэш атрибутов товаров, кэш компиляции запросов, пул соединений
+    run_mode(session_factory, counter, False, pairs[:200])
+    run_mode(session_factory, counter, True, pairs[:200])
+
+    results = {"orm": [], "lean": []}
+    for _ in range(args.rounds):
+        for lean in (False, True):
+            result = run_mode(session_factory, counter, lean, pairs)
+            results[result["mode"]].append(result)
+
+    print(f"{'mode':<6} {'calls':>7} {'ms/call':>9} {'cpu ms/call':>12} {'SQL/call':>9}")
+    best = {}
+    for mode, runs in results.items():
+        best[mode] = min(runs, key=lambda run: run["cpu_ms_per_call"])
+        run = best[mode]
+        print(
+            f"{mode:<6} {run['calls']:>7} {run['ms_per_call']:>9.3f} "
+            f"{run['cpu_ms_per_call']:>12.3f} {run['statements_per_call']:>9.2f}"
+        )
+    orm, lean = best["orm"], best["lean"]
+    print(
+        f"lean: процессорное время {100 * (1 - lean['cpu_ms_per_call'] / orm['cpu_ms_per_call']):.0f}% меньше, "
+        f"SQL-запросов на вызов {orm['statements_per_call'] - lean['statements_per_call']:.2f} меньше"
+    )
+
+
+if __name__ == "__main__":
+    main()
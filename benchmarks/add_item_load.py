@@ -0,0 +1,250 @@
+"""
+Нагрузочный тест POST /api/orders/add-item через ASGI-приложение целиком
+(маршрутизация, валидация, сервис, БД) без сетевого сервера.
+
+Заполняет тестовую БД (seed_dataset), затем для каждого сценария отправляет
+--requests запросов с фиксированной параллельностью --concurrency:
+- uniform - случайный товар в случайный заказ;
+- hot-sku - все запросы в --hot-skus товаров (конкуренция за строки products).
+
+Для сценария считаются перцентили задержки p50/p95/p99, пропускная способность,
+обращения к БД на запрос (SQL-запросы + COMMIT/ROLLBACK), доля ошибок (5xx и исключения)
+и отказов (4xx). Результаты сохраняются в JSON для сравнения между изменениями OrderService.
+
+Пример:
+    python -m benchmarks.add_item_load --database-url postgresql+psycopg2://postgres@localhost:5432/orders_bench \\
+        --concurrency 32 --requests 5000 --output benchmarks/results/baseline.json
+
+Нужен httpx: pip install -r benchmarks/requirements.txt
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import subprocess
+import time
+
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from sqlalchemy import event
+
+from config import setting
+from app.database import ASYNC_MODE, get_async_db, get_db, to_async_url
+from app.main import app
+from benchmarks.common import (
+    StatementCounter, add_database_argument, make_engine, make_session_factory,
+    quiet_app_logging, seed_dataset
+)
+
+SCENARIOS = ("uniform", "hot-sku")
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+class RoundTripCounter(StatementCounter):
+    """
+    StatementCounter, учитывающий также COMMIT и ROLLBACK.
+    """
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        for name in ("commit", "rollback"):
+            event.listen(engine, name, self._on_transaction_end)
+
+    def _on_transaction_end(self, conn) -> None:
+        with self._lock:
+            self.count += 1
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def install_database(database_url: str, engine) -> RoundTripCounter:
+    """
+    Подменяет зависимости get_db / get_async_db приложения на сессии тестовой БД
+    и возвращает счетчик обращений к ней.
+    """
+    if ASYNC_MODE:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        async_engine = create_async_engine(to_async_url(database_url))
+        async_session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def _get_async_db():
+            async with async_session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_async_db] = _get_async_db
+        return RoundTripCounter(async_engine.sync_engine)
+
+    session_factory = make_session_factory(engine)
+
+    def _get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _get_db
+    return RoundTripCounter(engine)
+
+
+def make_payloads(scenario: str, dataset: dict, count: int, hot_skus: int, random_seed: int) -> list[dict]:
+    rnd = random.Random(random_seed)
+    first_order, last_order = dataset["order_ids"]
+    first_product, last_product = dataset["product_ids"]
+    if scenario == "hot-sku":
+        last_product = min(last_product, first_product + hot_skus - 1)
+    return [
+        {
+            "order_id": rnd.randint(first_order, last_order),
+            "product_id": rnd.randint(first_product, last_product),
+            "quantity": 1,
+        }
+        for _ in range(count)
+    ]
+
+
+async def drive(client: httpx.AsyncClient, payloads: list[dict], concurrency: int) -> tuple[list[float], Counter, float]:
+    """
+    Отправляет payloads из concurrency параллельных воркеров.
+    Возвращает задержки (мс), счетчик статусов и общее время.
+    """
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    queue = iter(payloads)
+
+    async def worker() -> None:
+        for payload in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.post("/api/orders/add-item", json=payload)
+                statuses[response.status_code] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+async def run_scenario(client, counter: RoundTripCounter, scenario: str, dataset: dict, args) -> dict:
+    warmup = make_payloads(scenario, dataset, args.warmup, args.hot_skus, args.random_seed + 1)
+    await drive(client, warmup, args.concurrency)
+
+    payloads = make_payloads(scenario, dataset, args.requests, args.hot_skus, args.random_seed)
+    counter.reset()
+    latencies, statuses, elapsed = await drive(client, payloads, args.concurrency)
+    round_trips = counter.reset()
+
+    latencies.sort()
+    total = len(payloads)
+    errors = sum(n for code, n in statuses.items() if not isinstance(code, int) or code >= 500)
+    rejected = sum(n for code, n in statuses.items() if isinstance(code, int) and 400 <= code < 500)
+    return {
+        "scenario": scenario,
+        "requests": total,
+        "concurrency": args.concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 3),
+            "p95": round(_percentile(latencies, 95), 3),
+            "p99": round(_percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "db_round_trips_per_request": round(round_trips / total, 2) if total else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "rejected_rate": round(rejected / total, 4) if total else 0.0,
+        "statuses": {str(code): n for code, n in sorted(statuses.items(), key=str)},
+    }
+
+
+async def run(args, dataset: dict, counter: RoundTripCounter) -> list[dict]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return [
+            await run_scenario(client, counter, scenario, dataset, args)
+            for scenario in args.scenarios
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_argument(parser)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000, help="Запросов на сценарий")
+    parser.add_argument("--warmup", type=int, default=200, help="Прогревочных запросов перед сценарием")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--hot-skus", type=int, default=1, help="Число горячих товаров в сценарии hot-sku")
+    parser.add_argument("--clients", type=int, default=1_000)
+    parser.add_argument("--products", type=int, default=5_000)
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--lines-per-order", type=int, default=5)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=None, help="JSON с результатами")
+    args = parser.parse_args()
+
+    quiet_app_logging()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    engine = make_engine(args.database_url, pool_size=args.concurrency)
+    dataset = seed_dataset(
+        engine,
+        clients=args.clients,
+        products=args.products,
+        orders=args.orders,
+        lines_per_order=args.lines_per_order,
+        random_seed=args.random_seed,
+    )
+    counter = install_database(args.database_url, engine)
+    results = asyncio.run(run(args, dataset, counter))
+
+    print(f"{'scenario':<9} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db/req':>7} {'errors':>7} {'4xx':>7}")
+    for result in results:
+        latency = result["latency_ms"]
+        print(
+            f"{result['scenario']:<9} {result['throughput_rps']:>9} {latency['p50']:>8} {latency['p95']:>8} "
+            f"{latency['p99']:>8} {result['db_round_trips_per_request']:>7} "
+            f"{result['error_rate']:>7} {result['rejected_rate']:>7}"
+        )
+
+    output = args.output or RESULTS_DIR / f"add_item_load-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "benchmark": "add_item_load",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "database": engine.dialect.name,
+        "settings": {
+            "database_mode": "async" if ASYNC_MODE else "sync",
+            "stock_reservation": bool(setting.stock.reservation),
+            "cache_enabled": bool(setting.cache.enabled),
+        },
+        "dataset": dataset,
+        "results": results,
+    }, ensure_ascii=False, indent=2))
+    print(f"Результаты сохранены: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Бенчмарк объединения add-item в один "горячий" заказ.
+
+Потоки параллельно добавляют товары (случайные из --products) в один заказ:
+- direct    - каждый запрос отдельной транзакцией OrderService.add_item_to_order;
+- coalesced - через AddItemCoalescer (окно --window-ms, пакет до --max-batch-size).
+
+Выводится пропускная способность, число транзакций-пакетов и проверка,
+что итоговое количество в заказе равно сумме добавленного.
+
+Пример:
+    python -m benchmarks.coalescing --threads 32 --requests 4000 --window-ms 5
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.coalescing import AddItemCoalescer
+from app.models import Client, Order, OrderItem, Product
+from app.schemas import AddItemToOrderRequest
+from app.services import OrderService
+from benchmarks.common import add_database_argument, make_engine, make_session_factory, quiet_app_logging
+
+
+def seed(session_factory, products: int) -> tuple[int, list[int]]:
+    """
+    Создает один заказ и products товаров с большим остатком.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    with session_factory() as db:
+        client = Client(name=f"bench-{run_id}")
+        items = [
+            Product(name=f"coalesce-{run_id}-{i}", quantity=10_000_000, reserved_quantity=0, price=Decimal("10.00"))
+            for i in range(products)
+        ]
+        db.add_all([client, *items])
+        db.flush()
+        order = Order(customer_id=client.id, order_number=f"bench-{run_id}")
+        db.add(order)
+        db.commit()
+        return order.id, [product.id for product in items]
+
+
+def run_mode(session_factory, mode: str, args) -> dict:
+    order_id, product_ids = seed(session_factory, args.products)
+    coalescer = AddItemCoalescer(args.window_ms, args.max_batch_size) if mode == "coalesced" else None
+    per_thread = args.requests // args.threads
+    counters = {"ok": 0, "errors": 0}
+    counters_lock = threading.Lock()
+    start_barrier = threading.Barrier(args.threads + 1)
+
+    def worker(seed_value: int) -> None:
+        rnd = random.Random(seed_value)
+        ok = errors = 0
+        start_barrier.wait()
+        for _ in range(per_thread):
+            request = AddItemToOrderRequest(order_id=order_id, product_id=rnd.choice(product_ids), quantity=1)
+            db = session_factory()
+            try:
+                if coalescer is not None:
+                    coalescer.add_item(db, request)
+                else:
+                    OrderService.add_item_to_order(db, request)
+                ok += 1
+            except Exception:
+                errors += 1
+            finally:
+                db.close()
+        with counters_lock:
+            counters["ok"] += ok
+            counters["errors"] += errors
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in workers:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with session_factory() as db:
+        in_order = db.execute(
+            select(func.coalesce(func.sum(OrderItem.quantity), 0)).where(OrderItem.order_id == order_id)
+        ).scalar_one()
+
+    total = per_thread * args.threads
+    return {
+        "mode": mode,
+        "requests": total,
+        "ok": counters["ok"],
+        "errors": counters["errors"],
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "transactions": coalescer.stats()["batches"] if coalescer else total,
+        "quantity_consistent": int(in_order) == counters["ok"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_argument(parser)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=4000, help="Всего запросов на режим")
+    parser.add_argument("--products", type=int, default=20, help="Товаров, добавляемых в заказ")
+    parser.add_argument("--window-ms", type=float, default=5)
+    parser.add_argument("--max-batch-size", type=int, default=100)
+    parser.add_argument("--modes", nargs="+", default=["direct", "coalesced"], choices=["direct", "coalesced"])
+    args = parser.parse_args()
+
+    quiet_app_logging()
+    engine = make_engine(args.database_url, pool_size=args.threads)
+    session_factory = make_session_factory(engine)
+
+    print(f"{'mode':<10} {'rps':>9} {'ok':>7} {'errors':>7} {'tx':>7} {'consistent':>11}")
+    for mode in args.modes:
+        result = run_mode(session_factory, mode, args)
+        print(
+            f"{result['mode']:<10} {result['rps']:>9} {result['ok']:>7} {result['errors']:>7} "
+            f"{result['transactions']:>7} {str(result['quantity_consistent']):>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Общие утилиты бенчмарков: подключение к тестовой БД и подготовка схемы.
+
+Бенчмарки запускаются из корня проекта (рядом с setting.yaml):
+    python -m benchmarks.<имя_модуля> --database-url postgresql+psycopg2://postgres@localhost:5432/orders_bench
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import create_engine, event, func, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from config import setting
+
+
+def add_database_argument(parser: argparse.ArgumentParser) -> None:
+    """
+    Добавляет общий аргумент --database-url (по умолчанию - из setting.yaml).
+    """
+    parser.add_argument(
+        "--database-url",
+        default=setting.database.database_url,
+        help="URL тестовой БД: PostgreSQL или sqlite:///path.db",
+    )
+
+
+def quiet_app_logging() -> None:
+    """
+    Отключает построчные логи приложения, чтобы они не искажали замеры.
+    """
+    logging.getLogger("app").setLevel(logging.ERROR)
+
+
+def make_engine(database_url: str, pool_size: int = 10) -> Engine:
+    """
+    Создает engine для бенчмарка и таблицы схемы app.models.
+    """
+    if database_url.startswith("sqlite"):
+        engine = create_engine(
+            database_url,
+            connect_args={"check_same_thread": False, "timeout": 60},
+        )
+    else:
+        engine = create_engine(
+            database_url,
+            pool_size=pool_size,
+            max_overflow=pool_size,
+        )
+    import app.models  # noqa: F401 - регистрация моделей в Base.metadata
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+class StatementCounter:
+    """
+    Считает SQL-запросы (обращения к БД), выполненные через engine.
+    Для AsyncEngine передается async_engine.sync_engine.
+    """
+
+    def __init__(self, engine: Engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        with self._lock:
+            self.count += 1
+
+    def reset(self) -> int:
+        with self._lock:
+            count, self.count = self.count, 0
+            return count
+
+
+def make_session_factory(engine: Engine) -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _next_id(conn: Connection, table) -> int:
+    return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def _sync_sequences(conn: Connection, tables) -> None:
+    """
+    После вставки с явными ID выставляет последовательности PostgreSQL на max(id).
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+        ))
+
+
+def seed_dataset(
+    engine: Engine,
+    clients: int = 1_000,
+    categories: int = 200,
+    products: int = 5_000,
+    orders: int = 20_000,
+    lines_per_order: int = 5,
+    days: int = 90,
+    stock: int = 1_000_000,
+    chunk_size: int = 5_000,
+    random_seed: int = 42,
+) -> dict:
+    """
+    Заполняет БД синтетическими данными по схеме app.models: клиенты,
+    дерево категорий, товары, заказы за последние days дней и их позиции.
+    Данные дописываются к существующим (ID продолжают текущие).
+    Возвращает диапазоны созданных ID.
+    """
+    from app.models import Category, Client, Order, OrderItem, Product
+    from app.services import CategoryService
+
+    rnd = random.Random(random_seed)
+    started = time.perf_counter()
+    tables = [t.__table__ for t in (Client, Category, Product, Order, OrderItem)]
+    client_t, category_t, product_t, order_t, item_t = tables
+    now = datetime.now()
+
+    with engine.begin() as conn:
+        first_client = _next_id(conn, client_t)
+        conn.execute(client_t.insert(), [
+            {"id": first_client + i, "name": f"Клиент {first_client + i}", "address": "-"}
+            for i in range(clients)
+        ])
+
+        # Дерево категорий: первые ~2% - корни, остальные - потомки случайной более ранней
+        first_category = _next_id(conn, category_t)
+        root_count = max(1, categories // 50)
+        category_rows = []
+        for i in range(categories):
+            parent_id = None if i < root_count else first_category + rnd.randrange(i)
+            category_rows.append({
+                "id": first_category + i, "name": f"Категория {first_category + i}", "parent_id": parent_id,
+            })
+        conn.execute(category_t.insert(), category_rows)
+        CategoryService.rebuild_closure(conn)
+
+        first_product = _next_id(conn, product_t)
+        prices = {}
+        product_rows = []
+        for i in range(products):
+            product_id = first_product + i
+            prices[product_id] = Decimal(rnd.randrange(100, 100_000)) / 100
+            product_rows.append({
+                "id": product_id,
+                "category_id": first_category + rnd.randrange(categories),
+                "name": f"Товар {product_id}",
+                "quantity": stock,
+                "reserved_quantity": 0,
+                "price": prices[product_id],
+            })
+        for offset in range(0, len(product_rows), chunk_size):
+            conn.execute(product_t.insert(), product_rows[offset:offset + chunk_size])
+
+        first_order = _next_id(conn, order_t)
+        first_item = _next_id(conn, item_t)
+        item_id = first_item
+        lines = min(lines_per_order, products)
+        for offset in range(0, orders, chunk_size):
+            order_rows, item_rows = [], []
+            for order_id in range(first_order + offset, first_order + min(offset + chunk_size, orders)):
+                subtotal = Decimal(0)
+                order_date = now - timedelta(seconds=rnd.randrange(days * 86_400))
+                for product_index in rnd.sample(range(products), lines):
+                    product_id = first_product + product_index
+                    quantity = rnd.randint(1, 5)
+                    total_price = prices[product_id] * quantity
+                    subtotal += total_price
+                    item_rows.append({
+                        "id": item_id, "order_id": order_id, "order_date": order_date, "product_id": product_id,
+                        "product_name": f"Товар {product_id}", "quantity": quantity,
+                        "unit_price": prices[product_id], "discount_percent": 0,
+                        "discount_amount": Decimal(0), "total_price": total_price,
+                    })
+                    item_id += 1
+                order_rows.append({
+                    "id": order_id, "customer_id": first_client + rnd.randrange(clients),
+                    "order_number": f"SEED-{order_id}", "subtotal": subtotal,
+                    "discount_amount": Decimal(0), "tax_amount": Decimal(0), "shipping_amount": Decimal(0),
+                    "total_amount": subtotal, "paid_amount": Decimal(0),
+                    "order_date": order_date, "created_at": order_date, "updated_at": order_date,
+                })
+            conn.execute(order_t.insert(), order_rows)
+            conn.execute(item_t.insert(), item_rows)
+
+        _sync_sequences(conn, tables)
+
+    result = {
+        "client_ids": (first_client, first_client + clients - 1),
+        "category_ids": (first_category, first_category + categories - 1),
+        "product_ids": (first_product, first_product + products - 1),
+        "order_ids": (first_order, first_order + orders - 1),
+        "order_items": item_id - first_item,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    print(f"Тестовые данные созданы: {result}")
+    return result
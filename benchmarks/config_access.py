@@ -0,0 +1,91 @@
+"""
+Микробенчмарк чтения конфигурации: стоимость обращения к атрибутам setting.
+
+"before" - прежняя схема config._Setting: каждое обращение к атрибуту верхнего
+уровня проверяет exists() и stat() файла setting.yaml, узлы - динамические type(...).
+"after"  - текущий снимок в памяти (SettingNode).
+
+Пример:
+    python -m benchmarks.config_access --number 200000
+"""
+import argparse
+import timeit
+
+from datetime import datetime
+from pathlib import Path
+
+import yaml
+
+from config import setting
+
+EXPRESSIONS = (
+    "s.engine",
+    "s.engine.pool_size",
+    "s.cache.products.ttl",
+    "s.stock.reservation",
+)
+
+
+class LegacySetting:
+    """
+    Воспроизведение прежнего пути чтения конфигурации для сравнения.
+    """
+
+    def __init__(self, config_path: str):
+        self._config_path = Path(config_path)
+        self._reload()
+
+    def _reload(self) -> None:
+        with open(self._config_path, "r", encoding="utf-8") as f:
+            self._data = self._dict_to_object(yaml.safe_load(f) or {})
+        self._last_modified = datetime.now()
+
+    def _dict_to_object(self, data):
+        if isinstance(data, dict):
+            obj = type("Setting", (), {})()
+            for key, value in data.items():
+                setattr(obj, key, self._dict_to_object(value))
+            return obj
+        if isinstance(data, list):
+            return [self._dict_to_object(item) for item in data]
+        return data
+
+    def __getattr__(self, name: str):
+        if self._config_path and self._config_path.exists():
+            current_mtime = self._config_path.stat().st_mtime
+            if self._last_modified is None or current_mtime > self._last_modified.timestamp():
+                self._reload()
+        if hasattr(self._data, name):
+            return getattr(self._data, name)
+        raise AttributeError(f"'{name}' не найдено")
+
+
+def measure(target, number: int) -> dict[str, float]:
+    """
+    Время одного обращения в наносекундах для каждого выражения.
+    """
+    return {
+        expression: min(timeit.repeat(expression, globals={"s": target}, number=number, repeat=3)) / number * 1e9
+        for expression in EXPRESSIONS
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default="setting.yaml")
+    parser.add_argument("--number", type=int, default=200_000, help="Обращений на замер")
+    args = parser.parse_args()
+
+    before = measure(LegacySetting(args.config), args.number)
+    after = measure(setting, args.number)
+
+    print(f"{'expression':<24} {'before ns':>10} {'after ns':>10} {'speedup':>8}")
+    for expression in EXPRESSIONS:
+        print(
+            f"{expression:<24} {before[expression]:>10.0f} {after[expression]:>10.0f} "
+            f"{before[expression] / after[expression]:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Проверка планов запросов: горячие запросы add-item и отчеты из tasks/request.sql
+должны использовать индексы, а не последовательное сканирование.
+
+На маленьких таблицах планировщик законно выбирает Seq Scan, поэтому в PostgreSQL
+проверка выполняется с enable_seqscan = off: если подходящий индекс есть,
+план его использует, если нет - остается Seq Scan и проверка падает.
+Для SQLite разбирается вывод EXPLAIN QUERY PLAN.
+
+В PostgreSQL дополнительно проверяется отсечение секций: поиск заказа по id
+с датой из order_keys по EXPLAIN ANALYZE должен читать не больше одной секции.
+
+Пример:
+    python -m benchmarks.explain_indexes --database-url postgresql+psycopg2://postgres@localhost:5432/orders_db
+
+Код возврата 1, если хотя бы один запрос не использует ожидаемый индекс.
+"""
+import argparse
+import json
+import sys
+
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from benchmarks.common import add_database_argument, make_engine
+
+
+class PlanCheck(NamedTuple):
+    name: str
+    sql: str
+    expected_indexes: tuple[str, ...]
+    postgresql_only: bool = False
+
+
+class PruningCheck(NamedTuple):
+    name: str
+    sql: str
+    table: str
+
+
+CHECKS = (
+    PlanCheck(
+        "add-item: позиция заказа по (order_id, product_id)",
+        "SELECT id, quantity FROM order_items WHERE order_id = 1 AND product_id = 1",
+        ("uq_order_items_order_product",),
+    ),
+    PlanCheck(
+        "позиции заказа по order_id",
+        "SELECT id FROM order_items WHERE order_id = 1",
+        ("uq_order_items_order_product",),
+    ),
+    PlanCheck(
+        "позиции по товару",
+        "SELECT order_id FROM order_items WHERE product_id = 1",
+        ("ix_order_items_product_id",),
+    ),
+    PlanCheck(
+        "заказы клиента",
+        "SELECT id FROM orders WHERE customer_id = 1",
+        ("ix_orders_customer_id",),
+    ),
+    PlanCheck(
+        "заказы по статусу",
+        "SELECT id FROM orders WHERE status_id = 1",
+        ("ix_orders_status_id",),
+    ),
+    PlanCheck(
+        "список заказов: источник, keyset по id",
+        "SELECT id FROM orders WHERE source_id = 1 AND id < 1000 ORDER BY id DESC LIMIT 50",
+        ("ix_orders_source_id",),
+    ),
+    PlanCheck(
+        "заказы за период",
+        "SELECT id FROM orders WHERE order_date >= '2026-01-01' AND order_date < '2026-02-01'",
+        ("ix_orders_order_date",),
+    ),
+    PlanCheck(
+        "товары категории",
+        "SELECT id FROM products WHERE category_id = 1",
+        ("ix_products_category_id",),
+    ),
+    PlanCheck(
+        "потомки категории по замыканию",
+        "SELECT descendant_id, depth FROM category_closure WHERE ancestor_id = 1",
+        ("pk_category_closure",),
+    ),
+    PlanCheck(
+        "корень категории по замыканию",
+        "SELECT ancestor_id FROM category_closure WHERE descendant_id = 1 ORDER BY depth DESC LIMIT 1",
+        ("ix_category_closure_descendant_depth",),
+    ),
+    PlanCheck(
+        "история статусов заказа",
+        "SELECT id FROM order_status_history WHERE order_id = 1",
+        ("ix_order_status_history_order_id",),
+    ),
+    PlanCheck(
+        "платежи заказа",
+        "SELECT id FROM payments WHERE order_id = 1",
+        ("ix_payments_order_id",),
+    ),
+    PlanCheck(
+        "отчет: сумма товаров по клиенту",
+        """
+        SELECT c.name, SUM(oi.total_price)
+        FROM clients c
+        JOIN orders o ON c.id = o.customer_id
+        JOIN order_items oi ON o.id = oi.order_id AND o.order_date = oi.order_date
+        WHERE c.id = 1
+        GROUP BY c.name
+        """,
+        ("ix_orders_customer_id", "uq_order_items_order_product"),
+        postgresql_only=True,
+    ),
+    PlanCheck(
+        "отчет: дочерние категории первого уровня",
+        """
+        SELECT p.name, COUNT(c.id)
+        FROM categories p
+        LEFT JOIN categories c ON p.id = c.parent_id
+        WHERE p.id = 1
+        GROUP BY p.id, p.name
+        """,
+        ("ix_categories_parent_id",),
+        postgresql_only=True,
+    ),
+    PlanCheck(
+        "отчет: топ-5 товаров за последний месяц",
+        """
+        SELECT p.name, SUM(oi.quantity) AS total
+        FROM order_items oi
+        JOIN orders o ON oi.order_id = o.id AND oi.order_date = o.order_date
+        JOIN products p ON oi.product_id = p.id
+        WHERE o.order_date >= CURRENT_DATE - INTERVAL '1 month'
+          AND oi.order_date >= CURRENT_DATE - INTERVAL '1 month'
+        GROUP BY p.id, p.name
+        ORDER BY total DESC
+        LIMIT 5
+        """,
+        ("ix_orders_order_date", "uq_order_items_order_product"),
+        postgresql_only=True,
+    ),
+)
+
+ORDER_KEY_DATE = "(SELECT order_date FROM order_keys WHERE id = 1)"
+
+PRUNING_CHECKS = (
+    PruningCheck(
+        "заказ по id: одна секция orders",
+        f"SELECT id FROM orders WHERE id = 1 AND order_date = {ORDER_KEY_DATE}",
+        "orders",
+    ),
+    PruningCheck(
+        "позиции заказа по id: одна секция order_items",
+        f"SELECT id FROM order_items WHERE order_id = 1 AND order_date = {ORDER_KEY_DATE}",
+        "order_items",
+    ),
+)
+
+# SQLite именует индексы UNIQUE-ограничений автоматически
+SQLITE_INDEX_ALIASES = {
+    "uq_order_items_order_product": "sqlite_autoindex_order_items_1",
+    "pk_category_closure": "sqlite_autoindex_category_closure_1",
+}
+
+
+def _partition_parents(conn: Connection) -> dict[str, str]:
+    """
+    Секции таблиц и их индексов -> родительская таблица или индекс:
+    в плане по секционированной таблице указаны индексы секций.
+    """
+    return dict(conn.execute(text(
+        """
+        SELECT child.relname, parent.relname
+        FROM pg_inherits i
+        JOIN pg_class child ON child.oid = i.inhrelid
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        """
+    )).all())
+
+
+def _postgresql_plan(conn: Connection, sql: str) -> tuple[set[str], set[str]]:
+    """
+    Возвращает (использованные индексы, таблицы с Seq Scan).
+    Индексы и таблицы секций приводятся к именам родительских.
+    """
+    parents = _partition_parents(conn)
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    indexes, seq_scans = set(), set()
+    stack = [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if "Index Name" in node:
+            indexes.add(parents.get(node["Index Name"], node["Index Name"]))
+        if node.get("Node Type") == "Seq Scan":
+            seq_scans.add(parents.get(node["Relation Name"], node["Relation Name"]))
+        stack.extend(node.get("Plans", []))
+    return indexes, seq_scans
+
+
+def _scanned_partitions(conn: Connection, sql: str, table: str) -> tuple[set[str], int]:
+    """
+    Возвращает (секции table, которые выполнялись, всего секций table в плане).
+    Отсеченные при выполнении секции остаются в плане с Actual Loops = 0.
+    """
+    parents = _partition_parents(conn)
+    plan = conn.execute(text(f"EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF, FORMAT JSON) {sql}")).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scanned, planned = set(), 0
+    stack = [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        relation = node.get("Relation Name")
+        if relation is not None and parents.get(relation) == table:
+            planned += 1
+            if node.get("Actual Loops", 0) > 0:
+                scanned.add(relation)
+        stack.extend(node.get("Plans", []))
+    return scanned, planned
+
+
+def _sqlite_plan(conn: Connection, sql: str) -> tuple[set[str], set[str]]:
+    indexes, seq_scans = set(), set()
+    for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")):
+        detail = row[-1]
+        if " INDEX " in detail:
+            indexes.add(detail.split(" INDEX ", 1)[1].split()[0])
+        elif detail.startswith("SCAN "):
+            seq_scans.add(detail.split()[1])
+    return indexes, seq_scans
+
+
+def run_checks(conn: Connection) -> bool:
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        conn.execute(text("SET enable_seqscan = off"))
+        explain = _postgresql_plan
+    else:
+        explain = _sqlite_plan
+
+    all_ok = True
+    for check in CHECKS:
+        if check.postgresql_only and dialect != "postgresql":
+            continue
+        expected = {
+            SQLITE_INDEX_ALIASES.get(name, name) if dialect == "sqlite" else name
+            for name in check.expected_indexes
+        }
+        indexes, seq_scans = explain(conn, check.sql)
+        missing = expected - indexes
+        ok = not missing
+        all_ok &= ok
+        print(f"[{'OK' if ok else 'FAIL'}] {check.name}")
+        print(f"       индексы: {', '.join(sorted(indexes)) or '-'}")
+        if seq_scans:
+            print(f"       seq scan: {', '.join(sorted(seq_scans))}")
+        if missing:
+            print(f"       не использованы: {', '.join(sorted(missing))}")
+    if dialect == "postgresql":
+        for check in PRUNING_CHECKS:
+            scanned, planned = _scanned_partitions(conn, check.sql, check.table)
+            ok = len(scanned) <= 1
+            all_ok &= ok
+            print(f"[{'OK' if ok else 'FAIL'}] {check.name}")
+            print(f"       секций в плане: {planned}, прочитано: {', '.join(sorted(scanned)) or '-'}")
+    return all_ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_argument(parser)
+    args = parser.parse_args()
+
+    engine = make_engine(args.database_url, pool_size=1)
+    with engine.connect() as conn:
+        ok = run_checks(conn)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Бенчмарк выгрузки заказов с позициями: скорость (строк позиций в секунду)
+и пиковый RSS процесса выгрузки.
+
+Режимы:
+- stream   - app.export.export_orders: keyset-страницы и серверный курсор;
+- buffered - для сравнения: все строки orders LEFT JOIN order_items читаются
+  в память одним запросом и сериализуются целиком.
+
+Каждый режим выполняется в отдельном процессе, чтобы пиковый RSS
+не включал заполнение БД и другие режимы. Выгрузка пишется в /dev/null.
+
+Пример (около 5 млн позиций):
+    python -m benchmarks.export_orders --orders 1000000 --lines-per-order 5
+    python -m benchmarks.export_orders --no-seed --format csv --gzip
+"""
+import argparse
+import gzip
+import io
+import multiprocessing
+import os
+import resource
+import time
+
+from benchmarks.common import add_database_argument, make_engine, make_session_factory, quiet_app_logging, seed_dataset
+
+
+def _rss_mb() -> float:
+    # ru_maxrss в Linux - килобайты
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def buffered_export(db, export_format: str, compress: bool) -> bytes:
+    """
+    Выгрузка без потоковой обработки: результат запроса и вывод целиком в памяти.
+    """
+    from app.export import ORDER_FIELDS, _csv_writer, _ndjson_writer, _page_stmt
+
+    rows = db.execute(_page_stmt(0, 2 ** 31 - 1)).all()
+    buffer = io.StringIO()
+    write = _ndjson_writer(buffer) if export_format == "ndjson" else _csv_writer(buffer)
+    order_width = len(ORDER_FIELDS)
+    order, items = None, []
+    for row in rows:
+        if order is None or row[0] != order[0]:
+            if order is not None:
+                write(order, items)
+            order, items = tuple(row[:order_width]), []
+        if row[order_width] is not None:
+            items.append(tuple(row[order_width:]))
+    if order is not None:
+        write(order, items)
+    data = buffer.getvalue().encode("utf-8")
+    return gzip.compress(data) if compress else data
+
+
+def run_export(database_url: str, mode: str, export_format: str, compress: bool) -> dict:
+    """
+    Выполняется в дочернем процессе: одна выгрузка в /dev/null.
+    """
+    from sqlalchemy import func, select
+
+    from app.export import export_orders
+    from app.models import OrderItem
+
+    quiet_app_logging()
+    engine = make_engine(database_url, pool_size=1)
+    session_factory = make_session_factory(engine)
+    with session_factory() as db:
+        rows = db.execute(select(func.count()).select_from(OrderItem)).scalar_one()
+    rss_before = _rss_mb()
+
+    written = 0
+    started = time.perf_counter()
+    with session_factory() as db, open(os.devnull, "wb") as out:
+        if mode == "stream":
+            for chunk in export_orders(db, export_format, compress=compress):
+                written += out.write(chunk)
+        else:
+            written = out.write(buffered_export(db, export_format, compress))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(rows / elapsed) if elapsed else 0,
+        "mb_written": round(written / 2 ** 20, 1),
+        "rss_before_mb": round(rss_before, 1),
+        "peak_rss_mb": round(_rss_mb(), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_argument(parser)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--lines-per-order", type=int, default=5)
+    parser.add_argument("--no-seed", action="store_true", help="Использовать уже заполненную БД")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--modes", nargs="+", default=["stream", "buffered"], choices=["stream", "buffered"])
+    args = parser.parse_args()
+
+    quiet_app_logging()
+    if not args.no_seed:
+        engine = make_engine(args.database_url)
+        seed_dataset(engine, orders=args.orders, lines_per_order=args.lines_per_order)
+        engine.dispose()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'mode':<9} {'rows':>10} {'sec':>8} {'rows/s':>9} {'MB out':>8} {'RSS start':>10} {'RSS peak':>9}")
+    for mode in args.modes:
+        with context.Pool(1) as pool:
+            result = pool.apply(run_export, (args.database_url, mode, args.format, args.gzip))
+        print(
+            f"{result['mode']:<9} {result['rows']:>10} {result['seconds']:>8} {result['rows_per_sec']:>9} "
+            f"{result['mb_written']:>8} {result['rss_before_mb']:>10} {result['peak_rss_mb']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Проверка маршрутизации чтения на реплики (app.replicas): распределение
+запросов по кругу, чтение после записи с основного сервера, исключение
+недоступной реплики с повтором чтения и text() на основном сервере.
+
+Локально вместо реплик подходят отдельные файлы SQLite или базы PostgreSQL:
+без настоящей репликации каждая БД заполняется одинаковыми данными.
+С настоящими репликами (--no-seed) данные заполняются заранее на основном сервере.
+
+Пример:
+    python -m benchmarks.replica_routing --database-url sqlite:///primary.db \\
+        --replica-url sqlite:///replica1.db --replica-url sqlite:///replica2.db
+    python -m benchmarks.replica_routing --database-url postgresql+psycopg2://postgres@localhost:5432/orders_db \\
+        --replica-url postgresql+psycopg2://postgres@localhost:5433/orders_db --no-seed
+
+Код возврата 1, если какая-либо проверка не прошла.
+"""
+import argparse
+import sys
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Client
+from app.replicas import ReplicaSet, RoutingSession, engine_label
+from app.services import OrderService
+from benchmarks.common import StatementCounter, add_database_argument, make_engine, quiet_app_logging, seed_dataset
+
+# Недоступная реплика для проверки исключения
+UNREACHABLE_URL = "sqlite:////nonexistent/replica.db"
+
+
+def read_requests(session_factory, requests: int) -> int:
+    """
+    requests "запросов API" на чтение, каждый - отдельная сессия; возвращает число ошибок.
+    """
+    errors = 0
+    for _ in range(requests):
+        with session_factory() as db:
+            try:
+                OrderService.list_orders(db, limit=20)
+            except Exception:
+                errors += 1
+    return errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_argument(parser)
+    parser.add_argument("--replica-url", action="append", required=True, help="URL реплики (можно несколько)")
+    parser.add_argument("--orders", type=int, default=1_000)
+    parser.add_argument("--requests", type=int, default=300, help="Запросов чтения на проверку")
+    parser.add_argument("--no-seed", action="store_true", help="Не заполнять БД (настоящая репликация)")
+    args = parser.parse_args()
+
+    quiet_app_logging()
+    primary = make_engine(args.database_url)
+    replica_engines = [make_engine(url) for url in args.replica_url]
+    if not args.no_seed:
+        for engine in (primary, *replica_engines):
+            seed_dataset(engine, clients=100, categories=20, products=200, orders=args.orders, lines_per_order=2)
+
+    counters = {engine: StatementCounter(engine) for engine in (primary, *replica_engines)}
+    replicas = ReplicaSet(replica_engines)
+    session_factory = sessionmaker(class_=RoutingSession, autoflush=False, bind=primary, replicas=replicas)
+    failed = []
+
+    def check(name: str, ok: bool, details: str) -> None:
+        print(f"{'OK  ' if ok else 'FAIL'} {name}: {details}")
+        if not ok:
+            failed.append(name)
+
+    # 1. Чтение по кругу: основной сервер не получает запросов, реплики - поровну
+    for counter in counters.values():
+        counter.reset()
+    errors = read_requests(session_factory, args.requests)
+    counts = {engine: counter.reset() for engine, counter in counters.items()}
+    replica_counts = [counts[engine] for engine in replica_engines]
+    check(
+        "чтение по кругу",
+        errors == 0 and counts[primary] == 0 and max(replica_counts) - min(replica_counts) <= 1,
+        f"основной={counts[primary]}, реплики={replica_counts}, ошибок={errors}",
+    )
+
+    # 2. Запись и чтение после нее в одной сессии - на основном сервере
+    with session_factory() as db:
+        client = Client(name="replica-routing")
+        db.add(client)
+        db.commit()
+        found = db.execute(select(Client.id).where(Client.id == client.id)).scalar()
+        db.delete(client)
+        db.commit()
+    counts = {engine: counter.reset() for engine, counter in counters.items()}
+    check(
+        "чтение после записи",
+        found is not None and all(counts[engine] == 0 for engine in replica_engines),
+        f"основной={counts[primary]}, реплики={[counts[engine] for engine in replica_engines]}",
+    )
+
+    # 3. Недоступная реплика исключается после первой ошибки, чтение повторяется на следующей
+    unreachable = create_engine(UNREACHABLE_URL)
+    replicas_with_failure = ReplicaSet([*replica_engines, unreachable], eject_seconds=60)
+    failing_factory = sessionmaker(class_=RoutingSession, autoflush=False, bind=primary, replicas=replicas_with_failure)
+    errors = read_requests(failing_factory, args.requests)
+    stats = replicas_with_failure.stats()
+    check(
+        "исключение недоступной реплики",
+        errors == 0 and not stats[-1]["available"] and all(item["available"] for item in stats[:-1]),
+        f"ошибок={errors}, недоступна={[item['url'] for item in stats if not item['available']]}",
+    )
+
+    # 4. text() - на основном сервере, с execution_options(read_only=True) - на реплике
+    for counter in counters.values():
+        counter.reset()
+    with session_factory() as db:
+        db.execute(text("SELECT 1"))
+    on_primary = counters[primary].reset()
+    with session_factory() as db:
+        db.execute(text("SELECT 1").execution_options(read_only=True))
+    on_replicas = sum(counters[engine].reset() for engine in replica_engines)
+    check(
+        "text() на основном сервере",
+        on_primary == 1 and on_replicas == 1,
+        f"text()={'основной' if on_primary else 'реплика'}, read_only={'реплика' if on_replicas else 'основной'}",
+    )
+
+    for engine in (primary, *replica_engines, unreachable):
+        engine.dispose()
+    print(f"реплики: {', '.join(engine_label(engine) for engine in replica_engines)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
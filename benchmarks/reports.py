@@ -0,0 +1,144 @@
+"""
+Бенчмарк отчетов: живые запросы из tasks/request.sql против сводных таблиц.
+
+Создает синтетический набор данных, замеряет:
+- живые версии отчетов (рекурсивный CTE по категориям и сканирование
+  order_items за месяц, агрегирование сумм по клиентам);
+- полную пересборку сводных таблиц (rebuild-reports);
+- инкрементальное обновление после добавления новых позиций (refresh-reports);
+- чтение тех же отчетов из сводных таблиц.
+
+Пример (около 2 млн позиций):
+    python -m benchmarks.reports --orders 400000 --lines-per-order 5
+"""
+import argparse
+import statistics
+import time
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.models import Category, Client, Order, OrderItem, Product
+from app.schemas import BulkAddItemsRequest
+from app.services import OrderService, ReportService
+from benchmarks.common import (
+    add_database_argument, make_engine, make_session_factory, quiet_app_logging, seed_dataset
+)
+
+
+def live_top_products(db, days: int = 30, limit: int = 5) -> list:
+    """
+    Эквивалент представления top_5_products_last_month из tasks/request.sql.
+    """
+    categories = Category.__table__
+    products = Product.__table__
+    orders = Order.__table__
+    order_items = OrderItem.__table__
+    category_path = select(
+        categories.c.id, categories.c.id.label("level_1_id"), categories.c.name.label("level_1_name")
+    ).where(categories.c.parent_id.is_(None)).cte("category_path", recursive=True)
+    category_path = category_path.union_all(
+        select(categories.c.id, category_path.c.level_1_id, category_path.c.level_1_name)
+        .join(category_path, categories.c.parent_id == category_path.c.id)
+    )
+    quantity = func.sum(order_items.c.quantity).label("quantity")
+    return db.execute(
+        select(products.c.name, category_path.c.level_1_name, quantity)
+        .select_from(
+            order_items.join(orders, order_items.c.order_id == orders.c.id)
+            .join(products, order_items.c.product_id == products.c.id)
+            .join(category_path, products.c.category_id == category_path.c.id)
+        )
+        .where(orders.c.order_date >= datetime.now() - timedelta(days=days))
+        .group_by(products.c.id, products.c.name, category_path.c.level_1_name)
+        .order_by(quantity.desc())
+        .limit(limit)
+    ).all()
+
+
+def live_client_totals(db) -> list:
+    clients = Client.__table__
+    orders = Order.__table__
+    order_items = OrderItem.__table__
+    return db.execute(
+        select(clients.c.name, func.sum(order_items.c.total_price))
+        .select_from(
+            clients.join(orders, clients.c.id == orders.c.customer_id)
+            .join(order_items, orders.c.id == order_items.c.order_id)
+        )
+        .group_by(clients.c.id, clients.c.name)
+    ).all()
+
+
+def timed(session_factory, fn, repeat: int) -> float:
+    """
+    Медиана времени выполнения fn(db) в миллисекундах.
+    """
+    samples = []
+    for _ in range(repeat):
+        with session_factory() as db:
+            started = time.perf_counter()
+            fn(db)
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_argument(parser)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--categories", type=int, default=2_000)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--lines-per-order", type=int, default=5)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--new-lines", type=int, default=10_000, help="Позиций для инкрементального обновления")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-seed", action="store_true", help="Использовать уже заполненную БД")
+    args = parser.parse_args()
+
+    quiet_app_logging()
+    engine = make_engine(args.database_url)
+    session_factory = make_session_factory(engine)
+    if not args.no_seed:
+        seeded = seed_dataset(
+            engine, clients=args.clients, categories=args.categories, products=args.products,
+            orders=args.orders, lines_per_order=args.lines_per_order, days=args.days,
+        )
+    else:
+        seeded = None
+
+    results = {}
+    results["live: топ-5 товаров за месяц"] = timed(session_factory, live_top_products, args.repeat)
+    results["live: суммы по клиентам"] = timed(session_factory, live_client_totals, args.repeat)
+    results["rebuild-reports (полная пересборка)"] = timed(session_factory, ReportService.rebuild, 1)
+
+    # Новые позиции через сервис заказов пишутся в журнал продаж
+    with session_factory() as db:
+        order_ids = db.execute(select(Order.id).order_by(Order.id.desc()).limit(args.new_lines // 10 or 1)).scalars().all()
+        product_ids = db.execute(select(Product.id).limit(10)).scalars().all()
+    lines = [
+        {"order_id": order_id, "product_id": product_id, "quantity": 1}
+        for order_id in order_ids for product_id in product_ids
+    ][:args.new_lines]
+    for offset in range(0, len(lines), 1000):
+        with session_factory() as db:
+            OrderService.add_items_to_orders(
+                db, BulkAddItemsRequest(items=lines[offset:offset + 1000]), reserve_stock=False
+            )
+    results[f"refresh-reports ({len(lines)} новых позиций)"] = timed(session_factory, ReportService.refresh, 1)
+
+    results["сводная: топ-5 товаров за месяц"] = timed(session_factory, ReportService.top_products, args.repeat)
+    results["сводная: суммы по клиентам"] = timed(
+        session_factory, lambda db: ReportService.client_totals(db, limit=args.clients), args.repeat
+    )
+
+    if seeded:
+        print(f"Позиций в наборе: {seeded['order_items']}")
+    for name, ms in results.items():
+        print(f"{name:<45} {ms:>10.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
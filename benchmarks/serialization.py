@@ -0,0 +1,110 @@
+"""
+Бенчмарк сериализации ответа со списком позиций заказа (BulkAddItemsResponse):
+время на 10 тыс. позиций.
+
+Режимы:
+- pydantic        - прежний путь: OrderItemResponse.model_validate на строку,
+  повторная валидация и сериализация FastAPI по response_model, JSONResponse (json);
+- pydantic_orjson - то же, но рендер ORJSONResponse (класс ответа по умолчанию);
+- rows            - путь списков, add-item и add-items: словари из строк Row
+  (rows_to_dicts) и ORJSONResponse, без pydantic.
+
+Строки берутся запросом колонок RETURNING позиций (OrderService._item_returning_columns)
+из SQLite в памяти, база данных не нужна. Проверяется, что тела ответов совпадают.
+
+Пример:
+    python -m benchmarks.serialization --items 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, select
+
+from app.database import Base
+from app.models import OrderItem
+from app.responses import ORJSONResponse, rows_to_dicts
+from app.schemas import BulkAddItemsResponse, OrderItemResponse
+from app.services import OrderService
+from benchmarks.common import quiet_app_logging
+
+_RESPONSE_FIELD = create_response_field(name="response", type_=BulkAddItemsResponse)
+
+
+def load_rows(items: int) -> list:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    order_date = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(OrderItem.__table__.insert(), [
+            {
+                "id": i, "order_id": i // 5 + 1, "order_date": order_date, "product_id": i % 1000 + 1,
+                "product_name": f"Товар {i % 1000 + 1}", "quantity": i % 7 + 1,
+                "unit_price": Decimal("149.90"), "discount_percent": 10,
+                "discount_amount": Decimal("14.99") * (i % 7 + 1), "total_price": Decimal("134.91") * (i % 7 + 1),
+            }
+            for i in range(1, items + 1)
+        ])
+        rows = conn.execute(select(*OrderService._item_returning_columns()).order_by(OrderItem.id)).all()
+    engine.dispose()
+    return rows
+
+
+def render_pydantic(rows: list, response_class=JSONResponse) -> bytes:
+    response = BulkAddItemsResponse(items=[OrderItemResponse.model_validate(row) for row in rows])
+    content = asyncio.run(serialize_response(field=_RESPONSE_FIELD, response_content=response, is_coroutine=False))
+    return response_class(content).body
+
+
+def render_pydantic_orjson(rows: list) -> bytes:
+    return render_pydantic(rows, ORJSONResponse)
+
+
+def render_rows(rows: list) -> bytes:
+    return ORJSONResponse({"items": rows_to_dicts(rows, OrderItemResponse.model_fields)}).body
+
+
+MODES = {
+    "pydantic": render_pydantic,
+    "pydantic_orjson": render_pydantic_orjson,
+    "rows": render_rows,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    quiet_app_logging()
+    rows = load_rows(args.items)
+    reference = None
+    print(f"{'mode':<16} {'ms/10k':>9} {'p95 ms':>9} {'us/item':>8} {'bytes':>10} {'same':>5}")
+    for mode in args.modes:
+        render = MODES[mode]
+        body = render(rows)
+        reference = reference or body
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            render(rows)
+            timings.append(time.perf_counter() - started)
+        per_10k = statistics.median(timings) * 1000 * 10_000 / args.items
+        p95 = sorted(timings)[int(len(timings) * 0.95) - 1] * 1000 * 10_000 / args.items
+        print(
+            f"{mode:<16} {per_10k:>9.1f} {p95:>9.1f} {per_10k * 100 / 1000:>8.2f} "
+            f"{len(body):>10} {str(body == reference):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
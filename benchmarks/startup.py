@@ -0,0 +1,148 @@
+"""
+Бенчмарк холодного запуска приложения.
+
+1. Стоимость импорта app.main по python -X importtime (медиана по --repeat запускам
+   интерпретатора, первый запуск - прогрев кэша байт-кода, в замер не входит):
+   - общее время импорта (без модулей, которые интерпретатор загружает сам);
+   - накопленная стоимость по пакетам верхнего уровня (сумма собственного времени модулей пакета);
+   - модули приложения (app.*, config): собственное и накопленное время.
+2. Создание engine (init_database, в lifespan): после импорта, отдельным замером.
+3. Время до первого ответа: от запуска процесса uvicorn app.main:app до первого
+   ответа 200 на --path (по умолчанию /health, без обращения к БД).
+   С engine.pool_warmup: True в замер входит и прогрев пула.
+
+Пример:
+    python -m benchmarks.startup --repeat 5 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+APP_MODULES = ("app", "config")
+
+
+def _env() -> dict:
+    return {**os.environ, "SETTING_WATCH_INTERVAL": "0"}
+
+
+def import_times(statement: str) -> list[tuple[str, int, int, int]]:
+    """
+    Запускает интерпретатор с -X importtime; строки (модуль, вложенность, собственное мкс, накопленное мкс).
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PROJECT_DIR, env=_env(), capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def profile_imports(module: str, repeat: int) -> dict:
+    baseline = {name for name, *_ in import_times("pass")}
+    import_times(f"import {module}")
+    totals, packages, modules = [], defaultdict(list), defaultdict(list)
+    for _ in range(repeat):
+        entries = [entry for entry in import_times(f"import {module}") if entry[0] not in baseline]
+        totals.append(sum(cumulative for _, depth, _, cumulative in entries if depth == 0))
+        by_package = defaultdict(int)
+        for name, _, self_us, cumulative in entries:
+            by_package[name.split(".")[0]] += self_us
+            if name.split(".")[0] in APP_MODULES:
+                modules[name].append((self_us, cumulative))
+        for package, self_us in by_package.items():
+            packages[package].append(self_us)
+    return {
+        "total_us": statistics.median(totals),
+        "packages": {package: statistics.median(values) for package, values in packages.items()},
+        "modules": {
+            name: (statistics.median(v[0] for v in values), statistics.median(v[1] for v in values))
+            for name, values in modules.items()
+        },
+    }
+
+
+def engine_creation_ms(repeat: int) -> float:
+    statement = (
+        "import time, app.main; from app.database import init_database; "
+        "started = time.perf_counter(); init_database(); print(time.perf_counter() - started)"
+    )
+    timings = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", statement],
+            cwd=PROJECT_DIR, env=_env(), capture_output=True, text=True, check=True,
+        )
+        timings.append(float(completed.stdout.strip().splitlines()[-1]) * 1000)
+    return statistics.median(timings)
+
+
+def time_to_first_response(port: int, path: str, timeout: float = 60) -> float:
+    url = f"http://127.0.0.1:{port}{path}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn завершился с кодом {server.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise RuntimeError(f"Нет ответа от {url} за {timeout} с")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeat", type=int, default=5, help="Запусков на замер (медиана)")
+    parser.add_argument("--top", type=int, default=15, help="Пакетов в таблице стоимости импорта")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--path", default="/health")
+    args = parser.parse_args()
+
+    profile = profile_imports(args.module, args.repeat)
+    total_ms = profile["total_us"] / 1000
+    print(f"Импорт {args.module}: {total_ms:.1f} мс")
+    print(f"{'package':<24} {'ms':>8} {'%':>6}")
+    packages = sorted(profile["packages"].items(), key=lambda item: item[1], reverse=True)
+    for package, self_us in packages[:args.top]:
+        print(f"{package:<24} {self_us / 1000:>8.1f} {100 * self_us / profile['total_us']:>6.1f}")
+
+    print(f"\n{'module':<32} {'self ms':>8} {'cumul ms':>9}")
+    modules = sorted(profile["modules"].items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in modules:
+        print(f"{name:<32} {self_us / 1000:>8.1f} {cumulative_us / 1000:>9.1f}")
+
+    print(f"\nСоздание engine (init_database, lifespan): {engine_creation_ms(args.repeat):.1f} мс")
+    responses = [time_to_first_response(args.port, args.path) for _ in range(args.repeat)]
+    print(
+        f"Время до первого ответа {args.path}: медиана {statistics.median(responses):.0f} мс, "
+        f"мин {min(responses):.0f} мс, макс {max(responses):.0f} мс"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Бенчмарк конкуренции за один "горячий" товар.
+
+Много потоков параллельно добавляют один и тот же товар в разные заказы
+через OrderService.add_item_to_order. Сравниваются два режима:
+- check   - текущая проверка остатка без блокировок и списания;
+- reserve - атомарное резервирование условным UPDATE.
+
+Для каждого режима выводится пропускная способность и перепродажа
+(сколько штук добавлено в заказы сверх начального остатка).
+Корректный результат для reserve - перепродажа 0.
+
+Пример:
+    python -m benchmarks.stock_contention --threads 32 --requests 4000 --stock 1000
+"""
+import argparse
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.models import Client, Order, OrderItem, Product
+from app.schemas import AddItemToOrderRequest
+from app.services import OrderService
+from benchmarks.common import add_database_argument, make_engine, make_session_factory, quiet_app_logging
+
+
+def seed(session_factory, threads: int, stock: int) -> tuple[int, list[int]]:
+    """
+    Создает горячий товар с остатком stock и по одному заказу на поток.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    with session_factory() as db:
+        client = Client(name=f"bench-{run_id}")
+        product = Product(name=f"hot-sku-{run_id}", quantity=stock, reserved_quantity=0, price=Decimal("10.00"))
+        db.add_all([client, product])
+        db.flush()
+        orders = [
+            Order(customer_id=client.id, order_number=f"bench-{run_id}-{i}")
+            for i in range(threads)
+        ]
+        db.add_all(orders)
+        db.commit()
+        return product.id, [order.id for order in orders]
+
+
+def run_mode(session_factory, mode: str, threads: int, requests: int, stock: int) -> dict:
+    product_id, order_ids = seed(session_factory, threads, stock)
+    reserve_stock = mode == "reserve"
+    per_thread = requests // threads
+    counters = {"ok": 0, "rejected": 0, "errors": 0}
+    counters_lock = threading.Lock()
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker(order_id: int) -> None:
+        ok = rejected = errors = 0
+        request = AddItemToOrderRequest(order_id=order_id, product_id=product_id, quantity=1)
+        start_barrier.wait()
+        for _ in range(per_thread):
+            db = session_factory()
+            try:
+                OrderService.add_item_to_order(db, request, reserve_stock=reserve_stock)
+                ok += 1
+            except ValueError:
+                rejected += 1
+            except Exception:
+                errors += 1
+            finally:
+                db.close()
+        with counters_lock:
+            counters["ok"] += ok
+            counters["rejected"] += rejected
+            counters["errors"] += errors
+
+    workers = [threading.Thread(target=worker, args=(order_id,)) for order_id in order_ids]
+    for thread in workers:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with session_factory() as db:
+        added = db.execute(
+            select(func.coalesce(func.sum(OrderItem.quantity), 0))
+            .where(OrderItem.product_id == product_id)
+        ).scalar_one()
+        remaining = db.execute(
+            select(Product.quantity).where(Product.id == product_id)
+        ).scalar_one()
+
+    total = per_thread * threads
+    return {
+        "mode": mode,
+        "requests": total,
+        "ok": counters["ok"],
+        "rejected": counters["rejected"],
+        "errors": counters["errors"],
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "added_to_orders": int(added),
+        "stock_left": int(remaining),
+        "oversold": max(0, int(added) - stock),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_argument(parser)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=4000, help="Всего запросов на режим")
+    parser.add_argument("--stock", type=int, default=1000, help="Начальный остаток горячего товара")
+    parser.add_argument("--modes", nargs="+", default=["check", "reserve"], choices=["check", "reserve"])
+    args = parser.parse_args()
+
+    quiet_app_logging()
+    engine = make_engine(args.database_url, pool_size=args.threads)
+    session_factory = make_session_factory(engine)
+
+    print(f"{'mode':<8} {'rps':>9} {'ok':>7} {'rejected':>9} {'errors':>7} {'added':>7} {'left':>6} {'oversold':>9}")
+    for mode in args.modes:
+        result = run_mode(session_factory, mode, args.threads, args.requests, args.stock)
+        print(
+            f"{result['mode']:<8} {result['rps']:>9} {result['ok']:>7} {result['rejected']:>9} "
+            f"{result['errors']:>7} {result['added_to_orders']:>7} {result['stock_left']:>6} {result['oversold']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
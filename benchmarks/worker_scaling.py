@@ -0,0 +1,152 @@
+"""
+Бенчмарк масштабирования по числу процессов сервера (gunicorn.conf.py).
+
+Для каждого значения --workers запускается gunicorn app.main:app с WEB_CONCURRENCY=N,
+после готовности (/health) клиенты в --clients процессах в течение --duration секунд
+отправляют запросы с параллельностью --concurrency на процесс клиента.
+Выводится пропускная способность, p50/p99 задержки и ускорение относительно первого
+значения --workers.
+
+Сценарии (--endpoint):
+- health    - GET /health, без БД: накладные расходы фреймворка;
+- order     - GET /api/orders/{id} случайного заказа: чтение и сериализация;
+- add-item  - POST /api/orders/add-item: запись.
+
+Сервер берет БД из database.database_url в setting.yaml; --database-url для заполнения
+тестовыми данными (--seed) должен указывать на ту же БД.
+
+Пример:
+    python -m benchmarks.worker_scaling --seed --workers 1 2 4 8 --endpoint order
+
+Нужен httpx: pip install -r benchmarks/requirements.txt
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import add_database_argument, make_engine, quiet_app_logging, seed_dataset
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+ENDPOINTS = ("health", "order", "add-item")
+
+
+def _request(endpoint: str, rnd: random.Random, max_order_id: int, max_product_id: int) -> tuple[str, str, dict]:
+    if endpoint == "health":
+        return "GET", "/health", {}
+    if endpoint == "order":
+        return "GET", f"/api/orders/{rnd.randint(1, max_order_id)}", {}
+    return "POST", "/api/orders/add-item", {"json": {
+        "order_id": rnd.randint(1, max_order_id),
+        "product_id": rnd.randint(1, max_product_id),
+        "quantity": 1,
+    }}
+
+
+async def _client_loop(base_url: str, args, seed: int) -> tuple[list[float], int]:
+    rnd = random.Random(seed)
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker() -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                method, path, kwargs = _request(args.endpoint, rnd, args.orders, args.products)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return latencies, errors
+
+
+def run_client(base_url: str, args, seed: int) -> tuple[list[float], int]:
+    """
+    Выполняется в отдельном процессе: один клиент не должен стать узким местом.
+    """
+    return asyncio.run(_client_loop(base_url, args, seed))
+
+
+def start_server(workers: int, bind: str) -> subprocess.Popen:
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "SETTING_WATCH_INTERVAL": "0"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app.main:app", "--bind", bind],
+        cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base_url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Сервер {base_url} не запустился за {timeout} с")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_argument(parser)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="order")
+    parser.add_argument("--duration", type=float, default=15, help="Секунд нагрузки на значение --workers")
+    parser.add_argument("--clients", type=int, default=4, help="Процессов клиента")
+    parser.add_argument("--concurrency", type=int, default=32, help="Параллельных запросов на процесс клиента")
+    parser.add_argument("--bind", default="127.0.0.1:8100")
+    parser.add_argument("--seed", action="store_true", help="Заполнить БД тестовыми данными")
+    parser.add_argument("--orders", type=int, default=20_000, help="Заказов (диапазон ID в запросах)")
+    parser.add_argument("--products", type=int, default=5_000, help="Товаров (диапазон ID в запросах)")
+    args = parser.parse_args()
+
+    quiet_app_logging()
+    if args.seed:
+        engine = make_engine(args.database_url)
+        seed_dataset(engine, products=args.products, orders=args.orders)
+        engine.dispose()
+
+    base_url = f"http://{args.bind}"
+    context = multiprocessing.get_context("spawn")
+    baseline = None
+    print(f"{'workers':>7} {'requests':>9} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'speedup':>8}")
+    for workers in args.workers:
+        server = start_server(workers, args.bind)
+        try:
+            wait_ready(base_url)
+            with context.Pool(args.clients) as pool:
+                results = pool.starmap(run_client, [(base_url, args, seed) for seed in range(args.clients)])
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+        latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+        errors = sum(client_errors for _, client_errors in results)
+        rps = len(latencies) / args.duration
+        baseline = baseline or rps
+        print(
+            f"{workers:>7} {len(latencies):>9} {rps:>9.0f} "
+            f"{statistics.median(latencies) * 1000:>8.1f} {latencies[int(len(latencies) * 0.99) - 1] * 1000:>8.1f} "
+            f"{errors:>7} {rps / baseline:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
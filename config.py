@@ -11,17 +11,55 @@ __author__ = "Evgenii Klimov"
 __license__ = "MIT"
 
 import logging
+import os
+import signal
 import sys
 import threading
+import time
 import yaml
 
-from datetime import datetime
 from pathlib import Path
+from typing import Any, Optional
 
 
 logger = logging.getLogger(__name__)
 
+# Период проверки setting.yaml фоновым потоком, секунды (0 - не следить за файлом)
+WATCH_INTERVAL: float = float(os.getenv("SETTING_WATCH_INTERVAL", "5"))
+
+
+class SettingNode:
+    """
+    Неизменяемый раздел конфигурации: значения лежат в __dict__ экземпляра
+    и читаются обычным поиском атрибута, без обращений к файлу.
+    """
+
+    def __init__(self, values: dict[str, Any]):
+        self.__dict__.update(values)
+
+    def __getattr__(self, name: str) -> Any:
+        raise AttributeError(f"'{name}' не найдено")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Конфигурация доступна только для чтения")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Конфигурация доступна только для чтения")
+
+    def __repr__(self) -> str:
+        return f"SettingNode({self.__dict__!r})"
+
+
 class _Setting:
+    """
+    Конфигурация из setting.yaml.
+
+    Файл читается один раз в неизменяемый снимок (SettingNode), обращения
+    к атрибутам обслуживаются из памяти без обращений к файловой системе.
+    Перезагрузка (reload(), фоновый поток-наблюдатель или SIGHUP) строит
+    новый снимок и подменяет его одной операцией присваивания: читатели видят
+    либо старую, либо новую конфигурацию целиком.
+    """
     _instance = None
     _lock = threading.Lock()
 
@@ -36,9 +74,10 @@ class _Setting:
         if self._initialized:
             return
 
-        self._data = {}
+        self._snapshot = SettingNode({})
         self._config_path = None
-        self._last_modified = None
+        self._mtime_ns = None
+        self._watcher = None
         self._initialized = True
 
     def load(self, config_path: str) -> None:
@@ -51,41 +90,80 @@ class _Setting:
         if not self._config_path or not self._config_path.exists():
             raise FileNotFoundError(f"Config file not found: {self._config_path}")
 
+        mtime_ns = self._config_path.stat().st_mtime_ns
         with open(self._config_path, 'r', encoding='utf-8') as f:
             data = yaml.safe_load(f) or {}
 
-        self._data = self._dict_to_object(data)
-        self._last_modified = datetime.now()
+        self._snapshot = self._dict_to_object(data)
+        self._mtime_ns = mtime_ns
 
     def _dict_to_object(self, data: dict[str, ...]) -> ...:
-        """Рекурсивное преобразование dict в объекты"""
+        """Рекурсивное преобразование dict в неизменяемые узлы"""
         if isinstance(data, dict):
-            obj = type('Setting', (), {})()
-            for key, value in data.items():
-                setattr(obj, key, self._dict_to_object(value))
-            return obj
+            return SettingNode({key: self._dict_to_object(value) for key, value in data.items()})
         elif isinstance(data, list):
-            return [self._dict_to_object(item) for item in data]
+            return tuple(self._dict_to_object(item) for item in data)
         else:
             return data
 
-    def __getattr__(self, name: str) -> ...:
-        # Проверяем обновление файла
-        if self._config_path and self._config_path.exists():
-            current_mtime = self._config_path.stat().st_mtime
-            if self._last_modified is None or current_mtime > self._last_modified.timestamp():
-                self._reload()
-
-        if hasattr(self._data, name):
-            return getattr(self._data, name)
-
-        raise AttributeError(f"'{name}' не найдено")
+    def __getattribute__(self, name: str) -> ...:
+        # __getattribute__ вместо __getattr__: раздел конфигурации читается сразу
+        # из снимка, без неудачного поиска в самом объекте и исключения
+        if name[0] == "_" or name in _SETTING_METHODS:
+            return object.__getattribute__(self, name)
+        return getattr(object.__getattribute__(self, "_snapshot"), name)
 
     def reload(self) -> None:
         """Принудительная перезагрузка конфигурации"""
         if self._config_path:
             self._reload()
 
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """
+        Перечитывает файл, если изменилось время его модификации (или force=True).
+        Ошибка чтения оставляет текущий снимок и пишется в лог.
+        """
+        try:
+            if not force and self._config_path.stat().st_mtime_ns == self._mtime_ns:
+                return False
+            self._reload()
+        except Exception:
+            logger.error("Ошибка перезагрузки конфигурации, используется прежняя", exc_info=True)
+            return False
+        logger.info(f"Конфигурация перезагружена: {self._config_path}")
+        return True
+
+    def start_watcher(self, interval: float = WATCH_INTERVAL) -> Optional[threading.Thread]:
+        """
+        Запускает фоновый поток, проверяющий файл раз в interval секунд.
+        Повторный вызов в том же процессе не создает второй поток.
+        """
+        if interval <= 0 or not self._config_path:
+            return None
+        if self._watcher is not None and self._watcher.is_alive():
+            return self._watcher
+
+        def watch() -> None:
+            while True:
+                time.sleep(interval)
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=watch, name="setting-watcher", daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def install_signal_handler(self, signum: int = getattr(signal, "SIGHUP", 0)) -> bool:
+        """
+        Перезагрузка по сигналу (по умолчанию SIGHUP). Возможна только из главного потока.
+        """
+        if not signum or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, lambda *_: self.reload_if_changed(force=True))
+        return True
+
+
+_SETTING_METHODS = frozenset(name for name in vars(_Setting) if not name.startswith("_"))
+
 setting = _Setting()
 try:
     setting.load('setting.yaml')
@@ -94,12 +172,9 @@ except FileNotFoundError:
     logger.error("Выход")
     sys.exit(1)
 
-logging.basicConfig(
-    level=setting.logger.level,
-    format=setting.logger.format,
-    datefmt=setting.logger.datefmt
-)
-for logger_name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
-    logging.getLogger(logger_name).handlers = []
-    logging.getLogger(logger_name).propagate = True
+# Наблюдатель за файлом и перезагрузку по SIGHUP запускает приложение при старте
+# (lifespan в app.main), а не импорт: задания и скрипты читают конфигурацию один раз
+
+# Обработчики логов настраивает один раз app.logger_config.setup_logging
+# (приложение - app.main, задания - app.jobs и app.init_db)
 logger.info("Инициализация конфига: ОК")
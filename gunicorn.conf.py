@@ -0,0 +1,60 @@
+"""
+Запуск API в несколько процессов: gunicorn с рабочими процессами uvicorn.
+
+    gunicorn app.main:app
+
+Файл gunicorn.conf.py из текущего каталога gunicorn подхватывает сам. Параметры -
+секция server в setting.yaml. Число процессов задается server.workers или
+переменной WEB_CONCURRENCY (не ключом -w: по WEB_CONCURRENCY приложение
+рассчитывает пул соединений процесса, см. app.database.pool_limits).
+
+Перезапуск без потери запросов: kill -HUP <pid главного процесса> - новые процессы
+запускаются, старые дообслуживают текущие запросы (до server.graceful_timeout секунд).
+С server.preload код приложения загружен в главном процессе и по HUP не перечитывается;
+для обновления кода - USR2 (новый главный процесс) и затем QUIT старому или перезапуск контейнера.
+"""
+import logging
+import multiprocessing
+import os
+
+from config import setting
+
+_server = setting.server
+
+workers = int(os.getenv("WEB_CONCURRENCY") or getattr(_server, "workers", 0) or multiprocessing.cpu_count())
+# Приложение еще не импортировано: пулы соединений процессов рассчитываются по этому числу
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = getattr(_server, "bind", "0.0.0.0:8000")
+preload_app = bool(getattr(_server, "preload", True))
+graceful_timeout = getattr(_server, "graceful_timeout", 30)
+timeout = getattr(_server, "timeout", 60)
+keepalive = getattr(_server, "keepalive", 5)
+max_requests = getattr(_server, "max_requests", 0)
+max_requests_jitter = getattr(_server, "max_requests_jitter", 0)
+
+
+def post_fork(server, worker):
+    """
+    Подготовка рабочего процесса после fork от главного (preload_app):
+    - engine создаются в lifespan каждого процесса; если главный процесс все же
+      создал их (и соединения), они не используются в дочернем
+      (dispose(close=False) - не закрывая сокеты, которыми владеет главный процесс);
+    - потоки не переживают fork: заново запускается поток записи логов
+      (logger.handler: queue); наблюдатель за setting.yaml запускает lifespan процесса.
+    """
+    from app.database import dispose_engines
+    from app.logger_config import setup_logging
+
+    dispose_engines(close=False)
+
+    setting.reload_if_changed()
+    if getattr(setting.logger, "handler", "sync") == "queue":
+        setup_logging(log_level=setting.logger.level)
+
+    if server.cfg.workers != int(os.environ["WEB_CONCURRENCY"]):
+        logging.getLogger(__name__).warning(
+            "Процессов %s, пул соединений рассчитан на %s: задайте число процессов "
+            "через server.workers или WEB_CONCURRENCY", server.cfg.workers, os.environ["WEB_CONCURRENCY"]
+        )
@@ -49,7 +49,9 @@ CREATE TABLE IF NOT EXISTS products (
     category_id INTEGER REFERENCES categories(id),
     name VARCHAR(255) NOT NULL,
     quantity INTEGER DEFAULT 0,
-    price DECIMAL(12, 2)
+    reserved_quantity INTEGER NOT NULL DEFAULT 0,
+    price DECIMAL(12, 2),
+    CONSTRAINT ck_products_quantity_non_negative CHECK (quantity >= 0)
 );
 
 CREATE TABLE IF NOT EXISTS clients (
@@ -58,10 +60,16 @@ CREATE TABLE IF NOT EXISTS clients (
     address TEXT
 );
 
+-- Заказы и дочерние таблицы секционированы по месяцам order_date (RANGE).
+-- Дочерние строки хранят order_date своего заказа: составной внешний ключ
+-- (order_id, order_date) и одинаковые границы секций, поэтому секция месяца
+-- переносится в архив вместе с позициями, платежами, историей и комментариями
+-- (python -m app.init_db archive). Первичные ключи включают order_date;
+-- глобально уникальный order_number - в несекционированной order_keys (ниже).
 CREATE TABLE IF NOT EXISTS orders (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     customer_id INTEGER REFERENCES clients(id),
-    order_number VARCHAR(100) UNIQUE,
+    order_number VARCHAR(100),
     subtotal DECIMAL(12, 2),
     discount_amount DECIMAL(12, 2),
     tax_amount DECIMAL(12, 2),
@@ -75,7 +83,7 @@ CREATE TABLE IF NOT EXISTS orders (
     phone VARCHAR(50),
     email VARCHAR(100),
     tracking_number VARCHAR(100),
-    order_date TIMESTAMP,
+    order_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     status_id INTEGER REFERENCES order_statuses(id),
@@ -83,12 +91,41 @@ CREATE TABLE IF NOT EXISTS orders (
     payment_method_id INTEGER REFERENCES payment_methods(id),
     payment_status_id INTEGER REFERENCES payment_statuses(id),
     delivery_type_id INTEGER REFERENCES delivery_types(id),
-    source_id INTEGER REFERENCES order_sources(id)
+    source_id INTEGER REFERENCES order_sources(id),
+    CONSTRAINT pk_orders PRIMARY KEY (id, order_date)
+) PARTITION BY RANGE (order_date);
+
+-- Ключи заказов вне секций: в секционированной orders уникальность возможна только вместе
+-- с order_date, поэтому глобальная уникальность order_number держится здесь.
+-- По id отсюда берется order_date заказа, чтобы поиск заказа по id читал одну секцию.
+-- Заполняется триггером на orders; строки архивированных заказов остаются (номера не повторяются).
+CREATE TABLE IF NOT EXISTS order_keys (
+    id INTEGER PRIMARY KEY,
+    order_number VARCHAR(100) UNIQUE,
+    order_date TIMESTAMP NOT NULL
 );
 
+CREATE OR REPLACE FUNCTION orders_sync_order_keys() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO order_keys (id, order_number, order_date) VALUES (NEW.id, NEW.order_number, NEW.order_date);
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE order_keys SET order_number = NEW.order_number, order_date = NEW.order_date WHERE id = OLD.id;
+    ELSE
+        DELETE FROM order_keys WHERE id = OLD.id;
+    END IF;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_orders_sync_order_keys ON orders;
+CREATE TRIGGER trg_orders_sync_order_keys
+    AFTER INSERT OR UPDATE OF order_number, order_date OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_sync_order_keys();
+
 CREATE TABLE IF NOT EXISTS order_items (
-    id SERIAL PRIMARY KEY,
-    order_id INTEGER REFERENCES orders(id),
+    id SERIAL,
+    order_id INTEGER NOT NULL,
+    order_date TIMESTAMP NOT NULL,
     product_id INTEGER REFERENCES products(id),
     product_name TEXT,
     quantity INTEGER,
@@ -96,33 +133,137 @@ CREATE TABLE IF NOT EXISTS order_items (
     discount_percent INTEGER,
     discount_amount DECIMAL(12, 2),
     total_price DECIMAL(12, 2),
-    variant JSONB
-);
+    variant JSONB,
+    CONSTRAINT pk_order_items PRIMARY KEY (id, order_date),
+    CONSTRAINT fk_order_items_order FOREIGN KEY (order_id, order_date) REFERENCES orders (id, order_date),
+    CONSTRAINT uq_order_items_order_product UNIQUE (order_id, product_id, order_date)
+) PARTITION BY RANGE (order_date);
 
 CREATE TABLE IF NOT EXISTS payments (
-    id SERIAL PRIMARY KEY,
-    order_id INTEGER REFERENCES orders(id),
+    id SERIAL,
+    order_id INTEGER NOT NULL,
+    order_date TIMESTAMP NOT NULL,
     payment_method_id INTEGER REFERENCES payment_methods(id),
     transaction_id VARCHAR(255),
     amount DECIMAL(12, 2),
     status TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_payments PRIMARY KEY (id, order_date),
+    CONSTRAINT fk_payments_order FOREIGN KEY (order_id, order_date) REFERENCES orders (id, order_date)
+) PARTITION BY RANGE (order_date);
 
 CREATE TABLE IF NOT EXISTS order_status_history (
-    id SERIAL PRIMARY KEY,
-    order_id INTEGER REFERENCES orders(id),
+    id SERIAL,
+    order_id INTEGER NOT NULL,
+    order_date TIMESTAMP NOT NULL,
     status_id INTEGER REFERENCES order_statuses(id),
     changed_by VARCHAR(255),
     notes TEXT,
-    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_order_status_history PRIMARY KEY (id, order_date),
+    CONSTRAINT fk_order_status_history_order FOREIGN KEY (order_id, order_date) REFERENCES orders (id, order_date)
+) PARTITION BY RANGE (order_date);
 
 CREATE TABLE IF NOT EXISTS order_comments (
-    id SERIAL PRIMARY KEY,
-    order_id INTEGER REFERENCES orders(id),
+    id SERIAL,
+    order_id INTEGER NOT NULL,
+    order_date TIMESTAMP NOT NULL,
     author_name VARCHAR(255),
     comment_text TEXT,
     is_internal BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_order_comments PRIMARY KEY (id, order_date),
+    CONSTRAINT fk_order_comments_order FOREIGN KEY (order_id, order_date) REFERENCES orders (id, order_date)
+) PARTITION BY RANGE (order_date);
+
+-- Секции: 12 месяцев назад и 3 вперед, строки вне диапазона попадают в секцию DEFAULT.
+-- Следующие месяцы создает python -m app.init_db partitions (запускать по расписанию).
+DO $$
+DECLARE
+    parent TEXT;
+    month DATE;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['orders', 'order_items', 'payments', 'order_status_history', 'order_comments'] LOOP
+        FOR month IN
+            SELECT generate_series(
+                date_trunc('month', CURRENT_DATE) - INTERVAL '12 months',
+                date_trunc('month', CURRENT_DATE) + INTERVAL '3 months',
+                INTERVAL '1 month'
+            )::date
+        LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                parent || '_' || to_char(month, 'YYYY_MM'), parent, month, (month + INTERVAL '1 month')::date
+            );
+        END LOOP;
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', parent || '_default', parent);
+    END LOOP;
+END $$;
+
+-- Индексы внешних ключей и полей фильтрации.
+-- Поиск позиций по order_id обслуживает уникальный индекс uq_order_items_order_product.
+-- Индексы секционированных таблиц создаются в каждой секции.
+CREATE INDEX IF NOT EXISTS ix_categories_parent_id ON categories (parent_id);
+CREATE INDEX IF NOT EXISTS ix_products_category_id ON products (category_id);
+-- Фильтры списка заказов: id в индексе для keyset-пагинации (WHERE ... AND id < :before_id ORDER BY id DESC)
+CREATE INDEX IF NOT EXISTS ix_orders_customer_id ON orders (customer_id, id);
+CREATE INDEX IF NOT EXISTS ix_orders_status_id ON orders (status_id, id);
+CREATE INDEX IF NOT EXISTS ix_orders_source_id ON orders (source_id, id);
+CREATE INDEX IF NOT EXISTS ix_orders_order_date ON orders (order_date);
+CREATE INDEX IF NOT EXISTS ix_order_items_product_id ON order_items (product_id);
+CREATE INDEX IF NOT EXISTS ix_payments_order_id ON payments (order_id);
+CREATE INDEX IF NOT EXISTS ix_order_status_history_order_id ON order_status_history (order_id);
+CREATE INDEX IF NOT EXISTS ix_order_comments_order_id ON order_comments (order_id);
+
+
+-- Отчеты: журнал изменений продаж (дописывается сервисом заказов)
+-- и сводные таблицы, обновляемые из журнала заданием refresh-reports
+CREATE TABLE IF NOT EXISTS report_sales_journal (
+    id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL,
+    order_date TIMESTAMP NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity_delta INTEGER NOT NULL,
+    amount_delta DECIMAL(12, 2) NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+CREATE TABLE IF NOT EXISTS report_daily_product_sales (
+    sales_date DATE NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (sales_date, product_id)
+);
+CREATE INDEX IF NOT EXISTS ix_report_daily_product_sales_product_id ON report_daily_product_sales (product_id);
+
+CREATE TABLE IF NOT EXISTS report_client_totals (
+    client_id INTEGER PRIMARY KEY,
+    total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0
+);
+
+
+-- Таблица замыкания дерева категорий: все пары (предок, потомок), включая саму категорию с depth = 0
+CREATE TABLE IF NOT EXISTS category_closure (
+    ancestor_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    descendant_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    depth INTEGER NOT NULL,
+    CONSTRAINT pk_category_closure PRIMARY KEY (ancestor_id, descendant_id)
+);
+CREATE INDEX IF NOT EXISTS ix_category_closure_descendant_depth ON category_closure (descendant_id, depth);
+
+-- Ключи Idempotency-Key запросов add-item, общие для всех процессов сервера (app.idempotency)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(255) PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    response TEXT,
+    created_at TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_created_at ON idempotency_keys (created_at);
+
+-- Прогресс массовой загрузки файлов (python -m app.jobs import-data) для продолжения после сбоя
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+    source TEXT PRIMARY KEY,
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
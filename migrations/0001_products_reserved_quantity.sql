@@ -0,0 +1,10 @@
+-- Резервирование остатков: свободный остаток (quantity) и резерв (reserved_quantity)
+-- хранятся раздельно. Применяется к уже созданной БД:
+-- psql -U postgres -d orders_db -f migrations/0001_products_reserved_quantity.sql
+ALTER TABLE products
+    ADD COLUMN IF NOT EXISTS reserved_quantity INTEGER NOT NULL DEFAULT 0;
+
+ALTER TABLE products
+    DROP CONSTRAINT IF EXISTS ck_products_quantity_non_negative;
+ALTER TABLE products
+    ADD CONSTRAINT ck_products_quantity_non_negative CHECK (quantity >= 0);
@@ -0,0 +1,29 @@
+-- Уникальность позиции заказа по паре (order_id, product_id) для upsert
+-- INSERT ... ON CONFLICT (order_id, product_id) DO UPDATE.
+-- Перед созданием ограничения дубликаты сливаются в позицию с минимальным id.
+BEGIN;
+
+WITH merged AS (
+    SELECT order_id, product_id, MIN(id) AS keep_id, SUM(quantity) AS quantity
+    FROM order_items
+    GROUP BY order_id, product_id
+    HAVING COUNT(*) > 1
+)
+UPDATE order_items oi
+SET quantity = m.quantity,
+    total_price = m.quantity * oi.unit_price
+FROM merged m
+WHERE oi.id = m.keep_id;
+
+DELETE FROM order_items oi
+USING order_items keep
+WHERE oi.order_id = keep.order_id
+  AND oi.product_id = keep.product_id
+  AND oi.id > keep.id;
+
+ALTER TABLE order_items
+    DROP CONSTRAINT IF EXISTS uq_order_items_order_product;
+ALTER TABLE order_items
+    ADD CONSTRAINT uq_order_items_order_product UNIQUE (order_id, product_id);
+
+COMMIT;
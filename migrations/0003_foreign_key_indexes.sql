@@ -0,0 +1,15 @@
+-- Индексы внешних ключей и полей фильтрации для существующей БД.
+-- CONCURRENTLY не блокирует запись, поэтому файл выполняется вне транзакции:
+-- psql -U postgres -d orders_db -f migrations/0003_foreign_key_indexes.sql
+-- Составной индекс (order_id, product_id) создается миграцией 0002 (uq_order_items_order_product).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_categories_parent_id ON categories (parent_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_category_id ON products (category_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_customer_id ON orders (customer_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_status_id ON orders (status_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_order_date ON orders (order_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_order_items_product_id ON order_items (product_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_order_id ON payments (order_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_order_status_history_order_id ON order_status_history (order_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_order_comments_order_id ON order_comments (order_id);
+
+ANALYZE categories, products, orders, order_items, payments, order_status_history, order_comments;
@@ -0,0 +1,30 @@
+-- Сводные таблицы отчетов для существующей БД.
+-- После применения заполните их: python -m app.jobs rebuild-reports
+CREATE TABLE IF NOT EXISTS report_sales_journal (
+    id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity_delta INTEGER NOT NULL,
+    amount_delta DECIMAL(12, 2) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS report_daily_product_sales (
+    sales_date DATE NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (sales_date, product_id)
+);
+CREATE INDEX IF NOT EXISTS ix_report_daily_product_sales_product_id ON report_daily_product_sales (product_id);
+
+CREATE TABLE IF NOT EXISTS report_client_totals (
+    client_id INTEGER PRIMARY KEY,
+    total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS report_category_roots (
+    category_id INTEGER PRIMARY KEY,
+    root_id INTEGER NOT NULL,
+    root_name VARCHAR(255)
+);
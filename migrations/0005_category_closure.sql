@@ -0,0 +1,23 @@
+-- Таблица замыкания дерева категорий вместо report_category_roots.
+-- Заполняется рекурсивным запросом по categories.parent_id; повторная сборка:
+-- python -m app.jobs rebuild-category-closure
+CREATE TABLE IF NOT EXISTS category_closure (
+    ancestor_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    descendant_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    depth INTEGER NOT NULL,
+    CONSTRAINT pk_category_closure PRIMARY KEY (ancestor_id, descendant_id)
+);
+CREATE INDEX IF NOT EXISTS ix_category_closure_descendant_depth ON category_closure (descendant_id, depth);
+
+TRUNCATE category_closure;
+WITH RECURSIVE paths (ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM categories
+    UNION ALL
+    SELECT p.ancestor_id, c.id, p.depth + 1
+    FROM categories c
+    JOIN paths p ON c.parent_id = p.descendant_id
+)
+INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+SELECT ancestor_id, descendant_id, depth FROM paths;
+
+DROP TABLE IF EXISTS report_category_roots;
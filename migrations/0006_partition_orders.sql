@@ -0,0 +1,144 @@
+-- Секционирование orders и дочерних таблиц (order_items, payments,
+-- order_status_history, order_comments) по месяцам order_date.
+-- Дочерние таблицы получают order_date своего заказа и составной внешний ключ
+-- (order_id, order_date). Данные копируются в новые секционированные таблицы,
+-- старые удаляются; последовательности id сохраняются.
+-- Если в дочерних таблицах есть строки без заказа (order_id NULL или заказа с таким id нет),
+-- миграция останавливается до любых изменений с их количеством и примерами id:
+-- такие строки нужно удалить или привязать к заказам и запустить миграцию снова.
+--
+-- Миграция переписывает таблицы целиком и держит блокировки до COMMIT:
+-- выполнять в окно обслуживания. После миграции:
+--   psql -U postgres -d orders_db -f tasks/request.sql   (представления удаляются вместе с таблицами)
+--   python -m app.init_db partitions
+BEGIN;
+
+DO $$
+DECLARE
+    child TEXT;
+    orphans BIGINT;
+    sample TEXT;
+    problems TEXT := '';
+BEGIN
+    FOREACH child IN ARRAY ARRAY['order_items', 'payments', 'order_status_history', 'order_comments'] LOOP
+        EXECUTE format(
+            'SELECT count(*), (SELECT string_agg(id::text, '', '') FROM (
+                 SELECT t.id FROM %1$I t
+                 WHERE t.order_id IS NULL OR NOT EXISTS (SELECT 1 FROM orders o WHERE o.id = t.order_id)
+                 ORDER BY t.id LIMIT 20) s)
+             FROM %1$I t
+             WHERE t.order_id IS NULL OR NOT EXISTS (SELECT 1 FROM orders o WHERE o.id = t.order_id)',
+            child
+        ) INTO orphans, sample;
+        IF orphans > 0 THEN
+            problems := problems || format(E'\n  %s: %s строк без заказа, id: %s', child, orphans, sample);
+        END IF;
+    END LOOP;
+    IF problems <> '' THEN
+        RAISE EXCEPTION 'Строки без заказа не переносятся в секционированные таблицы и будут потеряны:%', problems;
+    END IF;
+END $$;
+
+UPDATE orders SET order_date = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE order_date IS NULL;
+
+CREATE TABLE orders_partitioned (LIKE orders INCLUDING DEFAULTS) PARTITION BY RANGE (order_date);
+ALTER TABLE orders_partitioned ALTER COLUMN order_date SET NOT NULL;
+ALTER TABLE orders_partitioned ALTER COLUMN order_date SET DEFAULT CURRENT_TIMESTAMP;
+
+-- Дочерние таблицы получают order_date заказа последним столбцом
+CREATE TABLE order_items_partitioned (LIKE order_items INCLUDING DEFAULTS, order_date TIMESTAMP NOT NULL)
+    PARTITION BY RANGE (order_date);
+CREATE TABLE payments_partitioned (LIKE payments INCLUDING DEFAULTS, order_date TIMESTAMP NOT NULL)
+    PARTITION BY RANGE (order_date);
+CREATE TABLE order_status_history_partitioned (LIKE order_status_history INCLUDING DEFAULTS, order_date TIMESTAMP NOT NULL)
+    PARTITION BY RANGE (order_date);
+CREATE TABLE order_comments_partitioned (LIKE order_comments INCLUDING DEFAULTS, order_date TIMESTAMP NOT NULL)
+    PARTITION BY RANGE (order_date);
+ALTER TABLE order_items_partitioned ALTER COLUMN order_id SET NOT NULL;
+ALTER TABLE payments_partitioned ALTER COLUMN order_id SET NOT NULL;
+ALTER TABLE order_status_history_partitioned ALTER COLUMN order_id SET NOT NULL;
+ALTER TABLE order_comments_partitioned ALTER COLUMN order_id SET NOT NULL;
+
+-- Секции: от месяца самого раннего заказа до 3 месяцев вперед и DEFAULT
+DO $$
+DECLARE
+    parent TEXT;
+    month DATE;
+    first_month DATE;
+BEGIN
+    SELECT date_trunc('month', COALESCE(MIN(order_date), CURRENT_DATE))::date INTO first_month FROM orders;
+    FOREACH parent IN ARRAY ARRAY['orders', 'order_items', 'payments', 'order_status_history', 'order_comments'] LOOP
+        FOR month IN
+            SELECT generate_series(first_month, date_trunc('month', CURRENT_DATE) + INTERVAL '3 months', INTERVAL '1 month')::date
+        LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                parent || '_' || to_char(month, 'YYYY_MM'), parent || '_partitioned',
+                month, (month + INTERVAL '1 month')::date
+            );
+        END LOOP;
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', parent || '_default', parent || '_partitioned');
+    END LOOP;
+END $$;
+
+INSERT INTO orders_partitioned SELECT * FROM orders;
+INSERT INTO order_items_partitioned SELECT t.*, o.order_date FROM order_items t JOIN orders o ON o.id = t.order_id;
+INSERT INTO payments_partitioned SELECT t.*, o.order_date FROM payments t JOIN orders o ON o.id = t.order_id;
+INSERT INTO order_status_history_partitioned SELECT t.*, o.order_date FROM order_status_history t JOIN orders o ON o.id = t.order_id;
+INSERT INTO order_comments_partitioned SELECT t.*, o.order_date FROM order_comments t JOIN orders o ON o.id = t.order_id;
+
+-- Замена таблиц: последовательности id переходят к новым таблицам
+DO $$
+DECLARE
+    parent TEXT;
+    seq TEXT;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['order_items', 'payments', 'order_status_history', 'order_comments', 'orders'] LOOP
+        seq := pg_get_serial_sequence(parent, 'id');
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY NONE', seq);
+        EXECUTE format('DROP TABLE %I CASCADE', parent);
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', parent || '_partitioned', parent);
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', seq, parent);
+    END LOOP;
+END $$;
+
+ALTER TABLE orders
+    ADD CONSTRAINT pk_orders PRIMARY KEY (id, order_date),
+    ADD CONSTRAINT uq_orders_order_number UNIQUE (order_number, order_date),
+    ADD FOREIGN KEY (customer_id) REFERENCES clients(id),
+    ADD FOREIGN KEY (status_id) REFERENCES order_statuses(id),
+    ADD FOREIGN KEY (priority_id) REFERENCES order_priorities(id),
+    ADD FOREIGN KEY (payment_method_id) REFERENCES payment_methods(id),
+    ADD FOREIGN KEY (payment_status_id) REFERENCES payment_statuses(id),
+    ADD FOREIGN KEY (delivery_type_id) REFERENCES delivery_types(id),
+    ADD FOREIGN KEY (source_id) REFERENCES order_sources(id);
+
+ALTER TABLE order_items
+    ADD CONSTRAINT pk_order_items PRIMARY KEY (id, order_date),
+    ADD CONSTRAINT fk_order_items_order FOREIGN KEY (order_id, order_date) REFERENCES orders (id, order_date),
+    ADD CONSTRAINT uq_order_items_order_product UNIQUE (order_id, product_id, order_date),
+    ADD FOREIGN KEY (product_id) REFERENCES products(id);
+
+ALTER TABLE payments
+    ADD CONSTRAINT pk_payments PRIMARY KEY (id, order_date),
+    ADD CONSTRAINT fk_payments_order FOREIGN KEY (order_id, order_date) REFERENCES orders (id, order_date),
+    ADD FOREIGN KEY (payment_method_id) REFERENCES payment_methods(id);
+
+ALTER TABLE order_status_history
+    ADD CONSTRAINT pk_order_status_history PRIMARY KEY (id, order_date),
+    ADD CONSTRAINT fk_order_status_history_order FOREIGN KEY (order_id, order_date) REFERENCES orders (id, order_date),
+    ADD FOREIGN KEY (status_id) REFERENCES order_statuses(id);
+
+ALTER TABLE order_comments
+    ADD CONSTRAINT pk_order_comments PRIMARY KEY (id, order_date),
+    ADD CONSTRAINT fk_order_comments_order FOREIGN KEY (order_id, order_date) REFERENCES orders (id, order_date);
+
+CREATE INDEX ix_orders_customer_id ON orders (customer_id);
+CREATE INDEX ix_orders_status_id ON orders (status_id);
+CREATE INDEX ix_orders_order_date ON orders (order_date);
+CREATE INDEX ix_order_items_product_id ON order_items (product_id);
+CREATE INDEX ix_payments_order_id ON payments (order_id);
+CREATE INDEX ix_order_status_history_order_id ON order_status_history (order_id);
+CREATE INDEX ix_order_comments_order_id ON order_comments (order_id);
+
+COMMIT;
@@ -0,0 +1,13 @@
+-- Индексы фильтров списка заказов (GET /api/orders) с id для keyset-пагинации:
+-- WHERE customer_id = :id AND id < :before_id ORDER BY id DESC LIMIT :limit
+-- читается из индекса без сортировки. Индексы секционированной таблицы
+-- не создаются CONCURRENTLY: выполнять в период низкой нагрузки.
+BEGIN;
+
+DROP INDEX IF EXISTS ix_orders_customer_id;
+DROP INDEX IF EXISTS ix_orders_status_id;
+CREATE INDEX ix_orders_customer_id ON orders (customer_id, id);
+CREATE INDEX ix_orders_status_id ON orders (status_id, id);
+CREATE INDEX IF NOT EXISTS ix_orders_source_id ON orders (source_id, id);
+
+COMMIT;
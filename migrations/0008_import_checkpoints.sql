@@ -0,0 +1,6 @@
+-- Прогресс массовой загрузки файлов (python -m app.jobs import-data) для продолжения после сбоя
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+    source TEXT PRIMARY KEY,
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
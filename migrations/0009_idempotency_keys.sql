@@ -0,0 +1,10 @@
+-- Ключи Idempotency-Key запросов add-item в БД вместо памяти процесса:
+-- повтор запроса, попавший в другой процесс сервера, получает сохраненный ответ
+-- (python -m app.jobs purge-idempotency-keys удаляет ключи старше idempotency.ttl)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(255) PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    response TEXT,
+    created_at TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_created_at ON idempotency_keys (created_at);
@@ -0,0 +1,56 @@
+-- Глобальная уникальность orders.order_number после секционирования (0006):
+-- ограничение уникальности секционированной таблицы обязано включать order_date,
+-- и uq_orders_order_number (order_number, order_date) допускал один номер с разными датами.
+-- Номера и даты заказов переносятся в несекционированную order_keys (уникальный order_number),
+-- которую дальше ведет триггер на orders. Поиск заказа по id берет из нее order_date
+-- и читает одну секцию.
+--
+-- Если номера уже повторяются, миграция останавливается с их списком:
+-- повторы нужно исправить и запустить миграцию снова.
+BEGIN;
+
+DO $$
+DECLARE
+    duplicates TEXT;
+BEGIN
+    SELECT string_agg(order_number, ', ') INTO duplicates
+    FROM (SELECT order_number FROM orders GROUP BY order_number HAVING count(*) > 1 LIMIT 20) d;
+    IF duplicates IS NOT NULL THEN
+        RAISE EXCEPTION 'Номера заказов повторяются: %', duplicates;
+    END IF;
+END $$;
+
+-- Ключи заказов вне секций: в секционированной orders уникальность возможна только вместе
+-- с order_date, поэтому глобальная уникальность order_number держится здесь.
+-- По id отсюда берется order_date заказа, чтобы поиск заказа по id читал одну секцию.
+-- Заполняется триггером на orders; строки архивированных заказов остаются (номера не повторяются).
+CREATE TABLE IF NOT EXISTS order_keys (
+    id INTEGER PRIMARY KEY,
+    order_number VARCHAR(100) UNIQUE,
+    order_date TIMESTAMP NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION orders_sync_order_keys() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO order_keys (id, order_number, order_date) VALUES (NEW.id, NEW.order_number, NEW.order_date);
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE order_keys SET order_number = NEW.order_number, order_date = NEW.order_date WHERE id = OLD.id;
+    ELSE
+        DELETE FROM order_keys WHERE id = OLD.id;
+    END IF;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_orders_sync_order_keys ON orders;
+CREATE TRIGGER trg_orders_sync_order_keys
+    AFTER INSERT OR UPDATE OF order_number, order_date OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_sync_order_keys();
+
+INSERT INTO order_keys (id, order_number, order_date)
+SELECT id, order_number, order_date FROM orders
+ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE orders DROP CONSTRAINT IF EXISTS uq_orders_order_number;
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- Дата заказа в журнале продаж: refresh-reports соединяет журнал с orders по (id, order_date)
+-- и читает только секции заказов из журнала, а не индексы всех секций.
+-- Записи журнала, заказов которых уже нет в orders (архив), отчеты и раньше не учитывали -
+-- они удаляются. Выполнять вместе с выкладкой кода, который пишет order_date в журнал.
+BEGIN;
+
+LOCK TABLE report_sales_journal IN ACCESS EXCLUSIVE MODE;
+
+ALTER TABLE report_sales_journal ADD COLUMN IF NOT EXISTS order_date TIMESTAMP;
+
+UPDATE report_sales_journal j
+SET order_date = k.order_date
+FROM order_keys k
+WHERE k.id = j.order_id AND j.order_date IS NULL;
+
+DELETE FROM report_sales_journal j
+WHERE j.order_date IS NULL
+   OR NOT EXISTS (SELECT 1 FROM orders o WHERE o.id = j.order_id AND o.order_date = j.order_date);
+
+ALTER TABLE report_sales_journal ALTER COLUMN order_date SET NOT NULL;
+
+COMMIT;
@@ -7,7 +7,7 @@ FROM
 JOIN 
     ORDERS o ON c.ID = o.Customer_ID
 JOIN 
-    ORDER_ITEMS oi ON o.ID = oi.Order_ID
+    ORDER_ITEMS oi ON o.ID = oi.Order_ID AND o.Order_Date = oi.Order_Date
 GROUP BY 
     c.Name;
 	
@@ -52,13 +52,15 @@ SELECT
 FROM 
     ORDER_ITEMS oi
 JOIN 
-    ORDERS o ON oi.Order_ID = o.ID
+    ORDERS o ON oi.Order_ID = o.ID AND oi.Order_Date = o.Order_Date
 JOIN 
     PRODUCTS p ON oi.Product_ID = p.ID
 JOIN 
     category_path cp ON p.Category_ID = cp.id
+-- Условия по order_date обеих таблиц оставляют в плане только секции последнего месяца
 WHERE 
     o.Order_Date >= CURRENT_DATE - INTERVAL '1 month'
+    AND oi.Order_Date >= CURRENT_DATE - INTERVAL '1 month'
 GROUP BY 
     p.ID, p.Name, cp.level_1_name
 ORDER BY 